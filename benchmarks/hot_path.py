@@ -0,0 +1,560 @@
+"""
+Benchmark of the chat message hot path
+
+Replays recorded or synthetic chat through TatcTranslationModule.event_message, using stub messages and channels
+and a fake translator with a configurable latency, and reports the throughput, latency percentiles and allocations
+of each stage (sanitization, detection, translation and send) as JSON. The latency of each message is measured from
+the moment event_message queues it until it is sent, skipped, shed or failed.
+
+Usage (from the root of the repository):
+    python -m benchmarks.hot_path --messages 5000 --translation-latency 0.05 --output bench.json
+    python -m benchmarks.hot_path --replay chat.jsonl
+
+Recorded chat is either plain text (one message per line) or JSON lines of the form:
+    {"author": "<name>", "content": "<message>", "emotes": "<emotes tag of the message>"}
+
+Unless configured in the environment, the ingest queue is sized to hold every message and never expires them, so
+the throughput covers every message; messages shed anyway are reported separately. The language detection model
+and the translation cache use temporary databases. The benchmark exits with a non-zero status when any message
+raised an error.
+"""
+from __future__ import annotations
+from collections import Counter, defaultdict
+from collections.abc import AsyncIterator, Iterator
+from functools import partial
+
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+# the configuration is read from the environment when the modules are imported
+os.environ.setdefault('language_detection_training_interval', '0')
+
+from tatc.core import TatcApplicationConfiguration
+from tatc.core.queues import IngestQueue
+from tatc.core.schedulers import OutboundScheduler
+from tatc.modules import translations as module
+from tatc.modules.translations import TatcTranslationModule
+from tatc.modules.translations.configurations import environment
+from tatc.modules.translations.internal import caches, models
+from tatc.modules.translations.internal.executors import AsyncLanguageTranslator, get_translation_executor
+from tatc.modules.translations.internal.interfaces import LanguageDetectionModel, LanguageTranslator, TranslationResult
+
+
+CHANNEL = 'benchmark'
+STAGES = ['sanitization', 'detection', 'translation', 'send']
+
+SYNTHETIC_WORDS = [
+    'hello', 'gg', 'lol', 'nice', 'play', 'what', 'is', 'this', 'the', 'best', 'stream', 'today', 'again',
+    'こんにちは', 'おつかれ', 'ありがとう', 'すごい', 'かわいい', '草', '日本語', 'です',
+    '😀', '👍', '@someone', '@another_user', 'https://example.com/clip', 'Kappa', 'LUL', 'PogChamp'
+]
+SYNTHETIC_EMOTES = {'Kappa': '25', 'LUL': '425618', 'PogChamp': '305954156'}
+
+_CURRENT_MESSAGE_: contextvars.ContextVar[MessageLatency | None] = contextvars.ContextVar('benchmark_message', default=None)
+
+
+class Recorder:
+    """
+    Collects the duration and allocation samples of each stage
+    """
+    def __init__(self, allocations: bool = False):
+        self.__allocations = allocations
+        self.__durations: dict[str, list[float]] = defaultdict(list)
+        self.__allocated: dict[str, list[int]] = defaultdict(list)
+
+    @property
+    def allocations(self) -> bool:
+        return self.__allocations
+
+    def start(self) -> tuple[float, int]:
+        allocated = 0
+        if self.allocations:
+            tracemalloc.reset_peak()
+            allocated = tracemalloc.get_traced_memory()[0]
+        return time.perf_counter(), allocated
+
+    def stop(self, stage: str, started: tuple[float, int], elapsed: float = 0.0):
+        self.__durations[stage].append(elapsed + time.perf_counter() - started[0])
+        if self.allocations:
+            self.__allocated[stage].append(max(0, tracemalloc.get_traced_memory()[1] - started[1]))
+
+    def add(self, stage: str, duration: float, allocated: int | None = 0):
+        self.__durations[stage].append(duration)
+        if self.allocations and allocated is not None:
+            self.__allocated[stage].append(allocated)
+
+    def summary(self, stage: str) -> dict[str, any]:
+        durations = sorted(self.__durations.get(stage, []))
+        data = {
+            'count': len(durations),
+            'mean_ms': sum(durations) / len(durations) * 1000 if durations else None,
+            'p50_ms': percentile(durations, 0.50) * 1000 if durations else None,
+            'p99_ms': percentile(durations, 0.99) * 1000 if durations else None,
+            'max_ms': durations[-1] * 1000 if durations else None
+        }
+        if self.allocations:
+            allocated = self.__allocated.get(stage, [])
+            data['mean_allocated_bytes'] = sum(allocated) / len(allocated) if allocated else None
+            data['max_allocated_bytes'] = max(allocated) if allocated else None
+        return data
+
+
+def percentile(values: list[float], p: float) -> float:
+    """
+    Returns the nearest-rank percentile of sorted values
+    """
+    return values[max(0, math.ceil(p * len(values)) - 1)]
+
+
+class FakeTranslator(LanguageTranslator):
+    """
+    Translator that sleeps for the configured latency instead of calling a translation engine
+    """
+    def __init__(self, latency: float, detected_language: str = ''):
+        self.__latency = latency
+        self.__detected_language = detected_language
+
+    @property
+    def supported_engines(self) -> list[str]:
+        return ['benchmark']
+
+    @property
+    def supported_languages(self) -> list[str]:
+        return []
+
+    def translate(self, text: str, *target_languages: str) -> Iterator[TranslationResult]:
+        for target_language in target_languages:
+            if self.__latency:
+                time.sleep(self.__latency)
+            yield TranslationResult(
+                expected_language=target_language,
+                detected_language=self.__detected_language,
+                translated_text=f'<{target_language}> {text}'
+            )
+
+
+class TimedSanitizer:
+    def __init__(self, sanitizer, recorder: Recorder):
+        self.__sanitizer = sanitizer
+        self.__recorder = recorder
+
+    def sanitize(self, message: str, emotes: list = None) -> str:
+        started = self.__recorder.start()
+        try:
+            return self.__sanitizer.sanitize(message, emotes)
+        finally:
+            self.__recorder.stop('sanitization', started)
+
+
+class TimedSanitizerFactory:
+    def __init__(self, factory, recorder: Recorder):
+        self.__factory = factory
+        self.__recorder = recorder
+
+    def of(self, sanitize_emojis: bool, sanitize_usernames: bool) -> TimedSanitizer:
+        return TimedSanitizer(self.__factory.of(sanitize_emojis, sanitize_usernames), self.__recorder)
+
+
+class TimedDetectionModel(LanguageDetectionModel):
+    def __init__(self, model: LanguageDetectionModel, recorder: Recorder):
+        self.__model = model
+        self.__recorder = recorder
+
+    def detect(self, text: str) -> list[(str, float)]:
+        started = self.__recorder.start()
+        try:
+            return self.__model.detect(text)
+        finally:
+            self.__recorder.stop('detection', started)
+
+    async def detect_async(self, text: str) -> list[(str, float)]:
+        started = self.__recorder.start()
+        try:
+            return await self.__model.detect_async(text)
+        finally:
+            self.__recorder.stop('detection', started)
+
+    def train(self, text: str, expected_language: str):
+        self.__model.train(text, expected_language)
+
+
+class TimedTranslator:
+    def __init__(self, translator: AsyncLanguageTranslator, recorder: Recorder):
+        self.__translator = translator
+        self.__recorder = recorder
+
+    async def translate(self, text: str, *target_languages: str) -> AsyncIterator[TranslationResult]:
+        # only the time spent producing results is recorded, the time spent by the caller between results is not
+        generator = self.__translator.translate(text, *target_languages)
+        duration = 0.0
+        allocated = 0
+        try:
+            while True:
+                started = self.__recorder.start()
+                try:
+                    result = await generator.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    duration += time.perf_counter() - started[0]
+                    if self.__recorder.allocations:
+                        allocated += max(0, tracemalloc.get_traced_memory()[1] - started[1])
+                yield result
+        finally:
+            self.__recorder.add('translation', duration, allocated)
+
+
+class MessageLatency:
+    """
+    Times a message from the moment event_message queues it until it is skipped, shed, failed, or every text its
+    translations were merged into is sent or dropped by the scheduler
+    """
+    def __init__(self, recorder: Recorder):
+        self.__recorder = recorder
+        self.__started = time.perf_counter()
+        self.__pending = 1
+        self.__done = asyncio.Event()
+        self.queued = False
+
+    @property
+    def completed(self) -> bool:
+        return self.__pending == 0
+
+    async def wait(self):
+        await self.__done.wait()
+
+    def hold(self):
+        if not self.completed:
+            self.__pending += 1
+
+    def release(self, *_):
+        if self.completed:
+            return
+        self.__pending -= 1
+        if self.completed:
+            # the allocations of a message are interleaved with the ones of the other messages, and not recorded
+            self.__recorder.add('message', time.perf_counter() - self.__started, None)
+            self.__done.set()
+
+
+class TimedIngestQueue(IngestQueue):
+    def __init__(self, *, handler, on_drop=None, **kwargs):
+        super().__init__(handler=partial(self.__handle, handler), on_drop=partial(self.__drop, on_drop), **kwargs)
+
+    def put(self, item: tuple[StubMessage, any]) -> bool:
+        message, _ = item
+        message.latency.queued = True
+        return super().put(item)
+
+    @staticmethod
+    async def __handle(handler, item: tuple[StubMessage, any]):
+        message, _ = item
+        token = _CURRENT_MESSAGE_.set(message.latency)
+        try:
+            await handler(item)
+        finally:
+            _CURRENT_MESSAGE_.reset(token)
+            message.latency.release()
+
+    @staticmethod
+    def __drop(on_drop, item: tuple[StubMessage, any], reason: str):
+        message, _ = item
+        try:
+            if on_drop is not None:
+                on_drop(item, reason)
+        finally:
+            message.latency.release()
+
+
+class TimedScheduler(OutboundScheduler):
+    """
+    Holds the messages being translated until the texts of their translations are sent or dropped
+    """
+    def __init__(self, channel_limit: int = 0, global_limit: int = 0):
+        super().__init__(channel_limit=channel_limit, global_limit=global_limit)
+        self.__waiting: dict[str, list[MessageLatency]] = {}
+        self.__batches: dict[str, list[MessageLatency]] = {}
+
+    def wait(self, channel_name: str):
+        """
+        Holds the current message until the next texts enqueued for the channel are sent
+        """
+        latency = _CURRENT_MESSAGE_.get()
+        if latency is not None:
+            latency.hold()
+            self.__waiting.setdefault(channel_name, []).append(latency)
+
+    def enqueue(
+        self,
+        channel: any,
+        content: str,
+        priority: int = OutboundScheduler.PRIORITY_MESSAGE,
+        deadline: float = None
+    ) -> asyncio.Future:
+        future = super().enqueue(channel, content, priority, deadline)
+        waiting = self.__waiting.pop(channel.name, None)
+        if waiting is not None:
+            # the texts of a flushed batch are enqueued together, its messages wait for every one of them
+            self.__batches[channel.name] = waiting
+        for latency in self.__batches.get(channel.name, []):
+            latency.hold()
+            future.add_done_callback(latency.release)
+        for latency in waiting or []:
+            latency.release()
+        return future
+
+
+class StubUser:
+    def __init__(self, name: str):
+        self.name = name
+
+
+class StubChannel:
+    def __init__(self, name: str, recorder: Recorder, latency: float = 0.0):
+        self.name = name
+        self.sent = 0
+        self.__recorder = recorder
+        self.__latency = latency
+
+    async def send(self, content: str):
+        started = self.__recorder.start()
+        if self.__latency:
+            await asyncio.sleep(self.__latency)
+        self.sent += 1
+        self.__recorder.stop('send', started)
+
+
+class StubMessage:
+    def __init__(self, channel: StubChannel, author: str, content: str, emotes: str = ''):
+        self.channel = channel
+        self.author = StubUser(author)
+        self.content = content
+        self.echo = False
+        self.tags = {'emotes': emotes} if emotes else {}
+        self.raw_data = content
+        self.latency: MessageLatency | None = None
+
+
+class StubBot:
+    def __init__(self, channel_limit: int = 0, global_limit: int = 0):
+        self.nick = 'tatc_benchmark'
+        self.scheduler = TimedScheduler(channel_limit=channel_limit, global_limit=global_limit)
+        self.errors = Counter()
+
+    def run_event(self, event: str, *args):
+        # errors of the translation pipeline are reported to the bot instead of being raised by event_message
+        if event == 'error':
+            error = args[0]
+            self.errors[f'{type(error).__name__}: {error}'] += 1
+
+
+def synthetic_chat(count: int, seed: int) -> Iterator[dict[str, str]]:
+    generator = random.Random(seed)
+    for index in range(count):
+        words = [generator.choice(SYNTHETIC_WORDS) for _ in range(generator.randint(1, 12))]
+        content = ' '.join(words)
+        emotes = []
+        for emote, emote_id in SYNTHETIC_EMOTES.items():
+            ranges = []
+            position = 0
+            for word in words:
+                if word == emote:
+                    ranges.append(f'{position}-{position + len(word) - 1}')
+                position += len(word) + 1
+            if ranges:
+                emotes.append(f'{emote_id}:{",".join(ranges)}')
+        yield {'author': f'viewer_{index % 97}', 'content': content, 'emotes': '/'.join(emotes)}
+
+
+def recorded_chat(file: str) -> Iterator[dict[str, str]]:
+    with open(file, encoding='utf-8') as fd:
+        for line in fd:
+            line = line.rstrip('\n')
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                data = None
+            if isinstance(data, dict):
+                yield {
+                    'author': data.get('author', 'viewer'),
+                    'content': data.get('content', ''),
+                    'emotes': data.get('emotes', '')
+                }
+            else:
+                yield {'author': 'viewer', 'content': line, 'emotes': ''}
+
+
+def install(recorder: Recorder, translator: AsyncLanguageTranslator):
+    """
+    Replaces the collaborators looked up by event_message with timed wrappers
+    """
+    sanitizer_factory = module.MessageSanitizer
+    get_language_detection_model = module.get_language_detection_model
+    models = {}
+
+    def timed_language_detection_model(morse_code_support: bool = False):
+        if morse_code_support not in models:
+            models[morse_code_support] = TimedDetectionModel(get_language_detection_model(morse_code_support), recorder)
+        return models[morse_code_support]
+
+    send = TatcTranslationModule._TatcTranslationModule__send
+
+    def timed_send(translations: TatcTranslationModule, channel: StubChannel, text: str):
+        # the text is enqueued at once, or when the batch window of the channel is flushed
+        translations.bot.scheduler.wait(channel.name)
+        send(translations, channel, text)
+
+    timed_translator = TimedTranslator(translator, recorder)
+    module.IngestQueue = TimedIngestQueue
+    TatcTranslationModule._TatcTranslationModule__send = timed_send
+    module.MessageSanitizer = TimedSanitizerFactory(sanitizer_factory, recorder)
+    module.get_language_detection_model = timed_language_detection_model
+    module.get_async_translator = lambda translation_engine, morse_code_support, fallback_translation_engines=(): timed_translator
+
+
+async def replay(arguments: argparse.Namespace) -> dict[str, any]:
+    recorder = Recorder(allocations=arguments.allocations)
+    translator = AsyncLanguageTranslator(
+        translation_engine='benchmark',
+        translator=FakeTranslator(arguments.translation_latency, arguments.detected_language),
+        executor=get_translation_executor('benchmark'),
+        fan_out=arguments.fan_out
+    )
+    install(recorder, translator)
+
+    configuration = TatcApplicationConfiguration({
+        CHANNEL: {
+            'translations': {
+                'target_languages': arguments.target_languages.split(','),
+                'translation_engine': 'benchmark',
+                'sanitize_emojis': True,
+                'sanitize_usernames': True,
+                'ignore_words': []
+            }
+        }
+    })
+    translations = TatcTranslationModule(configuration)
+    bot = StubBot(arguments.channel_limit, arguments.global_limit)
+    translations.bot = bot
+    channel = StubChannel(CHANNEL, recorder, arguments.send_latency)
+
+    chat = recorded_chat(arguments.replay) if arguments.replay else synthetic_chat(arguments.messages, arguments.seed)
+    messages = [StubMessage(channel, data['author'], data['content'], data['emotes']) for data in chat]
+    # the queue is read when the first message is received, shedding would otherwise inflate the throughput
+    os.environ.setdefault('ingest_queue_size', str(max(1, len(messages))))
+    os.environ.setdefault('ingest_queue_max_age', '0')
+
+    semaphore = asyncio.Semaphore(max(1, arguments.concurrency))
+    errors = Counter()
+    # event_message is registered as a cog event, the listener itself is the function of the event
+    event_message = TatcTranslationModule.event_message.func
+
+    async def handle(index: int, message: StubMessage):
+        if arguments.rate > 0:
+            await asyncio.sleep(index / arguments.rate - (time.perf_counter() - replay_started))
+        async with semaphore:
+            message.latency = MessageLatency(recorder)
+            try:
+                await event_message(translations, message)
+            except Exception as error:
+                errors[f'{type(error).__name__}: {error}'] += 1
+            finally:
+                # messages skipped before reaching the ingest queue are done
+                if not message.latency.queued:
+                    message.latency.release()
+
+    # the model is loaded, and its database seeded, before the replay starts
+    module.get_language_detection_model()
+    if arguments.allocations:
+        tracemalloc.start()
+    replay_started = time.perf_counter()
+    await asyncio.gather(*[handle(index, message) for index, message in enumerate(messages)])
+    for message in messages:
+        await message.latency.wait()
+    await bot.scheduler.join()
+    duration = time.perf_counter() - replay_started
+    if arguments.allocations:
+        tracemalloc.stop()
+
+    queues = translations.ingest_queues.values()
+    processed = sum(queue.processed for queue in queues)
+    errors.update(bot.errors)
+
+    return {
+        'benchmark': 'hot_path',
+        'python': platform.python_version(),
+        'parameters': {
+            key: value for key, value in vars(arguments).items() if key != 'output'
+        },
+        'messages': len(messages),
+        'errors': sum(errors.values()),
+        'error_types': dict(errors.most_common()),
+        'sent': channel.sent,
+        'dropped': sum(bot.scheduler.dropped.values()),
+        'shed': sum(queue.dropped for queue in queues),
+        'duration_s': duration,
+        'throughput_per_s': processed / duration if duration else None,
+        'ingest': {
+            'size': environment().ingest_queue_size,
+            'processed': processed,
+            'dropped': sum(queue.dropped for queue in queues),
+            'max_wait_ms': max([queue.max_wait * 1000 for queue in queues], default=None)
+        },
+        'message': recorder.summary('message'),
+        'stages': {stage: recorder.summary(stage) for stage in STAGES}
+    }
+
+
+def parse_arguments(argv: list[str] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Benchmarks TatcTranslationModule.event_message')
+    parser.add_argument('--replay', help='recorded chat to replay (plain text or json lines)')
+    parser.add_argument('--messages', type=int, default=2000, help='number of synthetic messages')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic chat')
+    parser.add_argument('--target-languages', default='en,ja', help='comma delimited target languages')
+    parser.add_argument('--detected-language', default='', help='language reported by the fake translator')
+    parser.add_argument('--translation-latency', type=float, default=0.0, help='seconds per fake translation')
+    parser.add_argument('--send-latency', type=float, default=0.0, help='seconds per message sent')
+    parser.add_argument('--channel-limit', type=int, default=0, help='messages per 30s per channel (0 = unlimited)')
+    parser.add_argument('--global-limit', type=int, default=0, help='messages per 30s in total (0 = unlimited)')
+    parser.add_argument('--rate', type=float, default=0.0, help='messages per second (0 = as fast as possible)')
+    parser.add_argument('--concurrency', type=int, default=1, help='messages handled concurrently')
+    parser.add_argument('--fan-out', action='store_true', help='translate target languages concurrently')
+    parser.add_argument('--allocations', action='store_true', help='trace allocations (slower)')
+    parser.add_argument('--output', help='file to write the results to, defaults to stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] = None):
+    arguments = parse_arguments(argv)
+    with tempfile.TemporaryDirectory(prefix='tatc-benchmark-') as directory:
+        # the replay neither trains the model of the bot nor reads its cached translations
+        models.DATABASE_FILE = os.path.join(directory, 'models.db')
+        caches.DATABASE_FILE = os.path.join(directory, 'translations.db')
+        results = asyncio.run(replay(arguments))
+    text = json.dumps(results, indent=2)
+    if arguments.output:
+        with open(arguments.output, 'w') as fp:
+            fp.write(text)
+    else:
+        print(text)
+
+    if results['errors']:
+        print(f'{results["errors"]} of {results["messages"]} messages failed: {results["error_types"]}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,25 +1,67 @@
 from tatc import core
 from tatc.core.bots import TatcTwitchChatBot
+from tatc.core.shards import ShardContext, ShardSupervisor
 from tatc.modules import load_modules
 
 
+import multiprocessing
 import signal
 
 
+def stop(signum: int, _):
+    # raised within the event loop, so the bot is closed and its pending state is flushed before the process exits;
+    # later signals, such as the SIGTERM forwarded by the supervisor after Ctrl-C, do not interrupt the flush
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    raise SystemExit(0)
+
+
+def handle_signals():
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+
+def run_shard(shard: ShardContext = None):
+    # the shards are spawned processes, which do not run the __main__ block
+    handle_signals()
+    bot = TatcTwitchChatBot(
+        configuration=core.init(),
+        modules=load_modules(),
+        shard=shard
+    )
+    bot.run()
+
+
+def save_configuration(channel: str, data: dict[str, any]):
+    core.init().update(data)
+    core.sync_configuration(channel)
+
+
 def main():
     try:
-        bot = TatcTwitchChatBot(
-            configuration=core.init(),
-            modules=load_modules()
-        )
-        bot.run()
+        shard_count = core.environment().shard_count
+        if shard_count > 1:
+            ShardSupervisor(
+                shard_count=shard_count,
+                target=run_shard,
+                on_configuration=save_configuration,
+                logger=core.get_logger('bot')
+            ).run()
+        else:
+            run_shard()
+    except SystemExit:
+        # stopped by a signal, the bot has been closed already
+        pass
     except:
         print('An error has been encountered...')
         raise
+    finally:
+        core.shutdown()
 
     print('Exiting...')
 
 if __name__ == '__main__':
-    signal.signal(signal.SIGINT, signal.SIG_DFL)
-    signal.signal(signal.SIGTERM,  signal.SIG_DFL)
+    # the shards and the detection workers are spawned processes, which re-run this executable when frozen
+    multiprocessing.freeze_support()
+    handle_signals()
     main()
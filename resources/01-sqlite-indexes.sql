@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS `idx_languages_word` ON `languages` (`word`);
@@ -1,4 +1,5 @@
 
+from collections.abc import Callable
 from dotenv import load_dotenv
 from functools import lru_cache
 from logging.handlers import *
@@ -7,11 +8,19 @@ from twitchio.ext import commands
 
 from tatc.core.configurations import *
 from tatc.core.constants import *
-
+from tatc.core.metrics import MetricsExporter, MetricsRegistry
+from tatc.core.persistence import ConfigurationWriter
+from tatc.core.profilers import Profiler, SamplingProfiler, PROFILERS
+from tatc.core.tracing import JsonLinesSpanExporter, OtlpHttpSpanExporter, Tracer
+from tatc.core.schedulers import OutboundScheduler
+
+import asyncio
+import atexit
 import json
 import logging
 import os
-import threading
+import queue
+import time
 
 
 load_dotenv(
@@ -20,9 +29,10 @@ load_dotenv(
     )
 )
 
-_LOCK_ = threading.Lock()
 _CONFIG_FILE_NAME_ = 'channels.json'
 _LOGGING_FORMAT_ = '%(levelname)8s:  %(message)s'
+_PROFILES_DIRECTORY_ = 'profiles'
+_SHUTDOWN_HOOKS_: list[Callable[[], None]] = []
 
 
 def working_directory() -> str:
@@ -31,6 +41,30 @@ def working_directory() -> str:
     )
 
 
+def on_shutdown(hook: Callable[[], None]):
+    """
+    Registers a function flushing pending state of the application, run by shutdown()
+    """
+    _SHUTDOWN_HOOKS_.append(hook)
+
+
+def shutdown():
+    """
+    Flushes the pending state of the application, such as the configuration waiting to be saved,
+    buffered spans and log records; the hooks are run once, in the reverse order of their registration.
+    Also run at exit, which is only reached when the process is not killed by a signal.
+    """
+    while _SHUTDOWN_HOOKS_:
+        hook = _SHUTDOWN_HOOKS_.pop()
+        try:
+            hook()
+        except Exception as error:
+            get_logger('bot').error(f'Unable to flush on shutdown: {error}')
+
+
+atexit.register(shutdown)
+
+
 @lru_cache(maxsize=1)
 def environment() -> Environment:
     return Environment()
@@ -50,18 +84,92 @@ def init() -> TatcApplicationConfiguration:
     return TatcApplicationConfiguration(data)
 
 
-def sync_configuration():
+@lru_cache(maxsize=1)
+def configuration_writer() -> ConfigurationWriter:
+    writer = ConfigurationWriter(
+        file=os.path.join(working_directory(), _CONFIG_FILE_NAME_),
+        snapshot=init().to_dict,
+        debounce=environment().configuration_sync_delay,
+        logger=get_logger('bot')
+    )
+    on_shutdown(writer.flush)
+    return writer
+
+
+def sync_configuration(channel: str = None):
     """
-    Saves the in-memory configuration to 'channels.json'
+    Saves the in-memory configuration of the specified channel, or all channels, to 'channels.json';
+    changes are coalesced and written in the background after 'configuration_sync_delay' seconds
     """
-    lock = _LOCK_
-    lock.acquire(blocking=True, timeout=5)
-    try:
-        configuration = init()
-        with open(os.path.join(working_directory(), _CONFIG_FILE_NAME_), 'w') as fp:
-            json.dump(configuration.to_dict(), fp, indent=2)
-    finally:
-        lock.release()
+    configuration_writer().mark_dirty(channel)
+
+
+@lru_cache(maxsize=1)
+def get_metrics() -> MetricsRegistry:
+    """
+    Gets the metrics registry of the application
+    """
+    return MetricsRegistry()
+
+
+def metrics_exporter(shard_id: int = 0, loop: asyncio.AbstractEventLoop = None) -> MetricsExporter:
+    """
+    Creates the exporter of the metrics, configured by 'metrics_port' and 'metrics_file';
+    each shard serves its metrics on the next port, and writes them to its own file.
+    The metrics are read on the specified event loop.
+    """
+    port = environment().metrics_port
+    file = environment().metrics_file
+    if file:
+        file = path.join(working_directory(), file)
+        if shard_id:
+            root, extension = path.splitext(file)
+            file = f'{root}-{shard_id}{extension}'
+    return MetricsExporter(
+        registry=get_metrics(),
+        port=port + shard_id if port > 0 else 0,
+        file=file or None,
+        interval=environment().metrics_interval,
+        loop=loop,
+        logger=get_logger('bot')
+    )
+
+
+@lru_cache(maxsize=1)
+def get_tracer() -> Tracer:
+    """
+    Gets the tracer of the application, configured by 'tracing_sample_rate'; the spans are posted to
+    'tracing_endpoint' (OTLP over HTTP) when specified, otherwise appended to 'tracing_file'
+    """
+    sample_rate = environment().tracing_sample_rate
+    if sample_rate <= 0:
+        return Tracer(0)
+
+    if environment().tracing_endpoint:
+        exporter = OtlpHttpSpanExporter(environment().tracing_endpoint, logger=get_logger('bot'))
+    else:
+        exporter = JsonLinesSpanExporter(
+            path.join(working_directory(), environment().tracing_file),
+            logger=get_logger('bot')
+        )
+    on_shutdown(exporter.close)
+    return Tracer(sample_rate, exporter)
+
+
+def create_profiler(kind: str, shard_id: int = 0) -> Profiler:
+    """
+    Creates a profiler of the specified kind, either 'cprofile' or 'sampling'; the results are written to
+    'profiles/<kind>-<shard>-<time>.<extension>' within the working directory
+    """
+    profiler_type = PROFILERS[kind]
+    file = path.join(
+        working_directory(),
+        _PROFILES_DIRECTORY_,
+        f'{kind}-{shard_id}-{time.strftime("%Y%m%d-%H%M%S")}.{profiler_type.extension}'
+    )
+    if profiler_type is SamplingProfiler:
+        return SamplingProfiler(file, interval=environment().profiler_interval)
+    return profiler_type(file)
 
 
 @lru_cache(maxsize=5)
@@ -96,7 +204,17 @@ def get_logger(logger_name: str):
 
     for handler in handlers:
         handler.setFormatter(logging.Formatter(fmt=_LOGGING_FORMAT_))
-        logger.addHandler(handler)
+
+    if environment().logging_async:
+        # the handlers are run by a listener thread; only the message is formatted by the thread logging it
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        on_shutdown(listener.stop)
+        logger.addHandler(QueueHandler(log_queue))
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     logger.setLevel(environment().logging_level)
 
@@ -143,6 +261,24 @@ class TatcChannelModule(commands.Cog):
         """
         raise NotImplementedError
 
+    def configuration_changed(self, channel_name: str):
+        """
+        Notifies the module that its configuration of the specified channel has been changed
+        """
+        pass
+
+    def loaded(self):
+        """
+        Notifies the module that it has been loaded by the bot, and is about to receive events
+        """
+        pass
+
+    def channel_left(self, channel_name: str):
+        """
+        Notifies the module that the bot has left the specified channel
+        """
+        pass
+
     @property
     def logger(self) -> logging.Logger:
         """
@@ -153,7 +289,7 @@ class TatcChannelModule(commands.Cog):
     async def cog_command_error(self, context: commands.Context, error: Exception) -> None:
         configuration = self._configurations.get_channel_configuration(context.channel.name)
         if configuration.debug_mode:
-            await context.send(f'Error: "{str(error)}"')
+            self.bot.scheduler.enqueue(context.channel, f'Error: "{str(error)}"', priority=OutboundScheduler.PRIORITY_COMMAND)
 
         self.logger.error(str(error))
         self.logger.debug(error)
@@ -2,14 +2,19 @@ from __future__ import annotations
 from __version__ import *
 
 from aiohttp import ServerTimeoutError
+from os import path
 from typing import Optional
 from twitchio import Message
 from twitchio.ext import commands
 
-from tatc.core import TatcChannelModule, TatcApplicationConfiguration, environment, get_logger, sync_configuration
+from tatc.core import TatcChannelModule, TatcApplicationConfiguration, create_profiler, environment, get_logger, get_metrics, metrics_exporter, on_shutdown, shutdown, sync_configuration, working_directory
+from tatc.core.profilers import PROFILERS, Profiler
+from tatc.core.schedulers import OutboundScheduler
+from tatc.core.shards import ROUTE_JOIN, ROUTE_LEAVE, ShardContext
 from tatc.errors import InvalidArgumentsError, UnauthorizedUserError, UnknownModuleError
 from tatc.utilities import Objects, String
 
+import asyncio
 import logging
 import twitchio
 
@@ -21,7 +26,8 @@ class TatcTwitchChatBot(commands.Bot):
     def __init__(
         self,
         configuration: TatcApplicationConfiguration,
-        modules: list[TatcChannelModule] = None
+        modules: list[TatcChannelModule] = None,
+        shard: ShardContext = None
     ):
         super().__init__(
             token=environment().twitch_access_token,
@@ -30,6 +36,21 @@ class TatcTwitchChatBot(commands.Bot):
         self.__logger = get_logger('bot')
         self.__configuration = configuration
         self.__modules = self.__init_modules(modules)
+        self.__shard = shard
+        self.__receiver: asyncio.Task | None = None
+        # the global chat limit applies to the account, so it is split evenly across the shards
+        shard_count = shard.shard_count if shard else 1
+        self.__scheduler = OutboundScheduler(
+            channel_limit=environment().chat_channel_message_limit,
+            global_limit=max(1, environment().chat_message_limit // shard_count),
+            message_deadline=environment().chat_message_deadline,
+            logger=self.__logger
+        )
+        self.__metrics_exporter = None
+        self.__profiler: Profiler | None = None
+        self.__profiler_timer: asyncio.TimerHandle | None = None
+        self.__profile_saving: asyncio.Task | None = None
+        self.__init_metrics()
 
     @property
     def configurations(self) -> TatcApplicationConfiguration:
@@ -52,6 +73,115 @@ class TatcTwitchChatBot(commands.Bot):
         """
         return self.__logger
 
+    @property
+    def scheduler(self) -> OutboundScheduler:
+        """
+        Returns the scheduler that all chat messages of the bot and its modules are sent through
+        """
+        return self.__scheduler
+
+    @property
+    def shard(self) -> ShardContext | None:
+        """
+        Returns the shard the bot is running as, if the channels are sharded across processes
+        """
+        return self.__shard
+
+    def owns(self, channel: str) -> bool:
+        """
+        Returns true, when the specified channel is handled by the current bot; otherwise, false.
+        """
+        return self.shard is None or self.shard.owns(channel)
+
+    def __route(self, kind: str, channels: list[str]) -> list[str]:
+        # returns the channels owned by the current shard, the rest are sent to the shards owning them
+        local_channels = []
+        for channel in channels:
+            if self.owns(channel):
+                local_channels.append(channel)
+            else:
+                self.logger.debug(f'Routing "{kind}" of "{channel}" to its shard')
+                self.shard.route(kind, channel)
+        return local_channels
+
+    async def __receive_routed(self):
+        while True:
+            request = await self.loop.run_in_executor(None, self.shard.receive)
+            if request is None:
+                return
+
+            kind, channel = request
+            channel_configuration = self.configurations.get_channel_configuration(channel)
+            match kind:
+                case 'join':
+                    self.logger.info(f'Joining routed channel: "{channel}"')
+                    channel_configuration.enabled = True
+                    self.__sync_configuration(channel)
+                    await self.join_channels([channel])
+                case 'leave':
+                    self.logger.info(f'Leaving routed channel: "{channel}"')
+                    channel_configuration.enabled = False
+                    self.__sync_configuration(channel)
+                    await self.part_channels([channel])
+                    self.__channel_left(channel)
+
+    def __sync_configuration(self, channel: str):
+        if self.shard is None:
+            sync_configuration(channel)
+        else:
+            self.shard.publish_configuration(channel, self.configurations.to_dict([channel]))
+
+    def __channel_left(self, channel: str):
+        for module in self.__modules.values():
+            module.channel_left(channel)
+
+    def __reply(self, context: commands.Context, message: str) -> asyncio.Future:
+        return self.scheduler.enqueue(context.channel, message, priority=OutboundScheduler.PRIORITY_COMMAND)
+
+    def __stop_profiler(self, channel: twitchio.Channel) -> asyncio.Task | None:
+        # the profiler is stopped on the thread running the bot, as cProfile only profiles the thread it is started from
+        profiler = self.__profiler
+        if profiler is None or not profiler.running:
+            return None
+
+        self.__profiler_timer.cancel()
+        profiler.stop()
+        # the task is kept until the profile is saved, the event loop only keeps a weak reference to it
+        self.__profile_saving = self.loop.create_task(self.__save_profile(profiler, channel))
+        return self.__profile_saving
+
+    async def __save_profile(self, profiler: Profiler, channel: twitchio.Channel):
+        try:
+            file = await self.loop.run_in_executor(None, profiler.save)
+        except OSError as error:
+            self.logger.error(f'Unable to save the profile to "{profiler.file}": {error}')
+            self.scheduler.enqueue(channel, 'Error: "Unable to save the profile"', priority=OutboundScheduler.PRIORITY_COMMAND)
+            return
+
+        message = f'Profile saved: "{path.relpath(file, working_directory())}" ({profiler.name}, {profiler.elapsed:.0f}s)'
+        self.logger.info(message)
+        self.scheduler.enqueue(channel, message, priority=OutboundScheduler.PRIORITY_COMMAND)
+
+    def __init_metrics(self):
+        metrics = get_metrics()
+        metrics.callback(
+            'tatc_send_queue_depth', 'Chat messages waiting to be sent',
+            lambda: {(channel,): depth for channel, depth in self.scheduler.queue_depths.items()},
+            labels=['channel']
+        )
+        metrics.callback(
+            'tatc_messages_sent_total', 'Chat messages sent',
+            lambda: {(channel,): count for channel, count in self.scheduler.sent.items()},
+            labels=['channel'],
+            type='counter'
+        )
+        metrics.callback(
+            'tatc_messages_dropped_total', 'Chat messages dropped before being sent, as they became stale',
+            lambda: {(channel,): count for channel, count in self.scheduler.dropped.items()},
+            labels=['channel'],
+            type='counter'
+        )
+
     def __init_modules(self, modules: list[TatcChannelModule]) -> dict[str, TatcChannelModule]:
         data = {}
         if not modules:
@@ -88,7 +218,8 @@ class TatcTwitchChatBot(commands.Bot):
             raise UnauthorizedUserError(f'"{username}" is not an authorized user.')
         
     async def event_raw_data(self, data: str):
-        self.logger.debug(f'event_raw_data: "{data}" type: "{type(data).__name__}"')
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('event_raw_data: "%s" type: "%s"', data, type(data).__name__)
         if isinstance(data, ServerTimeoutError):
             self.logger.debug('Server Timeout received! Signalling stop!')
             self.loop.call_soon_threadsafe(self.loop.stop)
@@ -103,13 +234,22 @@ class TatcTwitchChatBot(commands.Bot):
 
     async def event_ready(self):
         self.logger.info(f'Logged in successfully as "{self.nick}"...')
+        if self.__metrics_exporter is None:
+            self.__metrics_exporter = metrics_exporter(self.shard.shard_id if self.shard else 0, asyncio.get_running_loop())
+            if self.__metrics_exporter.enabled:
+                self.__metrics_exporter.start()
+                on_shutdown(self.__metrics_exporter.stop)
         channels = set()
         for channel in self.configurations.channels:
             channel_configuration = self.configurations.get_channel_configuration(channel)
-            if channel_configuration.enabled:
+            if channel_configuration.enabled and self.owns(channel):
                 channels.add(channel)
 
-        channels.add(self.nick)
+        if self.owns(self.nick):
+            channels.add(self.nick)
+        if self.shard is not None and self.__receiver is None:
+            self.logger.info(f'Running as shard {self.shard.shard_id + 1} of {self.shard.shard_count}')
+            self.__receiver = self.loop.create_task(self.__receive_routed())
         self.logger.info('Joining channels: {channels}'.format(
             channels=', '.join(f'"{channel}"' for channel in channels)
         ))
@@ -119,18 +259,32 @@ class TatcTwitchChatBot(commands.Bot):
         for module in self.__modules.values():
             module.bot = self
             self.add_cog(module)
+            module.loaded()
             self.logger.info(f'Module loaded: "{module.name}"')
 
+    async def close(self):
+        if self.shard is not None:
+            # the thread receiving the routed requests returns, so the executor is not held up at exit
+            self.shard.stop()
+        if self.__receiver is not None:
+            self.__receiver.cancel()
+        try:
+            await super().close()
+        finally:
+            # the state waiting to be written, such as the configuration of the channels, is flushed before exiting
+            shutdown()
+
     async def event_command_error(self, context: commands.Context, error: Exception) -> None:
         configuration = self.configurations.get_channel_configuration(context.channel.name)
         if configuration.debug_mode or self.__is_roles(context.author, is_administrator=True):
-            await context.send(f'Error: "{str(error)}"')
+            self.__reply(context, f'Error: "{str(error)}"')
 
         self.logger.error(str(error))
         self.logger.debug(error)
 
     async def event_message(self, message: Message) -> None:
-        self.logger.debug(f'message received -> {message.content}')
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('message received -> %s', message.content)
         return await super().event_message(message)
 
     @commands.command(name='join')
@@ -146,7 +300,12 @@ class TatcTwitchChatBot(commands.Bot):
 
         text = ', '.join([f'"{channel}"' for channel in channels])
         self.logger.info(f'Joining channels: {text}')
-        await self.join_channels(channels)
+        # the configuration of a routed channel is saved by the shard owning it
+        channels = self.__route(ROUTE_JOIN, channels)
+        for channel in channels:
+            self.__sync_configuration(channel)
+        if channels:
+            await self.join_channels(channels)
 
     @commands.command(name='leave')
     async def leave(self, context: commands.Context, channels: str = None, user: twitchio.Chatter = None):
@@ -163,7 +322,13 @@ class TatcTwitchChatBot(commands.Bot):
             self.logger.debug(f'Disabling configuration for "{channel}"')
             self.configurations.get_channel_configuration(channel).enabled = False
 
-        await self.part_channels(channels)
+        channels = self.__route(ROUTE_LEAVE, channels)
+        for channel in channels:
+            self.__sync_configuration(channel)
+        if channels:
+            await self.part_channels(channels)
+        for channel in channels:
+            self.__channel_left(channel)
 
     @commands.command(name='config')
     async def config(
@@ -184,11 +349,11 @@ class TatcTwitchChatBot(commands.Bot):
         module = self.__modules[module_name]
         channel_module_configuration = module.get_module_configuration(context.channel.name)
         if channel_module_configuration is None:
-            await context.send(f'Error: "{module_name}" is unavailable.')
+            self.__reply(context, f'Error: "{module_name}" is unavailable.')
             return
         
         if method == 'help' and not key:
-            await context.send(f'Usage: "{self.prefix}config {module_name} [set|get|remove|help] <key> <value>"')
+            self.__reply(context, f'Usage: "{self.prefix}config {module_name} [set|get|remove|help] <key> <value>"')
             return
 
         messages = []
@@ -204,11 +369,14 @@ class TatcTwitchChatBot(commands.Bot):
                 )
             case 'set':
                 new_value = channel_module_configuration.set(key, value)
+                module.configuration_changed(context.channel.name)
                 messages.append(f'{key} = "{new_value}"')
             case 'get':
                 messages.append(f'{key} = "{channel_module_configuration.get(key)}"')
             case 'remove':
-                messages.append(f'{key} = "{channel_module_configuration.set(key, None)}" (default)')
+                default_value = channel_module_configuration.set(key, None)
+                module.configuration_changed(context.channel.name)
+                messages.append(f'{key} = "{default_value}" (default)')
             case 'info':
                 if key:
                     messages.extend(channel_module_configuration.info(key))
@@ -220,13 +388,70 @@ class TatcTwitchChatBot(commands.Bot):
 
         for message in messages:
             self.logger.info(message)
-            await context.send(message)
+            self.__reply(context, message)
+
+        self.__sync_configuration(context.channel.name)
+
+    @commands.command(name='profile')
+    async def profile(
+        self,
+        context: commands.Context,
+        method: str = 'status',
+        kind: str = 'sampling',
+        duration: str = None,
+        user: twitchio.Chatter = None
+    ):
+        user = user or context.author
+        self.__require_roles(user, is_administrator=True)
 
-        sync_configuration()
+        profiler = self.__profiler
+        running = profiler is not None and profiler.running
+        match method:
+            case 'start':
+                if running:
+                    self.__reply(context, f'Profiler "{profiler.name}" is already running ({profiler.elapsed:.0f}s)')
+                    return
+
+                try:
+                    # the kind may be left out, as in "!profile start 60"
+                    float(kind)
+                    kind, duration = duration or 'sampling', kind
+                except ValueError:
+                    pass
+
+                kind = kind.lower()
+                if kind not in PROFILERS:
+                    raise InvalidArgumentsError(f'Error: Profiler "{kind}" is not a known profiler')
+                try:
+                    seconds = float(duration) if duration else environment().profiler_duration
+                except ValueError:
+                    raise InvalidArgumentsError(f'Error: Duration "{duration}" is not a number of seconds')
+                # the window is bounded, so a forgotten profiler does not slow down the bot indefinitely
+                seconds = min(max(1.0, seconds), environment().profiler_max_duration)
+
+                self.__profiler = create_profiler(kind, self.shard.shard_id if self.shard else 0)
+                self.__profiler.start()
+                self.__profiler_timer = self.loop.call_later(seconds, self.__stop_profiler, context.channel)
+                self.logger.info(f'Profiler "{kind}" started for {seconds:.0f}s by "{user.name}"')
+                self.__reply(context, f'Profiler "{kind}" started for {seconds:.0f}s')
+            case 'stop':
+                if self.__stop_profiler(context.channel) is None:
+                    self.__reply(context, 'Profiler is not running')
+            case 'status':
+                if running:
+                    remaining = max(0.0, self.__profiler_timer.when() - self.loop.time())
+                    self.__reply(
+                        context,
+                        f'Profiler "{profiler.name}" is running ({profiler.elapsed:.0f}s, {remaining:.0f}s remaining)'
+                    )
+                else:
+                    self.__reply(context, 'Profiler is not running')
+            case _:
+                raise InvalidArgumentsError(f'Error: Method "{method}" is not a known method')
 
     @commands.command(name='version')
     async def version(self, context: commands.Context, user: twitchio.Chatter = None):
         user = user or context.author
         self.__require_roles(user, is_moderator=True)
 
-        await context.send(f'{appname} ({version})')
+        self.__reply(context, f'{appname} ({version})')
@@ -1,7 +1,7 @@
 from __future__ import annotations
 from functools import cached_property
 from os import environ
-from typing import Union
+from typing import Iterable, Union
 
 from tatc.core.constants import *
 from tatc.utilities import Boolean, String
@@ -33,6 +33,66 @@ class Environment:
     def command_prefix(self) -> str:
         return environ.get(COMMAND_PREFIX, '!')
 
+    @cached_property
+    def chat_message_limit(self) -> int:
+        return int(environ.get(CHAT_MESSAGE_LIMIT, '20'))
+
+    @cached_property
+    def chat_channel_message_limit(self) -> int:
+        return int(environ.get(CHAT_CHANNEL_MESSAGE_LIMIT, '20'))
+
+    @cached_property
+    def chat_message_deadline(self) -> float:
+        return float(environ.get(CHAT_MESSAGE_DEADLINE, '10'))
+
+    @cached_property
+    def configuration_sync_delay(self) -> float:
+        return float(environ.get(CONFIGURATION_SYNC_DELAY, '2'))
+
+    @cached_property
+    def shard_count(self) -> int:
+        return int(environ.get(SHARD_COUNT, '1'))
+
+    @cached_property
+    def metrics_port(self) -> int:
+        return int(environ.get(METRICS_PORT, '0'))
+
+    @cached_property
+    def metrics_file(self) -> str:
+        return environ.get(METRICS_FILE, '').strip()
+
+    @cached_property
+    def metrics_interval(self) -> float:
+        return float(environ.get(METRICS_INTERVAL, '15'))
+
+    @cached_property
+    def tracing_sample_rate(self) -> float:
+        return float(environ.get(TRACING_SAMPLE_RATE, '0'))
+
+    @cached_property
+    def tracing_file(self) -> str:
+        return environ.get(TRACING_FILE, 'traces.jsonl').strip()
+
+    @cached_property
+    def tracing_endpoint(self) -> str:
+        return environ.get(TRACING_ENDPOINT, '').strip()
+
+    @cached_property
+    def profiler_duration(self) -> float:
+        return float(environ.get(PROFILER_DURATION, '30'))
+
+    @cached_property
+    def profiler_max_duration(self) -> float:
+        return float(environ.get(PROFILER_MAX_DURATION, '300'))
+
+    @cached_property
+    def profiler_interval(self) -> float:
+        return float(environ.get(PROFILER_INTERVAL, '0.01'))
+
+    @cached_property
+    def logging_async(self) -> bool:
+        return Boolean.parse(environ.get(LOGGING_ASYNC, 'true'))
+
     @cached_property
     def logging_level(self) -> int:
         logging_level = environ.get(LOGGING_LEVEL, 'info').strip().lower()
@@ -65,6 +125,12 @@ class TatcApplicationConfiguration:
         """
         return list(self.__data.keys())
 
+    def update(self, data: dict[str, any]):
+        """
+        Replaces the configuration of the channels within the specified data
+        """
+        self.__data.update(data)
+
     def get_channel_configuration(self, channel: str) -> TatcChannelConfiguration:
         """
         Returns the per-channel configuration of the specified channel
@@ -73,11 +139,15 @@ class TatcApplicationConfiguration:
             self.__data.setdefault(channel, {})
         )
 
-    def to_dict(self) -> dict[str, any]:
+    def to_dict(self, channels: Iterable[str] = None) -> dict[str, any]:
         """
-        Returns the dict version of the configuration
+        Returns the dict version of the configuration, limited to the specified channels when specified
         """
-        return copy.deepcopy(self.__data)
+        if channels is None:
+            return copy.deepcopy(self.__data)
+        return {
+            channel: copy.deepcopy(self.__data[channel]) for channel in channels if channel in self.__data
+        }
 
 
 class TatcChannelConfiguration:
@@ -105,7 +175,7 @@ class TatcChannelConfiguration:
 
     @enabled.setter
     def enabled(self, value: bool | str | any):
-        self.__data.setdefault(DEBUG_MODE, Boolean.parse(value))
+        self.__data[ENABLED] = Boolean.parse(value)
 
     def get_module_configuration(self, __key: str, __type: type = None) -> dict[str, any] | any:
         data = self.__data.setdefault(__key, {})
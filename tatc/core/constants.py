@@ -6,3 +6,18 @@ DEBUG_MODE = 'debug_mode'
 PERMISSIONS = 'permissions'
 LOGGING_LEVEL = 'logging_level'
 COMMAND_PREFIX = 'command_prefix'
+CHAT_MESSAGE_LIMIT = 'chat_message_limit'
+CHAT_CHANNEL_MESSAGE_LIMIT = 'chat_channel_message_limit'
+CHAT_MESSAGE_DEADLINE = 'chat_message_deadline'
+CONFIGURATION_SYNC_DELAY = 'configuration_sync_delay'
+SHARD_COUNT = 'shard_count'
+LOGGING_ASYNC = 'logging_async'
+METRICS_PORT = 'metrics_port'
+METRICS_FILE = 'metrics_file'
+METRICS_INTERVAL = 'metrics_interval'
+TRACING_SAMPLE_RATE = 'tracing_sample_rate'
+TRACING_FILE = 'tracing_file'
+TRACING_ENDPOINT = 'tracing_endpoint'
+PROFILER_DURATION = 'profiler_duration'
+PROFILER_MAX_DURATION = 'profiler_max_duration'
+PROFILER_INTERVAL = 'profiler_interval'
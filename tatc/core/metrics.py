@@ -0,0 +1,369 @@
+from __future__ import annotations
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+import time
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        labels.append(extra)
+    return '{' + ','.join(labels) + '}' if labels else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """
+    A named metric, with its values kept per combination of label values
+    """
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()):
+        self.__name = name
+        self.__description = description
+        self.__labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def description(self) -> str:
+        return self.__description
+
+    @property
+    def labels(self) -> tuple[str, ...]:
+        return self.__labels
+
+    @property
+    def type(self) -> str:
+        raise NotImplementedError
+
+    def _label_values(self, values: tuple[str, ...]) -> tuple[str, ...]:
+        if len(values) != len(self.labels):
+            raise ValueError(f'"{self.name}" expects the labels {self.labels}, got: {values}')
+        return values
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        """
+        Returns the (suffix, labels, value) of every sample of the metric
+        """
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.type}']
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{labels} {_format_value(value)}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()):
+        super().__init__(name, description, labels)
+        self.__values: dict[tuple[str, ...], float] = {}
+
+    @property
+    def type(self) -> str:
+        return 'counter'
+
+    def inc(self, *labels: str, amount: float = 1):
+        key = self._label_values(labels)
+        with self._lock:
+            self.__values[key] = self.__values.get(key, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self.__values.get(self._label_values(labels), 0)
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        with self._lock:
+            values = list(self.__values.items())
+        if not values and not self.labels:
+            values = [((), 0)]
+        return [('', _format_labels(self.labels, key), value) for key, value in sorted(values)]
+
+
+class Histogram(Metric):
+    def __init__(self, name: str, description: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.__buckets = tuple(sorted(buckets))
+        self.__values: dict[tuple[str, ...], list] = {}
+
+    @property
+    def type(self) -> str:
+        return 'histogram'
+
+    @property
+    def buckets(self) -> tuple[float, ...]:
+        return self.__buckets
+
+    def observe(self, value: float, *labels: str):
+        key = self._label_values(labels)
+        index = bisect_left(self.__buckets, value)
+        with self._lock:
+            counts = self.__values.get(key)
+            if counts is None:
+                # the counts of each bucket, followed by the count and the sum of all observations
+                counts = self.__values[key] = [0] * (len(self.__buckets) + 1) + [0.0]
+            if index < len(self.__buckets):
+                counts[index] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        """
+        Observes the time in seconds spent within the context
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        counts = self.__values.get(self._label_values(labels))
+        return counts[-2] if counts else 0
+
+    def sum(self, *labels: str) -> float:
+        counts = self.__values.get(self._label_values(labels))
+        return counts[-1] if counts else 0.0
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        with self._lock:
+            values = [(key, counts.copy()) for key, counts in self.__values.items()]
+
+        samples = []
+        for key, counts in sorted(values):
+            cumulative = 0
+            for bucket, count in zip(self.__buckets, counts):
+                cumulative += count
+                samples.append(('_bucket', _format_labels(self.labels, key, f'le="{_format_value(bucket)}"'), cumulative))
+            samples.append(('_bucket', _format_labels(self.labels, key, 'le="+Inf"'), counts[-2]))
+            samples.append(('_count', _format_labels(self.labels, key), counts[-2]))
+            samples.append(('_sum', _format_labels(self.labels, key), counts[-1]))
+        return samples
+
+
+class CallbackMetric(Metric):
+    """
+    A metric whose values are read from its owner when collected, such as the depth of a queue;
+    the callback returns a single value, or the values by their label values
+    """
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        callback: Callable[[], float | dict[tuple[str, ...], float]],
+        labels: Iterable[str] = (),
+        type: str = 'gauge'
+    ):
+        super().__init__(name, description, labels)
+        self.__callback = callback
+        self.__type = type
+
+    @property
+    def type(self) -> str:
+        return self.__type
+
+    def samples(self) -> list[tuple[str, str, float]]:
+        values = self.__callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [('', _format_labels(self.labels, key), value) for key, value in sorted(values.items())]
+
+
+class MetricsRegistry:
+    """
+    The metrics of the application; registering a metric under an existing name returns the existing metric
+    """
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__metrics: dict[str, Metric] = {}
+
+    @property
+    def metrics(self) -> list[Metric]:
+        with self.__lock:
+            return list(self.__metrics.values())
+
+    def __register(self, metric: Metric) -> Metric:
+        with self.__lock:
+            return self.__metrics.setdefault(metric.name, metric)
+
+    def get(self, name: str) -> Metric | None:
+        return self.__metrics.get(name)
+
+    def counter(self, name: str, description: str, labels: Iterable[str] = ()) -> Counter:
+        return self.__register(Counter(name, description, labels))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labels: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.__register(Histogram(name, description, labels, buckets))
+
+    def callback(
+        self,
+        name: str,
+        description: str,
+        callback: Callable[[], float | dict[tuple[str, ...], float]],
+        labels: Iterable[str] = (),
+        type: str = 'gauge'
+    ) -> CallbackMetric:
+        """
+        Registers the metric read from the callback; the callback replaces the one of an existing metric
+        """
+        metric = CallbackMetric(name, description, callback, labels, type)
+        with self.__lock:
+            self.__metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format
+        """
+        return '\n'.join(metric.render() for metric in self.metrics) + '\n'
+
+
+class MetricsExporter:
+    """
+    Serves the metrics from a local HTTP endpoint at "/metrics", and/or writes them to a file periodically;
+    the metrics are read on the event loop, if specified, as their callbacks read state owned by the loop
+    """
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        port: int = 0,
+        file: str = None,
+        interval: float = 15,
+        loop: asyncio.AbstractEventLoop = None,
+        timeout: float = 5.0,
+        logger: logging.Logger = None
+    ):
+        self.__registry = registry
+        self.__port = port
+        self.__file = file
+        self.__interval = max(1.0, interval)
+        self.__loop = loop
+        self.__timeout = timeout
+        self.__logger = logger or logging.getLogger('NULL')
+        self.__server: ThreadingHTTPServer | None = None
+        self.__stopped = threading.Event()
+        self.__threads: list[threading.Thread] = []
+
+    @property
+    def logger(self) -> logging.Logger:
+        return self.__logger
+
+    @property
+    def enabled(self) -> bool:
+        return self.__port > 0 or bool(self.__file)
+
+    def render(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format, read on the event loop when it is running;
+        raises TimeoutError, when the loop does not read them within the timeout
+        """
+        loop = self.__loop
+        if loop is None or not loop.is_running():
+            return self.__registry.render()
+        try:
+            if asyncio.get_running_loop() is loop:
+                return self.__registry.render()
+        except RuntimeError:
+            pass
+
+        future = asyncio.run_coroutine_threadsafe(self.__render(), loop)
+        try:
+            return future.result(timeout=self.__timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f'Metrics were not read within {self.__timeout} seconds.') from None
+
+    async def __render(self) -> str:
+        return self.__registry.render()
+
+    def start(self):
+        if self.__port > 0:
+            exporter = self
+
+            class MetricsRequestHandler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split('?')[0] not in ['/', '/metrics']:
+                        self.send_error(404)
+                        return
+                    try:
+                        body = exporter.render().encode('utf-8')
+                    except TimeoutError as error:
+                        exporter.logger.error(f'Unable to serve metrics: {error}')
+                        self.send_error(503)
+                        return
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, format: str, *args):
+                    pass
+
+            try:
+                self.__server = ThreadingHTTPServer(('127.0.0.1', self.__port), MetricsRequestHandler)
+                self.__server.daemon_threads = True
+                self.__start_thread(self.__server.serve_forever, 'metrics-http')
+                self.logger.info(f'Serving metrics at "http://127.0.0.1:{self.__port}/metrics"')
+            except OSError as error:
+                self.logger.error(f'Unable to serve metrics on port {self.__port}: {error}')
+
+        if self.__file:
+            self.__start_thread(self.__run_writer, 'metrics-writer')
+            self.logger.info(f'Writing metrics to "{self.__file}" every {self.__interval} seconds')
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__server is not None:
+            self.__server.shutdown()
+            self.__server.server_close()
+            self.__server = None
+        if self.__file:
+            self.write()
+
+    def write(self):
+        temporary_file = f'{self.__file}.tmp'
+        try:
+            text = self.render()
+            with open(temporary_file, 'w') as fp:
+                fp.write(text)
+            os.replace(temporary_file, self.__file)
+        except (OSError, TimeoutError) as error:
+            self.logger.error(f'Unable to write metrics to "{self.__file}": {error}')
+
+    def __start_thread(self, target: Callable[[], None], name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self.__threads.append(thread)
+
+    def __run_writer(self):
+        while not self.__stopped.wait(self.__interval):
+            self.write()
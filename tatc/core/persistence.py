@@ -0,0 +1,139 @@
+from __future__ import annotations
+from collections.abc import Callable, Iterable
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+
+class ConfigurationWriter:
+    """
+    Persists the configuration of channels to a file; changes are collected per channel and coalesced over
+    the debounce window, and the file is replaced atomically away from the event loop.
+    """
+    def __init__(
+        self,
+        file: str,
+        snapshot: Callable[[Iterable[str] | None], dict[str, any]],
+        debounce: float = 2.0,
+        logger: logging.Logger = None
+    ):
+        self.__file = file
+        self.__snapshot = snapshot
+        self.__debounce = max(0.0, debounce)
+        self.__logger = logger or logging.getLogger('NULL')
+        self.__lock = threading.Lock()
+        self.__write_lock = threading.Lock()
+        self.__data: dict[str, any] | None = None
+        self.__version = 0
+        self.__written = 0
+        self.__dirty: set[str] = set()
+        self.__dirty_all = False
+        self.__handle: asyncio.TimerHandle | None = None
+        self.__writes = 0
+
+    @property
+    def logger(self) -> logging.Logger:
+        return self.__logger
+
+    @property
+    def file(self) -> str:
+        return self.__file
+
+    @property
+    def pending(self) -> bool:
+        """
+        Returns true, when there are changes not yet written; otherwise, false.
+        """
+        return self.__dirty_all or bool(self.__dirty)
+
+    @property
+    def writes(self) -> int:
+        """
+        The number of times the file has been written
+        """
+        return self.__writes
+
+    def mark_dirty(self, channel: str = None):
+        """
+        Marks the configuration of the specified channel, or all channels when unspecified, to be written.
+        Without a running event loop, the configuration is written immediately.
+        """
+        if channel is None:
+            self.__dirty_all = True
+        else:
+            self.__dirty.add(channel)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+
+        if self.__handle is None:
+            self.__handle = loop.call_later(self.__debounce, self.__flush_in_background, loop)
+
+    def flush(self):
+        """
+        Writes the pending changes immediately, on the calling thread
+        """
+        if self.__handle is not None:
+            self.__handle.cancel()
+            self.__handle = None
+        if self.pending:
+            self.__write(*self.__collect())
+
+    def __collect(self) -> tuple[int, dict[str, any]]:
+        # copies only the channels that changed since the last write, and must run on the thread making the changes
+        if self.__data is None or self.__dirty_all:
+            changes = self.__snapshot(None)
+            replace = True
+        else:
+            changes = self.__snapshot(self.__dirty)
+            replace = False
+        self.__dirty = set()
+        self.__dirty_all = False
+
+        # the channels are replaced, never changed in place, so a shallow copy is enough for the write;
+        # the lock is never held during a write, changes collected meanwhile do not wait on the disk
+        with self.__lock:
+            if replace or self.__data is None:
+                self.__data = changes
+            else:
+                self.__data.update(changes)
+            self.__version += 1
+            return self.__version, dict(self.__data)
+
+    def __flush_in_background(self, loop: asyncio.AbstractEventLoop):
+        self.__handle = None
+        if self.pending:
+            loop.run_in_executor(None, self.__write, *self.__collect())
+
+    def __write(self, version: int, data: dict[str, any]):
+        # writes are made one at a time, a write finishing after a newer one does not replace the newer file
+        with self.__write_lock:
+            if version <= self.__written:
+                return
+
+            directory, name = os.path.split(self.file)
+            temporary_file = None
+            try:
+                descriptor, temporary_file = tempfile.mkstemp(prefix=f'{name}.', suffix='.tmp', dir=directory or '.')
+                with os.fdopen(descriptor, 'w') as fp:
+                    json.dump(data, fp, indent=2)
+                    fp.flush()
+                    os.fsync(fp.fileno())
+                if os.path.exists(self.file):
+                    # the temporary file is only readable by its owner, the permissions of the file are kept
+                    shutil.copymode(self.file, temporary_file)
+                os.replace(temporary_file, self.file)
+                self.__written = version
+                self.__writes += 1
+            except OSError as error:
+                self.logger.error(f'Unable to save "{self.file}": {error}')
+                if temporary_file is not None and os.path.exists(temporary_file):
+                    os.remove(temporary_file)
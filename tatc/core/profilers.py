@@ -0,0 +1,150 @@
+from __future__ import annotations
+from collections import Counter
+from os import path
+
+import cProfile
+import os
+import sys
+import threading
+import time
+
+
+class Profiler:
+    """
+    Profiles the running bot between start() and stop(); save() writes the results to the file
+    """
+    extension = ''
+
+    def __init__(self, file: str):
+        self.__file = file
+        self.__started_at: float | None = None
+        self.__stopped_at: float | None = None
+
+    @property
+    def name(self) -> str:
+        raise NotImplementedError
+
+    @property
+    def file(self) -> str:
+        return self.__file
+
+    @property
+    def running(self) -> bool:
+        return self.__started_at is not None and self.__stopped_at is None
+
+    @property
+    def elapsed(self) -> float:
+        if self.__started_at is None:
+            return 0.0
+        return (self.__stopped_at or time.monotonic()) - self.__started_at
+
+    def start(self):
+        self.__started_at = time.monotonic()
+
+    def stop(self):
+        if self.running:
+            self.__stopped_at = time.monotonic()
+
+    def save(self) -> str:
+        """
+        Writes the results to the file, and returns the file
+        """
+        os.makedirs(path.dirname(self.file), exist_ok=True)
+        temporary_file = f'{self.file}.tmp'
+        self._write(temporary_file)
+        os.replace(temporary_file, self.file)
+        return self.file
+
+    def _write(self, file: str):
+        raise NotImplementedError
+
+
+class CProfileProfiler(Profiler):
+    """
+    Profiles every call made by the thread it is started from, the thread running the bot;
+    stop() must be called from the same thread. The results are written as pstats.
+    """
+    extension = 'pstats'
+
+    def __init__(self, file: str):
+        super().__init__(file)
+        self.__profile = cProfile.Profile()
+
+    @property
+    def name(self) -> str:
+        return 'cprofile'
+
+    def start(self):
+        super().start()
+        self.__profile.enable()
+
+    def stop(self):
+        if self.running:
+            self.__profile.disable()
+        super().stop()
+
+    def _write(self, file: str):
+        self.__profile.dump_stats(file)
+
+
+class SamplingProfiler(Profiler):
+    """
+    Samples the stacks of all threads at an interval from a background thread, so the bot is not slowed down
+    by each call; the results are written as collapsed stacks, the input of most flame graph tools
+    """
+    extension = 'folded'
+
+    def __init__(self, file: str, interval: float = 0.01):
+        super().__init__(file)
+        self.__interval = max(0.001, interval)
+        self.__stacks: Counter[str] = Counter()
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name='profiler-sampling', daemon=True)
+
+    @property
+    def name(self) -> str:
+        return 'sampling'
+
+    @property
+    def interval(self) -> float:
+        return self.__interval
+
+    @property
+    def samples(self) -> int:
+        return sum(self.__stacks.values())
+
+    def start(self):
+        super().start()
+        self.__thread.start()
+
+    def stop(self):
+        super().stop()
+        self.__stopped.set()
+
+    def _write(self, file: str):
+        self.__thread.join()
+        with open(file, 'w', encoding='utf-8') as fp:
+            for stack, count in self.__stacks.most_common():
+                fp.write(f'{stack} {count}\n')
+
+    def __run(self):
+        current = threading.get_ident()
+        while not self.__stopped.wait(self.__interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == current:
+                    continue
+
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f'{code.co_name} ({path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                self.__stacks[';'.join(reversed(frames))] += 1
+
+
+PROFILERS = {
+    'cprofile': CProfileProfiler,
+    'sampling': SamplingProfiler
+}
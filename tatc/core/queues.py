@@ -0,0 +1,215 @@
+from __future__ import annotations
+from collections import deque
+from collections.abc import Awaitable, Callable
+
+import asyncio
+import logging
+import random
+import time
+
+
+class IngestQueue:
+    """
+    Bounded queue of work of a single channel, processed by a limited number of workers.
+    When the queue is full, work is shed according to the policy:
+        drop_oldest - the oldest pending work is dropped in favour of the new work
+        drop_newest - the new work is dropped
+        sample      - the pending work is kept as a uniform sample of everything received while full
+    Every work shed, whether new or already queued, is reported to on_drop with the reason it was shed.
+    Errors raised by the handler are reported to on_error, or logged with their traceback when unspecified.
+    """
+    POLICY_DROP_OLDEST = 'drop_oldest'
+    POLICY_DROP_NEWEST = 'drop_newest'
+    POLICY_SAMPLE = 'sample'
+    POLICIES = [POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_SAMPLE]
+
+    DROP_FULL = 'full'
+    DROP_EXPIRED = 'expired'
+    DROP_CANCELLED = 'cancelled'
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[any], Awaitable],
+        max_size: int = 50,
+        policy: str = POLICY_DROP_OLDEST,
+        concurrency: int = 1,
+        max_age: float = 0,
+        on_drop: Callable[[any, str], None] = None,
+        on_error: Callable[[any, Exception], None] = None,
+        logger: logging.Logger = None
+    ):
+        if policy not in IngestQueue.POLICIES:
+            raise ValueError(f'Unknown policy: "{policy}"')
+
+        self.__name = name
+        self.__handler = handler
+        self.__max_size = max(1, max_size)
+        self.__policy = policy
+        self.__concurrency = max(1, concurrency)
+        self.__max_age = max_age if max_age and max_age > 0 else None
+        self.__on_drop = on_drop
+        self.__on_error = on_error
+        self.__logger = logger or logging.getLogger('NULL')
+        self.__items: deque[tuple[float, any]] = deque()
+        self.__available = asyncio.Event()
+        self.__idle = asyncio.Event()
+        self.__idle.set()
+        self.__workers: list[asyncio.Task] = []
+        self.__active = 0
+        self.__overflow = 0
+        self.__processed = 0
+        self.__dropped = 0
+        self.__last_wait = 0.0
+        self.__max_wait = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def logger(self) -> logging.Logger:
+        return self.__logger
+
+    @property
+    def policy(self) -> str:
+        return self.__policy
+
+    @property
+    def depth(self) -> int:
+        """
+        The number of pending work
+        """
+        return len(self.__items)
+
+    @property
+    def processed(self) -> int:
+        return self.__processed
+
+    @property
+    def dropped(self) -> int:
+        """
+        The number of work shed, either because the queue was full or the work was too old
+        """
+        return self.__dropped
+
+    @property
+    def oldest_age(self) -> float:
+        """
+        The time in seconds the oldest pending work has been waiting
+        """
+        return time.monotonic() - self.__items[0][0] if self.__items else 0.0
+
+    @property
+    def last_wait(self) -> float:
+        """
+        The time in seconds the most recently started work had waited in the queue
+        """
+        return self.__last_wait
+
+    @property
+    def max_wait(self) -> float:
+        """
+        The longest time in seconds any started work had waited in the queue
+        """
+        return self.__max_wait
+
+    def put(self, item: any) -> bool:
+        """
+        Queues the work, returns false when the work is shed instead; queued work evicted to make room
+        is only reported to on_drop
+        """
+        if not self.__workers:
+            loop = asyncio.get_running_loop()
+            self.__workers = [loop.create_task(self.__work()) for _ in range(self.__concurrency)]
+
+        entry = (time.monotonic(), item)
+        accepted = True
+        dropped = None
+        if len(self.__items) >= self.__max_size:
+            self.__overflow += 1
+            match self.policy:
+                case IngestQueue.POLICY_DROP_OLDEST:
+                    dropped = self.__items.popleft()[1]
+                    self.__items.append(entry)
+                case IngestQueue.POLICY_DROP_NEWEST:
+                    accepted = False
+                case IngestQueue.POLICY_SAMPLE:
+                    # reservoir sampling over the burst, chronological order is kept
+                    if random.randrange(self.__max_size + self.__overflow) < self.__max_size:
+                        index = random.randrange(len(self.__items))
+                        dropped = self.__items[index][1]
+                        del self.__items[index]
+                        self.__items.append(entry)
+                    else:
+                        accepted = False
+            self.__drop(item if not accepted else dropped, IngestQueue.DROP_FULL)
+        else:
+            self.__overflow = 0
+            self.__items.append(entry)
+
+        if accepted:
+            self.__idle.clear()
+            self.__available.set()
+        return accepted
+
+    def __drop(self, item: any, reason: str):
+        self.__dropped += 1
+        if self.__on_drop is None:
+            return
+        try:
+            self.__on_drop(item, reason)
+        except Exception:
+            self.logger.exception(f'Unable to report the work shed from "{self.name}"')
+
+    def __error(self, item: any, error: Exception):
+        if self.__on_error is None:
+            self.logger.exception(f'Unable to process the work of "{self.name}"', exc_info=error)
+            return
+        try:
+            self.__on_error(item, error)
+        except Exception:
+            self.logger.exception(f'Unable to report the error of the work of "{self.name}"')
+
+    async def join(self):
+        """
+        Waits until all pending work is processed
+        """
+        await self.__idle.wait()
+
+    def cancel(self):
+        """
+        Stops the workers, the work being processed is cancelled and the pending work is reported to on_drop
+        """
+        for worker in self.__workers:
+            worker.cancel()
+        self.__workers = []
+        while self.__items:
+            self.__drop(self.__items.popleft()[1], IngestQueue.DROP_CANCELLED)
+        self.__idle.set()
+
+    async def __work(self):
+        while True:
+            if not self.__items:
+                if not self.__active:
+                    self.__idle.set()
+                self.__available.clear()
+                await self.__available.wait()
+                continue
+
+            enqueued_at, item = self.__items.popleft()
+            wait = time.monotonic() - enqueued_at
+            if self.__max_age is not None and wait > self.__max_age:
+                self.__drop(item, IngestQueue.DROP_EXPIRED)
+                continue
+
+            self.__last_wait = wait
+            self.__max_wait = max(self.__max_wait, wait)
+            self.__active += 1
+            try:
+                await self.__handler(item)
+            except Exception as error:
+                self.__error(item, error)
+            finally:
+                self.__active -= 1
+                self.__processed += 1
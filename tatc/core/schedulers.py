@@ -0,0 +1,241 @@
+from __future__ import annotations
+from collections import deque
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+
+class SlidingWindowLimit:
+    """
+    Allows up to the limit of messages within any window of the specified period, by keeping the time of each
+    message sent within the last period. A limit of zero or less is treated as unlimited.
+    """
+    def __init__(self, limit: int, period: float):
+        self.__limit = limit
+        self.__period = period
+        self.__sent_at: deque[float] = deque()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.__limit <= 0 or self.__period <= 0
+
+    def __expire(self, now: float):
+        while self.__sent_at and now - self.__sent_at[0] >= self.__period:
+            self.__sent_at.popleft()
+
+    def delay(self, now: float) -> float:
+        """
+        Returns the time in seconds until a message may be sent
+        """
+        if self.unlimited:
+            return 0.0
+        self.__expire(now)
+        if len(self.__sent_at) < self.__limit:
+            return 0.0
+        # computed as in __expire, so the delay is never zero while the window is full
+        return self.__period - (now - self.__sent_at[0])
+
+    def consume(self, now: float):
+        if self.unlimited:
+            return
+        self.__expire(now)
+        self.__sent_at.append(now)
+
+
+class OutboundMessage:
+    def __init__(self, channel: any, content: str, priority: int, deadline: float | None, future: asyncio.Future):
+        self.__channel = channel
+        self.__content = content
+        self.__priority = priority
+        self.__deadline = deadline
+        self.__future = future
+
+    @property
+    def channel(self) -> any:
+        return self.__channel
+
+    @property
+    def content(self) -> str:
+        return self.__content
+
+    @property
+    def priority(self) -> int:
+        return self.__priority
+
+    @property
+    def deadline(self) -> float | None:
+        return self.__deadline
+
+    @property
+    def future(self) -> asyncio.Future:
+        return self.__future
+
+    def is_stale(self, now: float) -> bool:
+        return self.deadline is not None and self.deadline < now
+
+
+class OutboundScheduler:
+    """
+    Sends chat messages within the per-channel and global message budgets of Twitch.
+    Pending messages are sent by priority then by age, and messages past their deadline are dropped.
+    """
+    PRIORITY_COMMAND = 0
+    PRIORITY_MESSAGE = 1
+
+    def __init__(
+        self,
+        channel_limit: int = 20,
+        global_limit: int = 20,
+        period: float = 30.0,
+        message_deadline: float = 10.0,
+        logger: logging.Logger = None
+    ):
+        self.__channel_limit = channel_limit
+        self.__period = period
+        self.__message_deadline = message_deadline if message_deadline and message_deadline > 0 else None
+        self.__global_limit = SlidingWindowLimit(global_limit, period)
+        self.__channel_limits: dict[str, SlidingWindowLimit] = {}
+        self.__queues: dict[str, list[tuple[int, int, OutboundMessage]]] = {}
+        self.__sequence = itertools.count()
+        self.__sent: dict[str, int] = {}
+        self.__dropped: dict[str, int] = {}
+        self.__wakeup = asyncio.Event()
+        self.__task: asyncio.Task | None = None
+        self.__logger = logger or logging.getLogger('NULL')
+
+    @property
+    def logger(self) -> logging.Logger:
+        return self.__logger
+
+    @property
+    def message_deadline(self) -> float | None:
+        """
+        The time in seconds a message of non-command priority may wait before it is dropped
+        """
+        return self.__message_deadline
+
+    @property
+    def queue_depths(self) -> dict[str, int]:
+        """
+        Returns the number of pending messages of each channel
+        """
+        return {channel: len(queue) for channel, queue in list(self.__queues.items())}
+
+    @property
+    def sent(self) -> dict[str, int]:
+        """
+        Returns the number of messages sent to each channel
+        """
+        return self.__sent.copy()
+
+    @property
+    def dropped(self) -> dict[str, int]:
+        """
+        Returns the number of stale messages dropped for each channel
+        """
+        return self.__dropped.copy()
+
+    def enqueue(
+        self,
+        channel: any,
+        content: str,
+        priority: int = PRIORITY_MESSAGE,
+        deadline: float = None
+    ) -> asyncio.Future:
+        """
+        Queues the content to be sent to the specified channel, the returned future resolves to true once sent;
+        otherwise, false when the message is dropped. Messages of non-command priority use the default deadline,
+        unless a deadline (in seconds) is specified.
+        """
+        loop = asyncio.get_running_loop()
+        if self.__task is None or self.__task.done():
+            self.__task = loop.create_task(self.__dispatch())
+
+        if deadline is None and priority != OutboundScheduler.PRIORITY_COMMAND:
+            deadline = self.message_deadline
+        message = OutboundMessage(
+            channel=channel,
+            content=content,
+            priority=priority,
+            deadline=None if deadline is None else time.monotonic() + deadline,
+            future=loop.create_future()
+        )
+        heapq.heappush(
+            self.__queues.setdefault(channel.name, []),
+            (priority, next(self.__sequence), message)
+        )
+        self.__wakeup.set()
+        return message.future
+
+    async def join(self):
+        """
+        Waits until every message queued so far is either sent or dropped
+        """
+        futures = [message.future for queue in self.__queues.values() for _, _, message in queue]
+        if futures:
+            await asyncio.gather(*futures, return_exceptions=True)
+
+    def __channel_window(self, channel_name: str) -> SlidingWindowLimit:
+        window = self.__channel_limits.get(channel_name)
+        if window is None:
+            window = self.__channel_limits[channel_name] = SlidingWindowLimit(self.__channel_limit, self.__period)
+        return window
+
+    def __drop_stale(self, now: float):
+        for channel_name, queue in self.__queues.items():
+            if not any(message.is_stale(now) for _, _, message in queue):
+                continue
+            pending = []
+            for entry in queue:
+                message = entry[2]
+                if message.is_stale(now):
+                    self.__dropped[channel_name] = self.__dropped.get(channel_name, 0) + 1
+                    if not message.future.done():
+                        message.future.set_result(False)
+                else:
+                    pending.append(entry)
+            heapq.heapify(pending)
+            self.__queues[channel_name] = pending
+            self.logger.debug(f'Dropped {len(queue) - len(pending)} stale messages for "{channel_name}"')
+
+    async def __dispatch(self):
+        while True:
+            now = time.monotonic()
+            self.__drop_stale(now)
+
+            candidate = None
+            wait = None
+            global_delay = self.__global_limit.delay(now)
+            for channel_name, queue in self.__queues.items():
+                if not queue:
+                    continue
+                delay = max(global_delay, self.__channel_window(channel_name).delay(now))
+                if delay > 0:
+                    wait = delay if wait is None else min(wait, delay)
+                    continue
+                if candidate is None or queue[0] < self.__queues[candidate][0]:
+                    candidate = channel_name
+
+            if candidate is None:
+                self.__wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.__wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, message = heapq.heappop(self.__queues[candidate])
+            self.__global_limit.consume(now)
+            self.__channel_window(candidate).consume(now)
+            try:
+                await message.channel.send(message.content)
+                self.__sent[candidate] = self.__sent.get(candidate, 0) + 1
+                if not message.future.done():
+                    message.future.set_result(True)
+            except Exception as error:
+                self.logger.error(error)
+                if not message.future.done():
+                    message.future.set_result(False)
@@ -0,0 +1,227 @@
+from __future__ import annotations
+from bisect import bisect
+from collections.abc import Callable
+
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import queue
+import time
+
+
+ROUTE_JOIN = 'join'
+ROUTE_LEAVE = 'leave'
+CONFIGURATION = 'configuration'
+
+
+def _hash(value: str) -> int:
+    # hash() is randomized per process, so a stable digest is used to agree on the owners across processes
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class ConsistentHashRing:
+    """
+    Maps channels to shards, adding or removing a shard only moves the channels of that shard
+    """
+    def __init__(self, shard_count: int, replicas: int = 100):
+        self.__shard_count = max(1, shard_count)
+        points = sorted(
+            (_hash(f'shard-{shard_id}:{replica}'), shard_id)
+            for shard_id in range(self.__shard_count)
+            for replica in range(replicas)
+        )
+        self.__keys = [key for key, _ in points]
+        self.__shards = [shard_id for _, shard_id in points]
+
+    @property
+    def shard_count(self) -> int:
+        return self.__shard_count
+
+    def shard_of(self, channel: str) -> int:
+        """
+        Returns the shard that owns the specified channel
+        """
+        index = bisect(self.__keys, _hash(channel.strip().lower())) % len(self.__keys)
+        return self.__shards[index]
+
+
+class ShardContext:
+    """
+    The shard a bot process is running as, and its channels to the supervisor
+    """
+    def __init__(self, shard_id: int, shard_count: int, inbox: multiprocessing.Queue, outbox: multiprocessing.Queue):
+        self.__shard_id = shard_id
+        self.__shard_count = shard_count
+        self.__inbox = inbox
+        self.__outbox = outbox
+        self.__ring = None
+        self.__stopped = False
+
+    @property
+    def shard_id(self) -> int:
+        return self.__shard_id
+
+    @property
+    def shard_count(self) -> int:
+        return self.__shard_count
+
+    @property
+    def ring(self) -> ConsistentHashRing:
+        if self.__ring is None:
+            self.__ring = ConsistentHashRing(self.shard_count)
+        return self.__ring
+
+    def owns(self, channel: str) -> bool:
+        """
+        Returns true, when the specified channel is owned by the current shard; otherwise, false.
+        """
+        return self.ring.shard_of(channel) == self.shard_id
+
+    def route(self, kind: str, channel: str):
+        """
+        Sends the request of the specified channel to the shard owning the channel
+        """
+        self.__outbox.put((kind, channel, None))
+
+    def publish_configuration(self, channel: str, data: dict[str, any]):
+        """
+        Sends the configuration of the specified channel to the supervisor to be saved
+        """
+        self.__outbox.put((CONFIGURATION, channel, data))
+
+    def receive(self, timeout: float = 0.5) -> tuple[str, str] | None:
+        """
+        Waits for a request routed to the current shard, returns none once the shard is stopped;
+        the inbox is polled, so the thread waiting is never left blocked when the process exits
+        """
+        while not self.__stopped:
+            try:
+                kind, channel, _ = self.__inbox.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            return kind, channel
+        return None
+
+    def stop(self):
+        """
+        Stops receiving the requests routed to the current shard
+        """
+        self.__stopped = True
+
+
+class ShardSupervisor:
+    """
+    Runs each shard in its own process, routes requests to the shards owning the channels,
+    and saves the configuration published by the shards; a shard that exits is restarted,
+    and the shards are terminated, then joined, when the supervisor stops
+    """
+    def __init__(
+        self,
+        shard_count: int,
+        target: Callable[[ShardContext], None],
+        on_configuration: Callable[[str, dict[str, any]], None],
+        restart_delay: float = 5.0,
+        stop_timeout: float = 10.0,
+        logger: logging.Logger = None
+    ):
+        self.__shard_count = max(1, shard_count)
+        self.__target = target
+        self.__on_configuration = on_configuration
+        self.__restart_delay = max(0.0, restart_delay)
+        self.__stop_timeout = max(0.0, stop_timeout)
+        self.__ring = ConsistentHashRing(self.__shard_count)
+        self.__logger = logger or logging.getLogger('NULL')
+
+    @property
+    def logger(self) -> logging.Logger:
+        return self.__logger
+
+    def run(self):
+        """
+        Runs the shards until the supervisor is stopped, such as by SystemExit raised by a signal handler
+        """
+        context = multiprocessing.get_context('spawn')
+        control = context.Queue()
+        inboxes = [context.Queue() for _ in range(self.__shard_count)]
+        processes = [self.__start(context, shard_id, inboxes[shard_id], control) for shard_id in range(self.__shard_count)]
+        try:
+            asyncio.run(self.__route(context, control, inboxes, processes))
+        finally:
+            self.__stop(processes)
+
+    def __start(
+        self,
+        context: multiprocessing.context.BaseContext,
+        shard_id: int,
+        inbox: multiprocessing.Queue,
+        control: multiprocessing.Queue
+    ) -> multiprocessing.Process:
+        process = context.Process(
+            target=self.__target,
+            args=(ShardContext(shard_id, self.__shard_count, inbox, control),),
+            name=f'tatc-shard-{shard_id}'
+        )
+        process.start()
+        self.logger.info(f'Shard started: "{process.name}" (pid={process.pid})')
+        return process
+
+    def __stop(self, processes: list[multiprocessing.Process]):
+        # SIGTERM lets each shard close its bot and flush its pending state, a shard that does not exit in time is killed
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.__stop_timeout
+        for process in processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                self.logger.warning(f'Shard did not stop within {self.__stop_timeout} seconds: "{process.name}"')
+                process.kill()
+                process.join()
+            self.logger.info(f'Shard exited: "{process.name}" (exitcode={process.exitcode})')
+
+    def __restart(
+        self,
+        context: multiprocessing.context.BaseContext,
+        control: multiprocessing.Queue,
+        inboxes: list[multiprocessing.Queue],
+        processes: list[multiprocessing.Process],
+        restarts: dict[int, float]
+    ):
+        # the requests routed to a shard wait in its inbox until the shard is restarted
+        for shard_id, process in enumerate(processes):
+            if process.is_alive():
+                continue
+            if shard_id not in restarts:
+                self.logger.warning(f'Shard exited: "{process.name}" (exitcode={process.exitcode}), restarting')
+                restarts[shard_id] = time.monotonic() + self.__restart_delay
+            if time.monotonic() >= restarts[shard_id]:
+                del restarts[shard_id]
+                processes[shard_id] = self.__start(context, shard_id, inboxes[shard_id], control)
+
+    async def __route(
+        self,
+        context: multiprocessing.context.BaseContext,
+        control: multiprocessing.Queue,
+        inboxes: list[multiprocessing.Queue],
+        processes: list[multiprocessing.Process]
+    ):
+        loop = asyncio.get_running_loop()
+        restarts: dict[int, float] = {}
+        while True:
+            self.__restart(context, control, inboxes, processes, restarts)
+            try:
+                kind, channel, data = await loop.run_in_executor(None, control.get, True, 1.0)
+            except queue.Empty:
+                continue
+
+            match kind:
+                case 'join' | 'leave':
+                    shard_id = self.__ring.shard_of(channel)
+                    self.logger.info(f'Routing "{kind}" of "{channel}" to shard {shard_id}')
+                    inboxes[shard_id].put((kind, channel, None))
+                case 'configuration':
+                    self.__on_configuration(channel, data)
+                case _:
+                    self.logger.warning(f'Unknown request "{kind}" for "{channel}"')
@@ -0,0 +1,302 @@
+from __future__ import annotations
+from contextvars import ContextVar
+
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.request
+
+
+_CURRENT_SPAN_: ContextVar[Span | None] = ContextVar('tatc_current_span', default=None)
+
+
+class Span:
+    """
+    A timed stage of a trace; entering the span makes it the parent of the spans started within it,
+    including in the tasks and worker threads started from it with a copy of the context
+    """
+    def __init__(
+        self,
+        tracer: Tracer,
+        name: str,
+        trace_id: str,
+        parent_id: str = None,
+        start_time: int = None,
+        attributes: dict[str, any] = None
+    ):
+        self.__tracer = tracer
+        self.__name = name
+        self.__trace_id = trace_id
+        self.__span_id = f'{random.getrandbits(64):016x}'
+        self.__parent_id = parent_id
+        self.__start_time = start_time or time.time_ns()
+        self.__end_time = None
+        self.__attributes = attributes or {}
+        self.__tokens = []
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def trace_id(self) -> str:
+        return self.__trace_id
+
+    @property
+    def span_id(self) -> str:
+        return self.__span_id
+
+    @property
+    def parent_id(self) -> str | None:
+        return self.__parent_id
+
+    @property
+    def start_time(self) -> int:
+        """
+        The time the span started, in nanoseconds since the epoch
+        """
+        return self.__start_time
+
+    @property
+    def end_time(self) -> int | None:
+        return self.__end_time
+
+    @property
+    def attributes(self) -> dict[str, any]:
+        return self.__attributes
+
+    def set_attribute(self, key: str, value: any):
+        self.__attributes[key] = value
+
+    def child(self, name: str, start_time: int = None, **attributes) -> Span:
+        return Span(self.__tracer, name, self.trace_id, self.span_id, start_time, attributes)
+
+    def end(self, **attributes):
+        if self.__end_time is not None:
+            return
+        self.__attributes.update(attributes)
+        self.__end_time = time.time_ns()
+        self.__tracer.export(self)
+
+    def to_dict(self) -> dict[str, any]:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'duration_ms': (self.end_time - self.start_time) / 1e6 if self.end_time else None,
+            'attributes': self.attributes
+        }
+
+    def __enter__(self) -> Span:
+        self.__tokens.append(_CURRENT_SPAN_.set(self))
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        _CURRENT_SPAN_.reset(self.__tokens.pop())
+        if error is not None:
+            self.set_attribute('error', f'{error_type.__name__}: {error}')
+        self.end()
+
+
+class _NoSpan:
+    """
+    Stands in for a span of a message that is not sampled, so tracing costs next to nothing
+    """
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, error_type, error, traceback):
+        return None
+
+
+NO_SPAN = _NoSpan()
+
+
+def current_span() -> Span | None:
+    """
+    Returns the span of the current context, if the current message is sampled
+    """
+    return _CURRENT_SPAN_.get()
+
+
+def span(name: str, **attributes) -> Span | _NoSpan:
+    """
+    Returns a child span of the current span, to be used as a context manager
+    """
+    parent = _CURRENT_SPAN_.get()
+    return NO_SPAN if parent is None else parent.child(name, **attributes)
+
+
+class Tracer:
+    """
+    Starts traces for a sampled share of the messages, and hands the ended spans to the exporter
+    """
+    def __init__(self, sample_rate: float, exporter: SpanExporter = None):
+        self.__sample_rate = min(max(0.0, sample_rate), 1.0)
+        self.__exporter = exporter if self.__sample_rate > 0 else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.__exporter is not None
+
+    @property
+    def sample_rate(self) -> float:
+        return self.__sample_rate
+
+    def start_trace(self, name: str, **attributes) -> Span | None:
+        """
+        Returns the root span of a new trace, or none when the trace is not sampled
+        """
+        if self.__exporter is None or random.random() >= self.__sample_rate:
+            return None
+        return Span(self, name, f'{random.getrandbits(128):032x}', attributes=attributes)
+
+    def export(self, span: Span):
+        if self.__exporter is not None:
+            self.__exporter.submit(span)
+
+
+class SpanExporter:
+    """
+    Exports the ended spans in batches from a background thread, the remaining spans are exported when closed
+    """
+    def __init__(self, batch_size: int = 100, interval: float = 5.0, logger: logging.Logger = None):
+        self.__batch_size = max(1, batch_size)
+        self.__interval = max(0.1, interval)
+        self.__logger = logger or logging.getLogger('NULL')
+        self.__queue = queue.SimpleQueue()
+        self.__closed = False
+        self.__thread = threading.Thread(target=self.__run, name='tracing-exporter', daemon=True)
+        self.__thread.start()
+
+    @property
+    def logger(self) -> logging.Logger:
+        return self.__logger
+
+    def submit(self, span: Span):
+        if not self.__closed:
+            self.__queue.put(span)
+
+    def close(self):
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__queue.put(None)
+        self.__thread.join()
+
+    def export(self, spans: list[Span]):
+        raise NotImplementedError
+
+    def __run(self):
+        running = True
+        while running:
+            spans = []
+            deadline = time.monotonic() + self.__interval
+            while len(spans) < self.__batch_size:
+                try:
+                    span = self.__queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    running = False
+                    break
+                spans.append(span)
+
+            if spans:
+                try:
+                    self.export(spans)
+                except Exception as error:
+                    self.logger.error(f'Unable to export {len(spans)} spans: {error}')
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """
+    Appends each span as a line of JSON to a local file
+    """
+    def __init__(self, file: str, batch_size: int = 100, interval: float = 5.0, logger: logging.Logger = None):
+        self.__file = file
+        super().__init__(batch_size, interval, logger)
+
+    @property
+    def file(self) -> str:
+        return self.__file
+
+    def export(self, spans: list[Span]):
+        # a batch is appended with a single write, so the lines of several processes are not interleaved
+        data = ''.join(json.dumps(span.to_dict(), default=str) + '\n' for span in spans)
+        with open(self.file, 'a', encoding='utf-8') as fp:
+            fp.write(data)
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """
+    Posts the spans to an OpenTelemetry collector, using OTLP over HTTP with JSON encoding
+    """
+    def __init__(
+        self,
+        endpoint: str,
+        service_name: str = 'tatc',
+        batch_size: int = 100,
+        interval: float = 5.0,
+        timeout: float = 5.0,
+        logger: logging.Logger = None
+    ):
+        self.__endpoint = endpoint
+        self.__service_name = service_name
+        self.__timeout = timeout
+        super().__init__(batch_size, interval, logger)
+
+    @property
+    def endpoint(self) -> str:
+        return self.__endpoint
+
+    def __attributes(self, attributes: dict[str, any]) -> list[dict[str, any]]:
+        values = []
+        for key, value in attributes.items():
+            match value:
+                case bool():
+                    values.append({'key': key, 'value': {'boolValue': value}})
+                case int():
+                    values.append({'key': key, 'value': {'intValue': str(value)}})
+                case float():
+                    values.append({'key': key, 'value': {'doubleValue': value}})
+                case _:
+                    values.append({'key': key, 'value': {'stringValue': str(value)}})
+        return values
+
+    def export(self, spans: list[Span]):
+        body = {
+            'resourceSpans': [{
+                'resource': {'attributes': self.__attributes({'service.name': self.__service_name})},
+                'scopeSpans': [{
+                    'scope': {'name': 'tatc'},
+                    'spans': [
+                        {
+                            'traceId': span.trace_id,
+                            'spanId': span.span_id,
+                            'parentSpanId': span.parent_id or '',
+                            'name': span.name,
+                            'kind': 1,
+                            'startTimeUnixNano': str(span.start_time),
+                            'endTimeUnixNano': str(span.end_time),
+                            'attributes': self.__attributes(span.attributes)
+                        }
+                        for span in spans
+                    ]
+                }]
+            }]
+        }
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(body).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.__timeout) as response:
+            response.read()
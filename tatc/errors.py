@@ -16,3 +16,13 @@ class InvalidArgumentsError(Exception):
 class ModuleNotEnabledError(Exception):
     def __init__(self, message: str = None):
         super().__init__(message)
+
+
+class TranslationTimeoutError(Exception):
+    def __init__(self, message: str = None):
+        super().__init__(message)
+
+
+class TranslationUnavailableError(Exception):
+    def __init__(self, message: str = None):
+        super().__init__(message)
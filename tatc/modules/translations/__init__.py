@@ -1,15 +1,32 @@
-from twitchio import Message
+from twitchio import Channel, Message
 from twitchio.ext import commands
 
-from tatc.core import TatcChannelModule, TatcApplicationConfiguration, TatcModuleConfiguration, get_logger
+from tatc.core import TatcChannelModule, TatcApplicationConfiguration, TatcModuleConfiguration, get_logger, get_metrics, get_tracer
+from tatc.core.queues import IngestQueue
+from tatc.core.tracing import Span, current_span, span
 from tatc.errors import ModuleNotEnabledError
 from tatc.modules.translations.constants import *
-from tatc.modules.translations.configurations import TatcTranslationModuleConfiguration, environment
+from tatc.modules.translations.configurations import TatcTranslationModuleConfiguration, TatcTranslationModuleSettings, environment
+from tatc.modules.translations.internal.executors import get_async_translator
 from tatc.modules.translations.internal.models import get_language_detection_model
-from tatc.modules.translations.internal.translators import get_translator
-from tatc.modules.translations.utilities import Twitch, TwitchEmote
+from tatc.modules.translations.utilities import MessageSanitizer, Twitch, TwitchEmote
+from tatc.utilities import String
 
-import re
+from functools import partial
+
+import asyncio
+import logging
+
+
+MESSAGES_RECEIVED = get_metrics().counter(
+    'tatc_messages_received_total', 'Chat messages received by the translations module', ['channel']
+)
+MESSAGES_SKIPPED = get_metrics().counter(
+    'tatc_messages_skipped_total', 'Chat messages not translated, by the reason they were skipped', ['channel', 'reason']
+)
+DETECTION_SECONDS = get_metrics().histogram(
+    'tatc_detection_seconds', 'Time spent detecting the language of a chat message, including time spent in a batch'
+)
 
 
 class TatcTranslationModule(TatcChannelModule, commands.Cog):
@@ -22,57 +39,202 @@ class TatcTranslationModule(TatcChannelModule, commands.Cog):
             name=TRANSLATIONS,
             logger=get_logger(TRANSLATIONS)
         )
+        self.__pending: dict[str, list[tuple[str, Span | None]]] = {}
+        self.__ingest_queues: dict[str, IngestQueue] = {}
+        self.__settings: dict[str, TatcTranslationModuleSettings] = {}
+        get_metrics().callback(
+            'tatc_ingest_queue_depth', 'Chat messages waiting to be translated',
+            lambda: {(channel,): queue.depth for channel, queue in self.ingest_queues.items()},
+            labels=['channel']
+        )
 
     def get_module_configuration(self, channel_name) -> TatcTranslationModuleConfiguration:
         return TatcTranslationModuleConfiguration(
             self._configurations.get_channel_configuration(channel_name)
         )
 
+    def get_module_settings(self, channel_name: str) -> TatcTranslationModuleSettings:
+        """
+        Returns the immutable snapshot of the configuration of the specified channel
+        """
+        settings = self.__settings.get(channel_name)
+        if settings is None:
+            settings = self.__settings[channel_name] = TatcTranslationModuleSettings(
+                self.get_module_configuration(channel_name)
+            )
+        return settings
+
+    def configuration_changed(self, channel_name: str):
+        self.__settings.pop(channel_name, None)
+
+    def loaded(self):
+        if environment().language_detection_preload:
+            get_language_detection_model()
+
+    def channel_left(self, channel_name: str):
+        # the messages still waiting are shed, and the workers of the channel are stopped
+        queue = self.__ingest_queues.get(channel_name)
+        if queue is not None:
+            queue.cancel()
+            del self.__ingest_queues[channel_name]
+        self.__settings.pop(channel_name, None)
+
+    @property
+    def ingest_queues(self) -> dict[str, IngestQueue]:
+        """
+        Returns the queues of chat messages waiting to be translated, by channel
+        """
+        return self.__ingest_queues.copy()
+
+    def __ingest_queue(self, channel_name: str) -> IngestQueue:
+        queue = self.__ingest_queues.get(channel_name)
+        if queue is None:
+            queue = self.__ingest_queues[channel_name] = IngestQueue(
+                name=channel_name,
+                handler=self.__translate,
+                max_size=environment().ingest_queue_size,
+                policy=environment().ingest_queue_policy,
+                concurrency=environment().ingest_concurrency,
+                max_age=environment().ingest_queue_max_age,
+                on_drop=partial(self.__shed, channel_name),
+                on_error=self.__error,
+                logger=self.logger
+            )
+        return queue
+
+    def __shed(self, channel_name: str, item: tuple[Message, Span | None], reason: str):
+        # queued messages evicted to make room, or expired, are counted and ended here as well as rejected ones
+        MESSAGES_SKIPPED.inc(channel_name, 'shed')
+        _, trace = item
+        if trace is not None:
+            trace.end(skipped='shed', reason=reason)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            queue = self.__ingest_queues[channel_name]
+            self.logger.debug(
+                'Message shed from "%s" [reason=%s depth=%d dropped=%d]', channel_name, reason, queue.depth, queue.dropped
+            )
+
+    def __error(self, item: tuple[Message, Span | None], error: Exception):
+        # errors of the translation pipeline reach the error handling of the bot, as when raised by event_message
+        message, _ = item
+        self.bot.run_event('error', error, message.raw_data)
+
+    def __send(self, channel: Channel, text: str):
+        # the send span of a traced message ends once its text is sent, or dropped, by the scheduler
+        parent = current_span()
+        send_span = parent.child('send') if parent is not None else None
+        window = environment().translation_batch_window
+        if window <= 0:
+            future = self.bot.scheduler.enqueue(channel, text)
+            if send_span is not None:
+                self.__end_when_sent([send_span], [future])
+            return
+
+        # translations within the window are merged into as few messages as possible
+        lines = self.__pending.get(channel.name)
+        if lines is None:
+            lines = self.__pending[channel.name] = []
+            asyncio.get_running_loop().call_later(window, self.__flush, channel)
+        lines.append((text, send_span))
+
+    def __flush(self, channel: Channel):
+        lines = self.__pending.pop(channel.name, [])
+        futures = [
+            self.bot.scheduler.enqueue(channel, text)
+            for text in String.join(BATCH_DELIMITER, [text for text, _ in lines], max_length=MAX_MESSAGE_LENGTH)
+            if text
+        ]
+        send_spans = [send_span for _, send_span in lines if send_span is not None]
+        if send_spans and futures:
+            self.__end_when_sent(send_spans, futures)
+
+    @staticmethod
+    def __end_when_sent(send_spans: list[Span], futures: list[asyncio.Future]):
+        # the send spans end once every text they were merged into is sent, or dropped
+        outcomes = []
+
+        def sent(future: asyncio.Future):
+            outcomes.append(not future.cancelled() and future.exception() is None and bool(future.result()))
+            if len(outcomes) == len(futures):
+                for send_span in send_spans:
+                    send_span.end(sent=all(outcomes))
+
+        for future in futures:
+            future.add_done_callback(sent)
+
+    def __skip(self, channel_name: str, reason: str):
+        MESSAGES_SKIPPED.inc(channel_name, reason)
+        trace = current_span()
+        if trace is not None:
+            trace.set_attribute('skipped', reason)
+
     @commands.Cog.event()
     async def event_message(self, message: Message):
-        if message.echo or (self.bot.nick == message.author.name and re.match(f'^\[.+?\] {self.bot.nick}: .+$', message.content)):
+        channel_name = message.channel.name
+        MESSAGES_RECEIVED.inc(channel_name)
+        if message.echo or (self.bot.nick == message.author.name and Twitch.echo_pattern(self.bot.nick).match(message.content)):
+            MESSAGES_SKIPPED.inc(channel_name, 'echo')
             return
 
         if message.content.startswith(environment().command_prefix):
+            MESSAGES_SKIPPED.inc(channel_name, 'prefix')
             return
 
-        content = message.content
-        channel_name = message.channel.name
-        configuration = self.get_module_configuration(channel_name)
+        configuration = self.get_module_settings(channel_name)
         if not configuration.enabled:
+            MESSAGES_SKIPPED.inc(channel_name, 'disabled')
             raise ModuleNotEnabledError(f'The module "{self.name}" is not enabled for "{channel_name}".')
 
-        text = Twitch.sanitize_twitch_emotes(
-            content,
-            TwitchEmote.parse(message.tags.get('emotes', ''))
-        )
-        text = Twitch.sanitize_uris(text)
+        queue = self.__ingest_queue(channel_name)
+        trace = get_tracer().start_trace('message', channel=channel_name, author=message.author.name)
+        queue.put((message, trace))
+
+    async def __translate(self, item: tuple[Message, Span | None]):
+        message, trace = item
+        if trace is None:
+            await self.__process(message)
+            return
 
-        if configuration.sanitize_emojis:
-            text = Twitch.sanitize_emojis(text)
+        trace.child('queue', start_time=trace.start_time).end()
+        with trace:
+            await self.__process(message)
 
-        if configuration.sanitize_usernames:
-            text = Twitch.sanitize_username(text)
+    async def __process(self, message: Message):
+        content = message.content
+        configuration = self.get_module_settings(message.channel.name)
 
-        if not len(text) or text in configuration.ignore_words:
+        with span('sanitize'):
+            sanitizer = MessageSanitizer.of(configuration.sanitize_emojis, configuration.sanitize_usernames)
+            text = sanitizer.sanitize(
+                content,
+                TwitchEmote.parse(message.tags.get('emotes', ''))
+            )
+
+        if not len(text):
+            self.__skip(message.channel.name, 'empty')
+            return
+
+        if text in configuration.ignore_words:
+            self.__skip(message.channel.name, 'ignore_words')
             return
 
         models = get_language_detection_model(configuration.morse_code_support)
-        results = models.detect(text)
+        with DETECTION_SECONDS.time(), span('detect'):
+            results = await models.detect_async(text)
         detected_languages = set()
         for source_language, score in results:
             if score >= environment().language_detection_threshold:
                 detected_languages.add(source_language)
 
-        self.logger.debug(
-            f'[author="{message.author.name}" '
-            f'detected="{", ".join(detected_languages)}" '
-            f'original_text="{content}" '
-            f'sanitized_text="{text}"]'
-        )
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                '[author="%s" detected="%s" original_text="%s" sanitized_text="%s"]',
+                message.author.name, ', '.join(detected_languages), content, text
+            )
         if detected_languages:
             for detected_language in detected_languages:
                 if detected_language in configuration.ignore_languages:
+                    self.__skip(message.channel.name, 'ignore_languages')
                     return
 
         translation_engine = configuration.translation_engine
@@ -80,13 +242,18 @@ class TatcTranslationModule(TatcChannelModule, commands.Cog):
         if configuration.morse_code_support and MORSE_CODE_LANGUAGE_ID in detected_languages:
             target_languages = [MORSE_CODE_DECODED_LANGUAGE_ID]
 
-        translator = get_translator(translation_engine, configuration.morse_code_support)
-        target_languages = list(filter(lambda target_language: target_language.lower() not in detected_languages, target_languages))
+        translator = get_async_translator(
+            translation_engine, configuration.morse_code_support, configuration.fallback_translation_engines
+        )
+        target_languages = [
+            target_language for target_language in target_languages if target_language.lower() not in detected_languages
+        ]
 
-        for result in translator.translate(text, *target_languages):
+        async for result in translator.translate(text, *target_languages):
             if result.detected_language:
                 if result.detected_language not in detected_languages:
-                    models.train(text, result.detected_language)
+                    with span('train', language=result.detected_language):
+                        models.train(text, result.detected_language)
 
                 if result.detected_language == result.expected_language or \
                     result.detected_language in configuration.ignore_languages:
@@ -100,4 +267,4 @@ class TatcTranslationModule(TatcChannelModule, commands.Cog):
             self.logger.info(f'[{source_language} -> {result.expected_language}] {output}')
 
             if result.translated_text:
-                await message.channel.send(f'[{source_language}] {output}')
+                self.__send(message.channel, f'[{source_language}] {output}')
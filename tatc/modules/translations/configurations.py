@@ -22,6 +22,12 @@ class TatcTranslationModuleEnvironment(Environment):
             word.strip() for word in environ.get(DEFAULT_IGNORE_WORDS, '').split(',')
         ])
 
+    @cached_property
+    def __default_fallback_translation_engines(self) -> list[str]:
+        return list(dict.fromkeys(
+            engine for engine in String.strips(environ.get(DEFAULT_FALLBACK_TRANSLATION_ENGINES, '').split(',')) if engine
+        ))
+
     @cached_property
     def language_detection_model(self) -> str:
         return environ.get(LANGUAGE_DETECTION_MODEL, 'adaptive')
@@ -30,14 +36,129 @@ class TatcTranslationModuleEnvironment(Environment):
     def language_detection_threshold(self) -> float:
         return float(environ.get(LANGUAGE_DETECTION_THRESHOLD, '0.75'))
 
+    @cached_property
+    def language_detection_in_memory(self) -> bool:
+        return Boolean.parse(environ.get(LANGUAGE_DETECTION_IN_MEMORY, 'true'))
+
+    @cached_property
+    def language_detection_training_interval(self) -> float:
+        return float(environ.get(LANGUAGE_DETECTION_TRAINING_INTERVAL, '5'))
+
+    @cached_property
+    def language_detection_training_batch_size(self) -> int:
+        return int(environ.get(LANGUAGE_DETECTION_TRAINING_BATCH_SIZE, '100'))
+
+    @cached_property
+    def language_detection_workers(self) -> int:
+        return int(environ.get(LANGUAGE_DETECTION_WORKERS, '0'))
+
+    @cached_property
+    def language_detection_batch_size(self) -> int:
+        return int(environ.get(LANGUAGE_DETECTION_BATCH_SIZE, '32'))
+
+    @cached_property
+    def language_detection_languages(self) -> list[str]:
+        return [
+            language for language in String.strips(environ.get(LANGUAGE_DETECTION_LANGUAGES, 'all').lower().split(','))
+            if language
+        ]
+
+    @cached_property
+    def language_detection_low_accuracy(self) -> bool:
+        return Boolean.parse(environ.get(LANGUAGE_DETECTION_LOW_ACCURACY, 'false'))
+
+    @cached_property
+    def language_detection_preload(self) -> bool:
+        return Boolean.parse(environ.get(LANGUAGE_DETECTION_PRELOAD, 'false'))
+
+    @cached_property
+    def language_detection_minimum_relative_distance(self) -> float:
+        return float(environ.get(LANGUAGE_DETECTION_MINIMUM_RELATIVE_DISTANCE, '0'))
+
+    @cached_property
+    def language_detection_reload_delay(self) -> float:
+        return float(environ.get(LANGUAGE_DETECTION_RELOAD_DELAY, '5'))
+
+    @cached_property
+    def language_detection_reload_interval(self) -> float:
+        return float(environ.get(LANGUAGE_DETECTION_RELOAD_INTERVAL, '60'))
+
     @cached_property
     def default_translation_engine(self) -> str:
         return environ.get(DEFAULT_TRANSLATION_ENGINE, 'google')
 
+    @cached_property
+    def translation_workers(self) -> int:
+        return int(environ.get(TRANSLATION_WORKERS, '4'))
+
+    @cached_property
+    def translation_timeout(self) -> float:
+        return float(environ.get(TRANSLATION_TIMEOUT, '10'))
+
+    @cached_property
+    def translation_fan_out(self) -> bool:
+        return Boolean.parse(environ.get(TRANSLATION_FAN_OUT, 'false'))
+
+    @cached_property
+    def translation_result_order(self) -> str:
+        return environ.get(TRANSLATION_RESULT_ORDER, 'configured').strip().lower()
+
+    @cached_property
+    def translation_batch_window(self) -> float:
+        return float(environ.get(TRANSLATION_BATCH_WINDOW, '0'))
+
+    @cached_property
+    def translation_breaker_failures(self) -> int:
+        return int(environ.get(TRANSLATION_BREAKER_FAILURES, '5'))
+
+    @cached_property
+    def translation_breaker_slow_call(self) -> float:
+        return float(environ.get(TRANSLATION_BREAKER_SLOW_CALL, '5'))
+
+    @cached_property
+    def translation_breaker_reset_timeout(self) -> float:
+        return float(environ.get(TRANSLATION_BREAKER_RESET_TIMEOUT, '30'))
+
+    @cached_property
+    def translation_breaker_probes(self) -> int:
+        return int(environ.get(TRANSLATION_BREAKER_PROBES, '1'))
+
+    @cached_property
+    def ingest_queue_size(self) -> int:
+        return int(environ.get(INGEST_QUEUE_SIZE, '50'))
+
+    @cached_property
+    def ingest_queue_policy(self) -> str:
+        return environ.get(INGEST_QUEUE_POLICY, 'drop_oldest').strip().lower()
+
+    @cached_property
+    def ingest_queue_max_age(self) -> float:
+        return float(environ.get(INGEST_QUEUE_MAX_AGE, '30'))
+
+    @cached_property
+    def ingest_concurrency(self) -> int:
+        return int(environ.get(INGEST_CONCURRENCY, '1'))
+
+    @cached_property
+    def translation_cache_size(self) -> int:
+        return int(environ.get(TRANSLATION_CACHE_SIZE, '1000'))
+
+    @cached_property
+    def translation_cache_ttl(self) -> float:
+        return float(environ.get(TRANSLATION_CACHE_TTL, '3600'))
+
+    @cached_property
+    def translation_cache_persistent(self) -> bool:
+        return Boolean.parse(environ.get(TRANSLATION_CACHE_PERSISTENT, 'false'))
+
     @property
     def default_ignore_words(self) -> list[str]:
         return list(self.__default_ignore_words)
 
+    @property
+    def default_fallback_translation_engines(self) -> list[str]:
+        return self.__default_fallback_translation_engines.copy()
+
 
 class TatcTranslationModuleConfiguration(TatcModuleConfiguration):
     """
@@ -51,6 +172,7 @@ class TatcTranslationModuleConfiguration(TatcModuleConfiguration):
         return [
             ENABLED,
             TRANSLATION_ENGINE,
+            FALLBACK_TRANSLATION_ENGINES,
             TARGET_LANGUAGES,
             IGNORE_LANGUAGES,
             SANITIZE_EMOJIS,
@@ -66,7 +188,13 @@ class TatcTranslationModuleConfiguration(TatcModuleConfiguration):
     @property
     def translation_engine(self) -> str:
         return self.data.setdefault(TRANSLATION_ENGINE, None) or environment().default_translation_engine
-    
+
+    @property
+    def fallback_translation_engines(self) -> list[str]:
+        return (
+            self.data.setdefault(FALLBACK_TRANSLATION_ENGINES, None) or environment().default_fallback_translation_engines
+        ).copy()
+
     @property
     def target_languages(self) -> list[str]:
         return (self.data.setdefault(TARGET_LANGUAGES, []) or []).copy()
@@ -103,6 +231,13 @@ class TatcTranslationModuleConfiguration(TatcModuleConfiguration):
     def translation_engine(self, value: str):
         self.data[TRANSLATION_ENGINE] = value or environment().default_translation_engine
 
+    @fallback_translation_engines.setter
+    def fallback_translation_engines(self, value: list[str]):
+        # the engines are tried in the order specified
+        self.data[FALLBACK_TRANSLATION_ENGINES] = list(dict.fromkeys(
+            engine for engine in String.strips(value) if engine
+        )) or None
+
     @target_languages.setter
     def target_languages(self, value: list[str]):
         self.data[TARGET_LANGUAGES] = list(set(
@@ -147,8 +282,68 @@ class TatcTranslationModuleConfiguration(TatcModuleConfiguration):
 
     @lru_cache(maxsize=5)
     def info(self, __key: str) -> Union[Generator[str, any, None], list[str]]:
-        if __key == TRANSLATION_ENGINE:
+        if __key in [TRANSLATION_ENGINE, FALLBACK_TRANSLATION_ENGINES]:
             return String.join(', ', self.supported_engines, max_length=250)
         elif __key in [IGNORE_LANGUAGES, TARGET_LANGUAGES]:
             return String.join(', ', self.supported_languages, max_length=250)
         return super().info(__key)
+
+
+class TatcTranslationModuleSettings:
+    """
+    Immutable snapshot of the per-channel configuration of the translation module, the snapshot is built once
+    and should be rebuilt when the configuration of the channel is changed
+    """
+    def __init__(self, configuration: TatcTranslationModuleConfiguration):
+        self.__enabled = configuration.enabled
+        self.__translation_engine = configuration.translation_engine
+        self.__fallback_translation_engines = tuple(
+            engine for engine in configuration.fallback_translation_engines if engine != configuration.translation_engine
+        )
+        self.__target_languages = tuple(configuration.target_languages)
+        self.__ignore_languages = frozenset(configuration.ignore_languages)
+        self.__ignore_words = frozenset(configuration.ignore_words)
+        self.__debug_mode = configuration.debug_mode
+        self.__sanitize_emojis = configuration.sanitize_emojis
+        self.__sanitize_usernames = configuration.sanitize_usernames
+        self.__morse_code_support = configuration.morse_code_support
+
+    @property
+    def enabled(self) -> bool:
+        return self.__enabled
+
+    @property
+    def translation_engine(self) -> str:
+        return self.__translation_engine
+
+    @property
+    def fallback_translation_engines(self) -> tuple[str, ...]:
+        return self.__fallback_translation_engines
+
+    @property
+    def target_languages(self) -> tuple[str, ...]:
+        return self.__target_languages
+
+    @property
+    def ignore_languages(self) -> frozenset[str]:
+        return self.__ignore_languages
+
+    @property
+    def ignore_words(self) -> frozenset[str]:
+        return self.__ignore_words
+
+    @property
+    def debug_mode(self) -> bool:
+        return self.__debug_mode
+
+    @property
+    def sanitize_emojis(self) -> bool:
+        return self.__sanitize_emojis
+
+    @property
+    def sanitize_usernames(self) -> bool:
+        return self.__sanitize_usernames
+
+    @property
+    def morse_code_support(self) -> bool:
+        return self.__morse_code_support
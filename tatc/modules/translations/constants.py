@@ -5,13 +5,42 @@ Constants for translation modules
 
 # environment related constants
 DEFAULT_TRANSLATION_ENGINE = 'default_translation_engine'
+DEFAULT_FALLBACK_TRANSLATION_ENGINES = 'default_fallback_translation_engines'
 DEFAULT_IGNORE_WORDS = 'default_ignore_words'
 LANGUAGE_DETECTION_MODEL = 'language_detection_model'
 LANGUAGE_DETECTION_THRESHOLD = 'language_detection_threshold'
+LANGUAGE_DETECTION_IN_MEMORY = 'language_detection_in_memory'
+LANGUAGE_DETECTION_TRAINING_INTERVAL = 'language_detection_training_interval'
+LANGUAGE_DETECTION_TRAINING_BATCH_SIZE = 'language_detection_training_batch_size'
+LANGUAGE_DETECTION_WORKERS = 'language_detection_workers'
+LANGUAGE_DETECTION_BATCH_SIZE = 'language_detection_batch_size'
+LANGUAGE_DETECTION_LANGUAGES = 'language_detection_languages'
+LANGUAGE_DETECTION_LOW_ACCURACY = 'language_detection_low_accuracy'
+LANGUAGE_DETECTION_PRELOAD = 'language_detection_preload'
+LANGUAGE_DETECTION_MINIMUM_RELATIVE_DISTANCE = 'language_detection_minimum_relative_distance'
+LANGUAGE_DETECTION_RELOAD_DELAY = 'language_detection_reload_delay'
+LANGUAGE_DETECTION_RELOAD_INTERVAL = 'language_detection_reload_interval'
+TRANSLATION_WORKERS = 'translation_workers'
+TRANSLATION_TIMEOUT = 'translation_timeout'
+TRANSLATION_FAN_OUT = 'translation_fan_out'
+TRANSLATION_RESULT_ORDER = 'translation_result_order'
+TRANSLATION_BATCH_WINDOW = 'translation_batch_window'
+TRANSLATION_BREAKER_FAILURES = 'translation_breaker_failures'
+TRANSLATION_BREAKER_SLOW_CALL = 'translation_breaker_slow_call'
+TRANSLATION_BREAKER_RESET_TIMEOUT = 'translation_breaker_reset_timeout'
+TRANSLATION_BREAKER_PROBES = 'translation_breaker_probes'
+INGEST_QUEUE_SIZE = 'ingest_queue_size'
+INGEST_QUEUE_POLICY = 'ingest_queue_policy'
+INGEST_QUEUE_MAX_AGE = 'ingest_queue_max_age'
+INGEST_CONCURRENCY = 'ingest_concurrency'
+TRANSLATION_CACHE_SIZE = 'translation_cache_size'
+TRANSLATION_CACHE_TTL = 'translation_cache_ttl'
+TRANSLATION_CACHE_PERSISTENT = 'translation_cache_persistent'
 
 # configuration related constants
 ENABLED = ENABLED
 TRANSLATION_ENGINE = 'translation_engine'
+FALLBACK_TRANSLATION_ENGINES = 'fallback_translation_engines'
 TARGET_LANGUAGES = 'target_languages'
 IGNORE_LANGUAGES = 'ignore_languages'
 IGNORE_WORDS = 'ignore_words'
@@ -24,3 +53,7 @@ MORSE_CODE_DECODED_LANGUAGE_ID = f'decoded_{MORSE_CODE_LANGUAGE_ID}'
 MORSE_CODE_ENGINE = f'{MORSE_CODE_LANGUAGE_ID}_engine'
 
 TRANSLATIONS = 'translations'
+
+# chat related constants
+MAX_MESSAGE_LENGTH = 500
+BATCH_DELIMITER = ' | '
@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+from tatc.core import *
+from tatc.modules.translations.configurations import environment
+
+import logging
+import threading
+import time
+
+
+_BREAKERS_: dict[str, CircuitBreaker] = {}
+_LOCK_ = threading.Lock()
+
+
+def get_circuit_breaker(translation_engine: str) -> CircuitBreaker:
+    """
+    Gets the circuit breaker of the specified translation engine, shared by all channels using the engine
+    """
+    with _LOCK_:
+        breaker = _BREAKERS_.get(translation_engine)
+        if breaker is None:
+            breaker = _BREAKERS_[translation_engine] = CircuitBreaker(
+                name=translation_engine,
+                failure_threshold=environment().translation_breaker_failures,
+                slow_call_duration=environment().translation_breaker_slow_call,
+                reset_timeout=environment().translation_breaker_reset_timeout,
+                half_open_probes=environment().translation_breaker_probes,
+                logger=get_logger('translations')
+            )
+        return breaker
+
+
+def circuit_breakers() -> dict[str, CircuitBreaker]:
+    with _LOCK_:
+        return _BREAKERS_.copy()
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a translation engine after a run of failed or slow calls, so a degraded engine does not hold up
+    the workers; once the reset timeout has passed, a number of probe calls are let through (half-open),
+    and the breaker closes again when all of them succeed, or opens again when any of them fails.
+    """
+    CLOSED = 'closed'
+    HALF_OPEN = 'half_open'
+    OPEN = 'open'
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        slow_call_duration: float = 0.0,
+        reset_timeout: float = 30.0,
+        half_open_probes: int = 1,
+        logger: logging.Logger = None
+    ):
+        self.__name = name
+        self.__failure_threshold = failure_threshold
+        self.__slow_call_duration = slow_call_duration
+        self.__reset_timeout = max(0.0, reset_timeout)
+        self.__half_open_probes = max(1, half_open_probes)
+        self.__logger = logger or logging.getLogger('NULL')
+        self.__lock = threading.Lock()
+        self.__state = CircuitBreaker.CLOSED
+        self.__changed_at = time.monotonic()
+        self.__failures = 0
+        self.__probes = 0
+        self.__successes = 0
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def logger(self) -> logging.Logger:
+        return self.__logger
+
+    @property
+    def enabled(self) -> bool:
+        return self.__failure_threshold > 0
+
+    @property
+    def state(self) -> str:
+        return self.__state
+
+    @property
+    def failures(self) -> int:
+        """
+        The number of consecutive failed or slow calls
+        """
+        return self.__failures
+
+    def allow(self) -> bool:
+        """
+        Returns true, when a call to the engine may be made; the outcome of the call should then be recorded.
+        Otherwise, false.
+        """
+        if not self.enabled:
+            return True
+
+        with self.__lock:
+            expired = time.monotonic() - self.__changed_at >= self.__reset_timeout
+            match self.__state:
+                case CircuitBreaker.CLOSED:
+                    return True
+                case CircuitBreaker.OPEN:
+                    if not expired:
+                        return False
+                    self.__transition(CircuitBreaker.HALF_OPEN)
+                case CircuitBreaker.HALF_OPEN:
+                    # probes whose outcome is never recorded, such as calls cancelled before they started, expire
+                    if self.__probes >= self.__half_open_probes and expired:
+                        self.__transition(CircuitBreaker.HALF_OPEN)
+
+            if self.__probes >= self.__half_open_probes:
+                return False
+            self.__probes += 1
+            return True
+
+    def record(self, duration: float = None, error: BaseException = None):
+        """
+        Records the outcome of a call to the engine, calls slower than the slow call duration count as failures
+        """
+        if not self.enabled:
+            return
+
+        slow = self.__slow_call_duration > 0 and duration is not None and duration >= self.__slow_call_duration
+        with self.__lock:
+            if error is not None or slow:
+                self.__failures += 1
+                if self.__state == CircuitBreaker.HALF_OPEN or (
+                    self.__state == CircuitBreaker.CLOSED and self.__failures >= self.__failure_threshold
+                ):
+                    reason = f'{type(error).__name__}: {error}' if error is not None else f'slow call ({duration:.2f}s)'
+                    self.__transition(CircuitBreaker.OPEN, reason)
+                return
+
+            match self.__state:
+                case CircuitBreaker.CLOSED:
+                    self.__failures = 0
+                case CircuitBreaker.HALF_OPEN:
+                    self.__successes += 1
+                    if self.__successes >= self.__half_open_probes:
+                        self.__transition(CircuitBreaker.CLOSED)
+
+    def release(self):
+        """
+        Returns the probe of a call that was let through, but not made to the engine
+        """
+        if not self.enabled:
+            return
+
+        with self.__lock:
+            if self.__state == CircuitBreaker.HALF_OPEN and self.__probes > 0:
+                self.__probes -= 1
+
+    def __transition(self, state: str, reason: str = None):
+        if state != self.__state:
+            message = f'Circuit breaker of "{self.name}": {self.__state} -> {state}'
+            if state == CircuitBreaker.OPEN:
+                self.logger.warning(f'{message} after {self.__failures} failures, last: {reason}')
+            else:
+                self.logger.info(message)
+
+        self.__state = state
+        self.__changed_at = time.monotonic()
+        self.__probes = 0
+        self.__successes = 0
+        if state == CircuitBreaker.CLOSED:
+            self.__failures = 0
+
+
+class CircuitBreakerCall:
+    """
+    A call let through by the circuit breaker, whose outcome is recorded once; either by the worker when the engine
+    returns, or by the caller when it stops waiting for an engine that does not return. A call that is not made to
+    the engine, as it is answered from the cache or cancelled before it started, is released instead.
+    """
+    def __init__(self, breaker: CircuitBreaker):
+        self.__breaker = breaker
+        self.__lock = threading.Lock()
+        self.__started = False
+        self.__recorded = False
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.__breaker
+
+    def start(self) -> bool:
+        """
+        Returns true, when the call may be made to the engine; otherwise, false when it was released
+        """
+        with self.__lock:
+            if self.__recorded:
+                return False
+            self.__started = True
+            return True
+
+    def release(self):
+        with self.__lock:
+            if self.__started or self.__recorded:
+                return
+            self.__recorded = True
+        self.breaker.release()
+
+    def record(self, duration: float = None, error: BaseException = None):
+        with self.__lock:
+            if self.__recorded:
+                return
+            self.__recorded = True
+        self.breaker.record(duration, error)
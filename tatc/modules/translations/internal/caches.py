@@ -0,0 +1,212 @@
+from __future__ import annotations
+from collections import OrderedDict
+from functools import lru_cache
+from os import path
+
+from tatc.core import *
+from tatc.modules.translations.configurations import environment
+from tatc.modules.translations.internal.interfaces import TranslationResult
+
+import json
+import sqlite3
+import threading
+import time
+
+
+DATABASE_FILE=path.join(working_directory(), 'translations.db')
+
+
+@lru_cache(maxsize=1)
+def get_translation_cache() -> TranslationCache:
+    cache = TranslationCache(
+        max_size=environment().translation_cache_size,
+        ttl=environment().translation_cache_ttl,
+        file=DATABASE_FILE if environment().translation_cache_persistent else None
+    )
+    metrics = get_metrics()
+    metrics.callback('tatc_translation_cache_hits_total', 'Translations answered from the cache', lambda: cache.hits, type='counter')
+    metrics.callback('tatc_translation_cache_misses_total', 'Translations sent to the translation engines', lambda: cache.misses, type='counter')
+    metrics.callback('tatc_translation_cache_hit_ratio', 'Ratio of translations answered from the cache', lambda: cache.hit_ratio)
+    metrics.callback('tatc_translation_cache_size', 'Translations held in memory by the cache', lambda: cache.size)
+    return cache
+
+
+class TranslationCache:
+    """
+    Bounded LRU cache of translation results with time based expiry, shared across all channels.
+    Entries are keyed on (translation engine, morse code support, sanitized text, target language).
+    """
+    def __init__(self, max_size: int, ttl: float, file: str = None):
+        self.__max_size = max(0, max_size)
+        self.__ttl = ttl
+        self.__file = file
+        self.__lock = threading.Lock()
+        # the on-disk tier has its own lock, so get() on the event loop never waits for a query, even when
+        # the database is locked by another shard
+        self.__database_lock = threading.Lock()
+        self.__entries: OrderedDict[tuple[str, bool, str, str], tuple[float, list[TranslationResult]]] = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__logger = get_logger('translations')
+        self.__connection = self.__init__database(file) if file and self.enabled else None
+
+    @property
+    def logger(self):
+        return self.__logger
+
+    @property
+    def enabled(self) -> bool:
+        return self.__max_size > 0
+
+    @property
+    def max_size(self) -> int:
+        return self.__max_size
+
+    @property
+    def ttl(self) -> float:
+        return self.__ttl
+
+    @property
+    def size(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def hits(self) -> int:
+        """
+        The number of lookups answered from either the in-memory or the on-disk tier
+        """
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """
+        The number of lookups that had to be sent to the translation engine
+        """
+        return self.__misses
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __init__database(self, file: str) -> sqlite3.Connection | None:
+        try:
+            connection = sqlite3.connect(file, timeout=60, check_same_thread=False)
+            # the file may be shared by several shards, each with their own connection
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(`translations`)')]
+            if columns and 'morse_code_support' not in columns:
+                # entries cached before morse code support was part of the key may belong to either translator
+                connection.execute('DROP TABLE `translations`')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS `translations` ('
+                '`translation_engine` VARCHAR(255), '
+                '`morse_code_support` INTEGER, '
+                '`text` TEXT, '
+                '`target_language` VARCHAR(255), '
+                '`results` TEXT, '
+                '`expires_at` REAL, '
+                'CONSTRAINT `pk_translations` PRIMARY KEY (`translation_engine`, `morse_code_support`, `text`, `target_language`)'
+                ');'
+            )
+            connection.execute('DELETE FROM `translations` WHERE `expires_at` < ?', (time.time(),))
+            connection.commit()
+            return connection
+        except sqlite3.Error as error:
+            self.logger.error(error)
+
+    def __expires_at(self) -> float:
+        return time.time() + self.ttl if self.ttl > 0 else float('inf')
+
+    def __remember(self, key: tuple[str, bool, str, str], expires_at: float, results: list[TranslationResult]):
+        self.__entries[key] = (expires_at, results)
+        self.__entries.move_to_end(key)
+        while len(self.__entries) > self.max_size:
+            self.__entries.popitem(last=False)
+
+    def get(self, key: tuple[str, bool, str, str]) -> list[TranslationResult] | None:
+        """
+        Returns the results from the in-memory tier; a miss is only counted by load(),
+        as the on-disk tier should be consulted off the event loop.
+        """
+        if not self.enabled:
+            return None
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, results = entry
+            if expires_at < time.time():
+                del self.__entries[key]
+                return None
+
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return results
+
+    def load(self, key: tuple[str, bool, str, str]) -> list[TranslationResult] | None:
+        """
+        Returns the results from the on-disk tier, if enabled, and counts the lookup as a hit or a miss
+        """
+        results = self.__load(key)
+        with self.__lock:
+            if results is None:
+                self.__misses += 1
+            else:
+                self.__hits += 1
+        return results
+
+    def __load(self, key: tuple[str, bool, str, str]) -> list[TranslationResult] | None:
+        if self.__connection is None:
+            return None
+
+        with self.__database_lock:
+            try:
+                row = self.__connection.execute(
+                    'SELECT `results`, `expires_at` FROM `translations` '
+                    'WHERE `translation_engine` = ? AND `morse_code_support` = ? AND `text` = ? AND `target_language` = ?',
+                    key
+                ).fetchone()
+            except sqlite3.Error as error:
+                self.logger.error(error)
+                return None
+
+        if row is None or row[1] < time.time():
+            return None
+
+        results = [
+            TranslationResult(expected_language, detected_language, translated_text)
+            for expected_language, detected_language, translated_text in json.loads(row[0])
+        ]
+        with self.__lock:
+            self.__remember(key, row[1], results)
+        return results
+
+    def put(self, key: tuple[str, bool, str, str], results: list[TranslationResult]):
+        """
+        Stores the results in the in-memory tier, and the on-disk tier when enabled
+        """
+        if not self.enabled or not results:
+            return
+
+        expires_at = self.__expires_at()
+        with self.__lock:
+            self.__remember(key, expires_at, results)
+        if self.__connection is None:
+            return
+
+        data = json.dumps([
+            (result.expected_language, result.detected_language, result.translated_text) for result in results
+        ])
+        with self.__database_lock:
+            try:
+                self.__connection.execute(
+                    'INSERT OR REPLACE INTO `translations` VALUES (?, ?, ?, ?, ?, ?)',
+                    (*key, data, expires_at)
+                )
+                self.__connection.commit()
+            except sqlite3.Error as error:
+                self.logger.error(error)
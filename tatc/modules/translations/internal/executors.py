@@ -0,0 +1,343 @@
+from __future__ import annotations
+from collections.abc import AsyncIterator, Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from tatc.core import *
+from tatc.core.tracing import span
+from tatc.errors import TranslationTimeoutError, TranslationUnavailableError
+from tatc.modules.translations.configurations import environment
+from tatc.modules.translations.internal.breakers import CircuitBreaker, CircuitBreakerCall, circuit_breakers, get_circuit_breaker
+from tatc.modules.translations.internal.caches import TranslationCache, get_translation_cache
+from tatc.modules.translations.internal.interfaces import LanguageTranslator, TranslationResult
+from tatc.modules.translations.internal.translators import get_translator
+
+import asyncio
+import contextvars
+import logging
+import time
+
+
+TRANSLATION_SECONDS = get_metrics().histogram(
+    'tatc_translation_seconds', 'Time spent by the translation engine translating a text into a language', ['engine']
+)
+TRANSLATION_FAILOVERS = get_metrics().counter(
+    'tatc_translation_failovers_total', 'Translations made by a fallback engine', ['engine', 'fallback']
+)
+_BREAKER_STATES_ = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+get_metrics().callback(
+    'tatc_translation_breaker_state', 'State of the circuit breaker of each engine (0 closed, 1 half-open, 2 open)',
+    lambda: {(engine,): _BREAKER_STATES_[breaker.state] for engine, breaker in circuit_breakers().items()},
+    labels=['engine']
+)
+
+
+@lru_cache()
+def get_translation_executor(translation_engine: str) -> TranslationExecutor:
+    """
+    Gets the executor of the specified translation engine; each engine has its own workers,
+    so an engine that hangs cannot hold up the workers of its fallback engines
+    """
+    return TranslationExecutor(
+        max_workers=environment().translation_workers,
+        timeout=environment().translation_timeout,
+        name=translation_engine
+    )
+
+
+@lru_cache()
+def get_async_translator(
+    translation_engine: str,
+    morse_code_support: bool,
+    fallback_translation_engines: tuple[str, ...] = ()
+) -> AsyncLanguageTranslator:
+    """
+    Gets the translator of the specified engine; when the engine fails, or its circuit breaker is open,
+    the fallback engines are tried in order
+    """
+    return AsyncLanguageTranslator(
+        translation_engine=translation_engine,
+        translator=get_translator(translation_engine, morse_code_support),
+        morse_code_support=morse_code_support,
+        executor=get_translation_executor(translation_engine),
+        cache=get_translation_cache(),
+        fan_out=environment().translation_fan_out,
+        ordered=environment().translation_result_order != 'completion',
+        breaker=get_circuit_breaker(translation_engine),
+        fallbacks=[
+            get_async_translator(fallback_translation_engine, morse_code_support)
+            for fallback_translation_engine in fallback_translation_engines
+            if fallback_translation_engine != translation_engine
+        ]
+    )
+
+
+class TranslationExecutor:
+    """
+    Runs blocking translation calls on a bounded pool of worker threads, away from the event loop
+    """
+    def __init__(self, max_workers: int, timeout: float, name: str = None):
+        self.__max_workers = max(1, max_workers)
+        self.__timeout = timeout if timeout and timeout > 0 else None
+        self.__executor = ThreadPoolExecutor(
+            max_workers=self.__max_workers,
+            thread_name_prefix=f'translations-{name}' if name else 'translations'
+        )
+        self.__in_flight: dict[Hashable, list[asyncio.Future, int]] = {}
+
+    @property
+    def max_workers(self) -> int:
+        """
+        The maximum number of translation calls in flight at any time
+        """
+        return self.__max_workers
+
+    @property
+    def timeout(self) -> float | None:
+        """
+        The time in seconds each call is allowed to take, including the time spent waiting for a worker
+        """
+        return self.__timeout
+
+    @property
+    def in_flight(self) -> int:
+        """
+        The number of distinct keyed calls currently in flight
+        """
+        return len(self.__in_flight)
+
+    def running(self, key: Hashable) -> bool:
+        """
+        Returns true, when a call of the specified key is in flight, which a new call of the key joins;
+        otherwise, false.
+        """
+        return key in self.__in_flight
+
+    async def run(
+        self,
+        function: Callable,
+        *args,
+        key: Hashable = None,
+        on_cancelled: Callable[[], None] = None
+    ) -> any:
+        """
+        Runs the specified function in the worker pool and waits for the result without blocking the event loop.
+        When a key is specified, concurrent calls of the same key share a single call and its result;
+        on_cancelled is called once the call is dropped, as nobody waits for it anymore.
+        """
+        # the worker runs in a copy of the context, so the spans it records belong to the trace of the caller
+        context = contextvars.copy_context()
+        if key is None:
+            future = asyncio.get_running_loop().run_in_executor(self.__executor, context.run, function, *args)
+            try:
+                return await asyncio.wait_for(future, timeout=self.timeout)
+            except asyncio.TimeoutError:
+                raise TranslationTimeoutError(f'Translation did not complete within {self.timeout} seconds.') from None
+
+        entry = self.__in_flight.get(key)
+        if entry is None:
+            future = asyncio.get_running_loop().run_in_executor(self.__executor, context.run, function, *args)
+            entry = self.__in_flight[key] = [future, 0]
+            future.add_done_callback(lambda _, entry=entry: self.__release(key, entry))
+            if on_cancelled is not None:
+                future.add_done_callback(lambda done: done.cancelled() and on_cancelled())
+
+        future = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise TranslationTimeoutError(f'Translation did not complete within {self.timeout} seconds.') from None
+        finally:
+            entry[1] -= 1
+            if entry[1] <= 0 and not future.done():
+                # nobody is waiting for the result anymore, drop the call if it has not started yet;
+                # the key is released right away, so a new caller never joins the cancelled call
+                self.__release(key, entry)
+                future.cancel()
+
+    def __release(self, key: Hashable, entry: list[asyncio.Future, int]):
+        # a later call of the same key may have replaced the entry, which must be kept
+        if self.__in_flight.get(key) is entry:
+            del self.__in_flight[key]
+
+    def shutdown(self, wait: bool = True):
+        self.__executor.shutdown(wait=wait, cancel_futures=True)
+
+
+class AsyncLanguageTranslator:
+    """
+    Asynchronous counterpart of LanguageTranslator, each target language is translated by the translation executor
+    """
+    def __init__(
+        self,
+        translation_engine: str,
+        translator: LanguageTranslator,
+        executor: TranslationExecutor,
+        morse_code_support: bool = False,
+        cache: TranslationCache = None,
+        fan_out: bool = False,
+        ordered: bool = True,
+        breaker: CircuitBreaker = None,
+        fallbacks: list[AsyncLanguageTranslator] = None
+    ):
+        self.__translation_engine = translation_engine
+        self.__translator = translator
+        self.__executor = executor
+        self.__morse_code_support = morse_code_support
+        self.__cache = cache or TranslationCache(max_size=0, ttl=0)
+        self.__fan_out = fan_out
+        self.__ordered = ordered
+        self.__breaker = breaker or CircuitBreaker(translation_engine, failure_threshold=0)
+        self.__fallbacks = fallbacks or []
+        self.__logger = get_logger('translations')
+
+    @property
+    def translation_engine(self) -> str:
+        return self.__translation_engine
+
+    @property
+    def translator(self) -> LanguageTranslator:
+        return self.__translator
+
+    @property
+    def executor(self) -> TranslationExecutor:
+        return self.__executor
+
+    @property
+    def morse_code_support(self) -> bool:
+        """
+        Whether the translator decodes morse code, the results of either translator are cached apart
+        """
+        return self.__morse_code_support
+
+    @property
+    def cache(self) -> TranslationCache:
+        return self.__cache
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        return self.__breaker
+
+    @property
+    def fallbacks(self) -> list[AsyncLanguageTranslator]:
+        """
+        The translators tried in order, when the translation engine fails or its circuit breaker is open
+        """
+        return self.__fallbacks.copy()
+
+    @property
+    def fan_out(self) -> bool:
+        """
+        Returns true, when all target languages of a text are requested concurrently;
+        otherwise, false.
+        """
+        return self.__fan_out
+
+    @property
+    def ordered(self) -> bool:
+        """
+        Returns true, when concurrent results are yielded in the order of the target languages;
+        otherwise, results are yielded as soon as each is completed.
+        """
+        return self.__ordered
+
+    @property
+    def supported_engines(self) -> list[str]:
+        return self.translator.supported_engines
+
+    @property
+    def supported_languages(self) -> list[str]:
+        return self.translator.supported_languages
+
+    async def translate(self, text: str, *target_languages: str) -> AsyncIterator[TranslationResult]:
+        if not self.fan_out or len(target_languages) < 2:
+            for target_language in target_languages:
+                for result in await self.__failover(text, target_language):
+                    yield result
+            return
+
+        tasks = [
+            asyncio.ensure_future(self.__failover(text, target_language)) for target_language in target_languages
+        ]
+        try:
+            for task in tasks if self.ordered else asyncio.as_completed(tasks):
+                for result in await task:
+                    yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            # the cancelled tasks are awaited, so none outlives the translation, and their exceptions are retrieved
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def __failover(self, text: str, target_language: str) -> list[TranslationResult]:
+        try:
+            return await self.__run(text, target_language)
+        except Exception as error:
+            if not self.__fallbacks:
+                raise
+            last_error = error
+
+        for fallback in self.__fallbacks:
+            if self.__logger.isEnabledFor(logging.DEBUG):
+                self.__logger.debug(
+                    'Translating with "%s" instead of "%s": %s', fallback.translation_engine, self.translation_engine, last_error
+                )
+            try:
+                results = await fallback.__run(text, target_language)
+            except Exception as error:
+                last_error = error
+                continue
+            TRANSLATION_FAILOVERS.inc(self.translation_engine, fallback.translation_engine)
+            return results
+        raise last_error
+
+    async def __run(self, text: str, target_language: str) -> list[TranslationResult]:
+        with span('translation', engine=self.translation_engine, target_language=target_language) as current:
+            key = (self.translation_engine, self.morse_code_support, text, target_language)
+            results = self.cache.get(key)
+            if results is not None:
+                if current is not None:
+                    current.set_attribute('cache', 'memory')
+                return results
+
+            # the breaker is asked before a worker is taken, only by the caller starting the call;
+            # callers of the same text join the call and share its outcome, which is recorded once
+            call = None
+            if not self.executor.running(key):
+                if not self.breaker.allow():
+                    raise TranslationUnavailableError(f'Translation engine "{self.translation_engine}" is unavailable.')
+                call = CircuitBreakerCall(self.breaker)
+            try:
+                return await self.executor.run(
+                    self.__translate, text, target_language, call,
+                    key=key, on_cancelled=call.release if call is not None else None
+                )
+            except TranslationTimeoutError as error:
+                # an engine that hangs never reports back from the worker, so the timeout is recorded here
+                if call is not None:
+                    call.record(error=error)
+                raise
+
+    def __translate(self, text: str, target_language: str, call: CircuitBreakerCall) -> list[TranslationResult]:
+        key = (self.translation_engine, self.morse_code_support, text, target_language)
+        with span('cache.load'):
+            results = self.cache.load(key)
+        if results is not None:
+            # the engine is not called, its probe is left to the next call
+            call.release()
+        elif not call.start():
+            # released, as the call was cancelled before it started; nobody waits for it anymore
+            raise asyncio.CancelledError()
+        else:
+            started = time.perf_counter()
+            try:
+                with TRANSLATION_SECONDS.time(self.translation_engine), span('engine', engine=self.translation_engine):
+                    results = list(self.translator.translate(text, target_language))
+            except Exception as error:
+                call.record(time.perf_counter() - started, error)
+                raise
+            call.record(time.perf_counter() - started)
+            with span('cache.put'):
+                self.cache.put(key, results)
+        return results
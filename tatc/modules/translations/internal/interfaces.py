@@ -1,5 +1,5 @@
 from __future__ import annotations
-from collections.abc import Iterator
+from collections.abc import Iterable, Iterator, Sequence
 
 
 class LanguageDetectionModel:
@@ -9,6 +9,16 @@ class LanguageDetectionModel:
     def train(text: str, expected_language: str):
         raise NotImplementedError
 
+    def detect_many(self, texts: Sequence[str]) -> list[list[(str, float)]]:
+        return [self.detect(text) for text in texts]
+
+    async def detect_async(self, text: str) -> list[(str, float)]:
+        return self.detect(text)
+
+    def train_many(self, samples: Iterable[tuple[str, str]]):
+        for text, expected_language in samples:
+            self.train(text, expected_language)
+
 
 class LanguageTranslator:
     @property
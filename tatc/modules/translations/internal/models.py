@@ -1,19 +1,29 @@
-from functools import lru_cache
+from __future__ import annotations
+from collections.abc import Callable
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
 from lingua import Language, LanguageDetector, LanguageDetectorBuilder
 from os import path
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Sequence
 
 from tatc.core import *
-from tatc.modules.translations.configurations import environment
+from tatc.modules.translations.configurations import TatcTranslationModuleConfiguration, environment
 from tatc.modules.translations.constants import MORSE_CODE_LANGUAGE_ID
 from tatc.modules.translations.internal.interfaces import LanguageDetectionModel
 from tatc.utilities import Directory, String
 
+import asyncio
 import csv
+import hashlib
+import logging
+import multiprocessing
+import queue
 import re
 import sqlite3
 import threading
+import time
 
 
 DATABASE_FILE=path.join(working_directory(), 'models.db')
@@ -22,6 +32,13 @@ RESOURCES=path.join(working_directory(), 'resources')
 
 @lru_cache()
 def get_language_detection_model(morse_code_support: bool = False):
+    model = _get_shared_language_detection_model()
+    return MorseCodeDetectionModel(model) if morse_code_support else model
+
+
+@lru_cache(maxsize=1)
+def _get_shared_language_detection_model():
+    # the same model is shared regardless of morse code support, so training is applied once
     language_detection_model = environment().language_detection_model
     if language_detection_model not in ['adaptive-forced'] and \
         environment().default_translation_engine not in ['google', 'bing']:
@@ -29,16 +46,171 @@ def get_language_detection_model(morse_code_support: bool = False):
     
     logger = get_logger('models')
     logger.info(f'Language Detection Model Loaded: {language_detection_model}')
+    workers = environment().language_detection_workers
+    batch_size = environment().language_detection_batch_size
+    options = get_lingua_detector_options()
     model = None
     match language_detection_model:
         case 'legacy':
-            model = LegacyDetectionModel()
+            model = ProcessPoolDetectionModel(options, workers, batch_size=batch_size) if workers > 0 else \
+                LegacyDetectionModel(options)
         case 'legacy-lazy':
-            model = LazyLoadingDetectionModel(['en', 'ja', 'zh'])
+            options = options.with_languages(options.languages or ['en', 'ja', 'zh'])
+            reload_delay = environment().language_detection_reload_delay
+            reload_interval = environment().language_detection_reload_interval
+            model = ProcessPoolDetectionModel(
+                options, workers, lazy=True, batch_size=batch_size, reload_delay=reload_delay, reload_interval=reload_interval
+            ) if workers > 0 else LazyLoadingDetectionModel(options, reload_delay=reload_delay, reload_interval=reload_interval)
         case 'adaptive' | 'adaptive-forced':
-            model = NaiveBayesDetectionModel()
+            model = NaiveBayesDetectionModel(environment().language_detection_in_memory)
 
-    return MorseCodeDetectionModel(model) if morse_code_support else model
+    return MicroBatchDetectionModel(
+        WriteBehindDetectionModel(
+            model,
+            interval=environment().language_detection_training_interval,
+            batch_size=environment().language_detection_training_batch_size
+        ),
+        batch_size=batch_size
+    )
+
+
+def get_lingua_detector_options() -> LinguaDetectorOptions:
+    """
+    Returns the options of the lingua detectors from the environment, where "channels" in the languages
+    is replaced by the target and ignored languages of every channel
+    """
+    languages = set()
+    for language in environment().language_detection_languages:
+        match language:
+            case 'all':
+                return LinguaDetectorOptions.from_environment(None)
+            case 'channels':
+                languages.update(_channel_languages())
+            case _:
+                languages.add(language)
+    return LinguaDetectorOptions.from_environment(languages or None)
+
+
+def _channel_languages() -> set[str]:
+    languages = set()
+    configuration = init()
+    for channel in configuration.channels:
+        module_configuration = TatcTranslationModuleConfiguration(configuration.get_channel_configuration(channel))
+        languages.update(module_configuration.target_languages)
+        languages.update(module_configuration.ignore_languages)
+    return languages
+
+
+@lru_cache(maxsize=1)
+def _supported_languages() -> dict[str, Language]:
+    return {language.iso_code_639_1.name.lower(): language for language in Language.all()}
+
+
+def _normalize_language(language: str) -> str:
+    # regional variants, such as "zh-cn", are detected as their language
+    return language.strip().lower().split('-')[0]
+
+
+class LinguaDetectorOptions:
+    """
+    How the lingua detectors are built, trading memory and latency against accuracy:
+        languages                 - the languages to load, or all languages when unspecified
+        low_accuracy              - detect with the smaller models only, faster on long texts but less accurate on short texts
+        preload                   - load the models of all languages when built, instead of on first use
+        minimum_relative_distance - how much the most likely language must stand out before it is detected
+    """
+    def __init__(
+        self,
+        languages: Iterable[str] = None,
+        low_accuracy: bool = False,
+        preload: bool = False,
+        minimum_relative_distance: float = 0.0
+    ):
+        self.__languages = None if languages is None else tuple(sorted({
+            _normalize_language(language) for language in languages if language.strip()
+        }))
+        self.__low_accuracy = low_accuracy
+        self.__preload = preload
+        self.__minimum_relative_distance = min(max(0.0, minimum_relative_distance), 0.99)
+
+    @staticmethod
+    def from_environment(languages: Iterable[str] = None) -> LinguaDetectorOptions:
+        return LinguaDetectorOptions(
+            languages=languages,
+            low_accuracy=environment().language_detection_low_accuracy,
+            preload=environment().language_detection_preload,
+            minimum_relative_distance=environment().language_detection_minimum_relative_distance
+        )
+
+    @property
+    def languages(self) -> tuple[str, ...] | None:
+        return self.__languages
+
+    @property
+    def low_accuracy(self) -> bool:
+        return self.__low_accuracy
+
+    @property
+    def preload(self) -> bool:
+        return self.__preload
+
+    @property
+    def minimum_relative_distance(self) -> float:
+        return self.__minimum_relative_distance
+
+    def with_languages(self, languages: Iterable[str] | None) -> LinguaDetectorOptions:
+        return LinguaDetectorOptions(languages, self.low_accuracy, self.preload, self.minimum_relative_distance)
+
+    def __str__(self):
+        return \
+            f'[languages="{", ".join(self.languages) if self.languages is not None else "all"}" ' \
+            f'low_accuracy="{self.low_accuracy}" ' \
+            f'preload="{self.preload}" ' \
+            f'minimum_relative_distance="{self.minimum_relative_distance}"]'
+
+    def build(self, preload: bool = None) -> LanguageDetector:
+        builder = None
+        if self.languages is not None:
+            supported_languages = _supported_languages()
+            languages = [supported_languages[language] for language in self.languages if language in supported_languages]
+            if len(languages) >= 2:
+                builder = LanguageDetectorBuilder.from_languages(*languages)
+            else:
+                get_logger('models').warning(f'At least two supported languages are required, loading all languages: {self}')
+        if builder is None:
+            builder = LanguageDetectorBuilder.from_all_languages()
+
+        if self.preload if preload is None else preload:
+            builder = builder.with_preloaded_language_models()
+        if self.low_accuracy:
+            builder = builder.with_low_accuracy_mode()
+        if self.minimum_relative_distance > 0:
+            builder = builder.with_minimum_relative_distance(self.minimum_relative_distance)
+        return builder.build()
+
+
+TRAINING_WRITES = get_metrics().counter(
+    'tatc_training_writes_total', 'Batches of training samples written to the language detection model'
+)
+TRAINING_SAMPLES = get_metrics().counter(
+    'tatc_training_samples_total', 'Training samples written to the language detection model'
+)
+_DETECTOR: LanguageDetector | None = None
+
+
+def _init_detection_worker(options: LinguaDetectorOptions):
+    # runs once in each worker process, so the language models are loaded before the first batch arrives
+    global _DETECTOR
+    _DETECTOR = options.build(preload=True)
+
+
+def _to_results(detected_language: Language | None) -> list[(str, float)]:
+    return [(detected_language.iso_code_639_1.name.lower(), 1.0)] if detected_language else []
+
+
+def _detect_in_worker(texts: list[str]) -> list[list[(str, float)]]:
+    # the texts are detected one after another, as the parallelism comes from the number of worker processes
+    return [_to_results(_DETECTOR.detect_language_of(text)) for text in texts]
 
 
 class LanguageDetectionResult:
@@ -65,31 +237,102 @@ class LanguageDetectionResult:
 
 
 class NaiveBayesDetectionModel(LanguageDetectionModel):
-    def __init__(self):
+    MAX_PARAMETERS = 512
+
+    def __init__(self, in_memory: bool = False):
         super().__init__()
         self.__pattern = re.compile(r'[\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF]|[\w]+')
         self.__logger = get_logger('models')
-        self.__init__database(self.connection)
+        self.__lock = threading.RLock()
+        self.__connection = None
+        with self.__lock:
+            self.__init__database(self.connection)
+        self.__index = self.__load_index() if in_memory else None
     
     @property
     def logger(self):
         return self.__logger
 
     def __init__database(self, connection: sqlite3.Connection):
-        for file in sorted(Directory.listdir(RESOURCES, '.*\.sql')):
-            with open(file) as fd:
-                script = fd.read()
-                connection.executescript(script)
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS `seeds` ('
+            '`file_name` VARCHAR(255) PRIMARY KEY, '
+            '`checksum` VARCHAR(64), '
+            '`applied_at` REAL'
+            ');'
+        )
+        connection.commit()
+        applied = dict(connection.execute('SELECT `file_name`, `checksum` FROM `seeds`').fetchall())
+
+        scripts = []
+        csv_files = []
+        seeds = []
+        for file in sorted(Directory.listdir(RESOURCES, r'.*\.sql$')) + sorted(Directory.listdir(RESOURCES, r'.*\.csv$')):
+            file_name = path.basename(file)
+            checksum = self.__checksum(file)
+            if applied.get(file_name) == checksum:
+                continue
+            (scripts if file_name.endswith('.sql') else csv_files).append(file)
+            seeds.append((file_name, checksum, time.time()))
+
+        if not seeds:
+            self.logger.info('Language detection database is up to date')
+            return
+
+        self.logger.info(f'Applying resources: [{", ".join(file_name for file_name, _, _ in seeds)}]')
+        try:
+            # executescript() commits any pending transaction, so every script is applied in a single call
+            script = ';\n'.join(self.__read(file) for file in scripts)
+            connection.executescript(f'BEGIN;\n{script}')
+            if not connection.in_transaction:
+                connection.execute('BEGIN')
+            for file in csv_files:
+                self.__import_csv(connection, file)
+            connection.executemany('INSERT OR REPLACE INTO `seeds` VALUES (?, ?, ?)', seeds)
             connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
 
+    def __import_csv(self, connection: sqlite3.Connection, file: str):
+        """
+        Streams the rows of the specified csv file into the database, rows are never held in memory as a whole
+        """
+        language_id = Path(path.basename(file)).stem.lower()
         insert_statement = 'INSERT OR IGNORE INTO `languages` VALUES (?, ?, ?)'
-        for file in Directory.listdir(RESOURCES, '.*\.csv'):
-            language_id = Path(path.basename(file)).stem.lower()
-            with open(file) as fd:
-                reader = csv.reader(fd, delimiter=',')
-                connection.executemany(insert_statement, [(language_id, word, int(weight)) for word, weight in reader])
-                connection.commit()
-    
+        with open(file, encoding='utf-8', newline='') as fd:
+            reader = csv.reader(fd, delimiter=',')
+            connection.executemany(insert_statement, ((language_id, word, int(weight)) for word, weight in reader))
+
+    def __read(self, file: str) -> str:
+        with open(file, encoding='utf-8') as fd:
+            return fd.read()
+
+    def __checksum(self, file: str) -> str:
+        checksum = hashlib.sha256()
+        with open(file, 'rb') as fd:
+            for chunk in iter(lambda: fd.read(1024 * 1024), b''):
+                checksum.update(chunk)
+        return checksum.hexdigest()
+
+    def __load_index(self) -> dict[str, dict[str, float]]:
+        index = {}
+        with self.__lock:
+            try:
+                for language_id, word, weight in self.connection.execute('SELECT `language_id`, `word`, `weight` FROM `languages`'):
+                    index.setdefault(word, {})[language_id] = weight
+            except sqlite3.Error as error:
+                self.logger.error(error)
+        self.logger.info(f'Loaded {len(index)} words into the in-memory index')
+        return index
+
+    def __update_index(self, words: list[str], expected_language: str):
+        # the per-word mapping is replaced instead of modified, so detection can read the index without locking
+        for word in words:
+            languages = self.__index.get(word, {})
+            if expected_language not in languages:
+                self.__index[word] = {**languages, expected_language: 1}
+
     def __split_words(self, text: str):
         return self.__cached_split_words(text.strip().lower()).copy()
 
@@ -111,25 +354,70 @@ class NaiveBayesDetectionModel(LanguageDetectionModel):
                 pattern = re.compile(r'[\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF]', re.IGNORECASE)
                 return re.sub(pattern, '', text)
 
+    @lru_cache(maxsize=16)
+    def __select_statement(self, size: int) -> str:
+        parameters = ', '.join(['?'] * size)
+        return \
+            f'SELECT `language_id`, COUNT(*), SUM(`weight`) AS "weight" FROM `languages` ' \
+            f'WHERE `word` IN ({parameters}) ' \
+            'GROUP BY `language_id` ' \
+            'ORDER BY "weight" DESC; '
+
+    @lru_cache(maxsize=16)
+    def __select_words_statement(self, size: int) -> str:
+        parameters = ', '.join(['?'] * size)
+        return f'SELECT `word`, `language_id`, `weight` FROM `languages` WHERE `word` IN ({parameters}); '
+
+    def __load_words(self, words: set[str]) -> dict[str, dict[str, float]]:
+        # loads the weights of the words of a whole batch of texts, in as few queries as possible
+        index = {}
+        words = list(words)
+        with self.__lock:
+            for offset in range(0, len(words), NaiveBayesDetectionModel.MAX_PARAMETERS):
+                chunk = words[offset:offset + NaiveBayesDetectionModel.MAX_PARAMETERS]
+                size = 1 << (len(chunk) - 1).bit_length()
+                parameters = tuple(chunk) + (None,) * (size - len(chunk))
+                try:
+                    for word, language_id, weight in self.connection.execute(self.__select_words_statement(size), parameters):
+                        index.setdefault(word, {})[language_id] = weight
+                except sqlite3.Error as error:
+                    self.logger.error(error)
+        return index
+
+    def __try_detect_in_memory(self, words: list[str], index: dict[str, dict[str, float]] = None) -> list[LanguageDetectionResult]:
+        index = self.__index if index is None else index
+        counts = {}
+        scores = {}
+        for word in words:
+            for language_id, weight in index.get(word, {}).items():
+                counts[language_id] = counts.get(language_id, 0) + 1
+                scores[language_id] = scores.get(language_id, 0) + weight
+
+        return [
+            LanguageDetectionResult(language_id, counts[language_id], scores[language_id], len(words))
+            for language_id in sorted(scores, key=scores.get, reverse=True)
+        ]
+
     def __try_detect(self, words: list[str]) -> list[LanguageDetectionResult]:
+        if self.__index is not None:
+            return self.__try_detect_in_memory(words) if words else []
+
         results = []
 
         if words:
-            connection = self.connection
-            try:
-                cursor = connection.cursor()
-                parameters = ', '.join(['?'] * len(words))
-                select_statement = \
-                    f'SELECT `language_id`, COUNT(*), SUM(`weight`) AS "weight" FROM `languages` ' \
-                    f'WHERE `word` IN ({parameters}) ' \
-                    'GROUP BY `language_id` ' \
-                    'ORDER BY "weight" DESC; '
-                for language_id, count, score in cursor.execute(select_statement, tuple(words)).fetchall():
-                    results.append(LanguageDetectionResult(language_id, count, score, len(words)))
-            except sqlite3.Error as error:
-                self.logger.error(error)
-            finally:
-                connection.close()
+            # pads the parameters to the next power of two, so the same few statements are reused
+            # from the statement cache of the connection; NULL never matches any word
+            size = 1 << (len(words) - 1).bit_length()
+            parameters = tuple(words) + (None,) * (size - len(words))
+            with self.__lock:
+                try:
+                    rows = self.connection.execute(self.__select_statement(size), parameters).fetchall()
+                except sqlite3.Error as error:
+                    self.logger.error(error)
+                    rows = []
+
+            for language_id, count, score in rows:
+                results.append(LanguageDetectionResult(language_id, count, score, len(words)))
         
         return results
 
@@ -167,129 +455,415 @@ class NaiveBayesDetectionModel(LanguageDetectionModel):
             self.logger.warning(f'(Post-training validation) Language of text not detected: {detected_languages}')
 
     @property
-    def connection(self):
+    def connection(self) -> sqlite3.Connection:
+        """
+        Returns the connection owned by the current model, the connection is shared across threads
+        and access should be guarded by the lock of the model
+        """
+        if self.__connection is None:
+            with self.__lock:
+                if self.__connection is None:
+                    self.__connection = self.__connect()
+        return self.__connection
+
+    def __connect(self) -> sqlite3.Connection:
         try:
-            connection = sqlite3.connect(DATABASE_FILE, timeout=60)
+            connection = sqlite3.connect(DATABASE_FILE, timeout=60, check_same_thread=False, cached_statements=256)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.execute('PRAGMA temp_store = MEMORY')
+            connection.execute('PRAGMA cache_size = -16384')
             return connection
         except sqlite3.Error as error:
             self.logger.error(error)
 
-    def detect(self, text: str) -> list[(str, float)]:
+    def close(self):
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+
+    def __detected_languages(self, results: list[LanguageDetectionResult]) -> list[(str, float)]:
         highest_score = -1;
         detected_languages = []
-        for result in self.__try_detect_text(text):
-            self.logger.debug(f'Detection Result: {result}')
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        for result in results:
+            if debug:
+                self.logger.debug('Detection Result: %s', result)
             if highest_score <= result.score and result.score:
                 detected_languages.append((result.language_id, result.score))
                 highest_score = result.score
         return detected_languages
 
+    def detect(self, text: str) -> list[(str, float)]:
+        return self.__detected_languages(self.__try_detect_text(text))
+
+    def detect_many(self, texts: Sequence[str]) -> list[list[(str, float)]]:
+        words = [self.__split_words(text) for text in texts]
+        index = self.__index
+        if index is None:
+            index = self.__load_words({word for text_words in words for word in text_words})
+        return [
+            self.__detected_languages(self.__try_detect_in_memory(text_words, index) if text_words else [])
+            for text_words in words
+        ]
+
     def train(self, text: str, expected_language: str):
-        expected_language = expected_language.lower()
-        words = self.__split_words(self.__sanitize_by_language(text, expected_language))
-        if self.__pre_training_validation(words, expected_language):
-            connection = self.connection
+        self.train_many([(text, expected_language)])
+
+    def train_many(self, samples: Iterable[tuple[str, str]]):
+        pending = []
+        for text, expected_language in samples:
+            expected_language = expected_language.lower()
+            words = self.__split_words(self.__sanitize_by_language(text, expected_language))
+            if self.__pre_training_validation(words, expected_language):
+                pending.append((words, expected_language))
+
+        if not pending:
+            return
+
+        with self.__lock:
             try:
                 insert_statement = 'INSERT OR IGNORE INTO `languages` VALUES (?, ?, ?)'
-                connection.executemany(insert_statement, [(expected_language, word, 1) for word in words])
-                connection.commit()
+                self.connection.executemany(insert_statement, [
+                    (expected_language, word, 1) for words, expected_language in pending for word in words
+                ])
+                self.connection.commit()
+                if self.__index is not None:
+                    for words, expected_language in pending:
+                        self.__update_index(words, expected_language)
             except sqlite3.Error as error:
                 self.logger.error(error)
-            finally:
-                connection.close()
-                self.__post_training_validation(words, expected_language)
+
+        for words, expected_language in pending:
+            self.__post_training_validation(words, expected_language)
 
 
 class LegacyDetectionModel(LanguageDetectionModel):
-    def __init__(self):
+    def __init__(self, options: LinguaDetectorOptions = None):
         super().__init__()
         self.__lock = threading.Lock()
+        self.__options = options or LinguaDetectorOptions()
 
         self.__model = None
         self.__logger = get_logger('models')
+        if self.__options.preload:
+            threading.Thread(target=lambda: self.model, name='models-preload', daemon=True).start()
     
     @property
     def logger(self):
         return self.__logger
+
+    @property
+    def options(self) -> LinguaDetectorOptions:
+        return self.__options
     
     def __load_model(self):
-        with self.__lock:
-            self.logger.info(f'Loading all language models')
-            self.__model = LanguageDetectorBuilder.from_all_languages().build()
+        self.logger.info(f'Loading language models: {self.options}')
+        self.__model = self.options.build()
 
     @property
     def model(self) -> LanguageDetector:
         if not self.__model:
-            self.__load_model()
+            with self.__lock:
+                if not self.__model:
+                    self.__load_model()
         return self.__model
 
     def detect(self, text: str) -> list[(str, float)]:
-        detected_language = self.model.detect_language_of(text)
-        if detected_language:
-            return [(detected_language.iso_code_639_1.name.lower(), 1.0)]
-        return []
+        return _to_results(self.model.detect_language_of(text))
+
+    def detect_many(self, texts: Sequence[str]) -> list[list[(str, float)]]:
+        return [_to_results(language) for language in self.model.detect_languages_in_parallel_of(list(texts))]
     
     def train(self, text: str, expected_language: str):
         pass
 
 
+class ReloadScheduler:
+    """
+    Runs a reload on a background thread; requests are collected for the delay before the reload,
+    and reloads are started no more often than once every interval
+    """
+    def __init__(self, reload: Callable[[], None], delay: float, interval: float, name: str = 'models-reload'):
+        self.__reload = reload
+        self.__delay = max(0.0, delay)
+        self.__interval = max(0.0, interval)
+        self.__name = name
+        self.__lock = threading.Lock()
+        self.__timer: threading.Timer | None = None
+        self.__next_reload_at = 0.0
+
+    @property
+    def scheduled(self) -> bool:
+        """
+        Returns true, when a reload is waiting to be started; otherwise, false.
+        """
+        return self.__timer is not None
+
+    def request(self):
+        with self.__lock:
+            if self.__timer is not None:
+                return
+            self.__timer = threading.Timer(max(self.__delay, self.__next_reload_at - time.monotonic()), self.__run)
+            self.__timer.name = self.__name
+            self.__timer.daemon = True
+            self.__timer.start()
+
+    def cancel(self):
+        with self.__lock:
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+
+    def __run(self):
+        # requests arriving during the reload schedule the next one, after the interval
+        with self.__lock:
+            self.__timer = None
+            self.__next_reload_at = time.monotonic() + self.__interval
+        self.__reload()
+
+
 class LazyLoadingDetectionModel(LanguageDetectionModel):
-    def __init__(self, languages: list[str]):
+    """
+    Detects with the languages seen so far; newly seen languages are loaded by building a new detector
+    in the background, which replaces the detector in service once ready
+    """
+    def __init__(self, options: LinguaDetectorOptions, reload_delay: float = 5.0, reload_interval: float = 60.0):
         super().__init__()
         self.__lock = threading.Lock()
-        self.__languages = set(languages.copy())
+        self.__options = options
+        self.__pending: set[str] = set()
+        self.__reloader = ReloadScheduler(self.__reload, delay=reload_delay, interval=reload_interval)
 
         self.__model = None
         self.__logger = get_logger('models')
+        if self.__options.preload:
+            threading.Thread(target=lambda: self.model, name='models-preload', daemon=True).start()
     
     @property
     def logger(self):
         return self.__logger
-    
-    @cached_property
-    def supported_languages(self):
-        map = {}
-        for language in Language.all():
-            map[language.iso_code_639_1.name.lower()] = language
-        return map
-    
-    def __get_language_enums(self, languages: Iterable[str]) -> list[Language]:
-        enums = []
-        for language in languages:
-            if language in self.supported_languages.keys():
-                enums.append(self.supported_languages[language])
-        return enums
+
+    @property
+    def options(self) -> LinguaDetectorOptions:
+        return self.__options
+
+    @property
+    def pending_languages(self) -> frozenset[str]:
+        """
+        The newly seen languages waiting to be loaded
+        """
+        return frozenset(self.__pending)
 
     def __load_model(self):
-        with self.__lock:
-            self.logger.info(f'Loading language models: [{", ".join(self.__languages)}]')
-            self.__model = LanguageDetectorBuilder.from_languages(
-                *self.__get_language_enums(self.__languages)
-            ).build()
+        self.logger.info(f'Loading language models: {self.options}')
+        self.__model = self.options.build()
 
     @property
     def model(self) -> LanguageDetector:
         if not self.__model:
-            self.__load_model()
+            with self.__lock:
+                if not self.__model:
+                    self.__load_model()
         return self.__model
 
     def detect(self, text: str) -> list[(str, float)]:
-        detected_language = self.model.detect_language_of(text)
-        if detected_language:
-            return [(detected_language.iso_code_639_1.name.lower(), 1.0)]
-        return []
+        return _to_results(self.model.detect_language_of(text))
+
+    def detect_many(self, texts: Sequence[str]) -> list[list[(str, float)]]:
+        return [_to_results(language) for language in self.model.detect_languages_in_parallel_of(list(texts))]
     
     def train(self, text: str, expected_language: str):
-        expected_language = expected_language.lower()
-        if expected_language in self.__languages:
+        expected_language = _normalize_language(expected_language)
+        if expected_language in self.options.languages or expected_language not in _supported_languages():
+            return
+        with self.__lock:
+            if expected_language in self.__pending:
+                return
+            self.__pending.add(expected_language)
+        self.logger.info(f'Language "{expected_language}" will be loaded in the background')
+        self.__reloader.request()
+
+    def __reload(self):
+        with self.__lock:
+            pending, self.__pending = self.__pending, set()
+        options = self.options.with_languages([*self.options.languages, *pending])
+        self.logger.info(f'Loading language models in the background: {options}')
+        try:
+            model = options.build()
+        except Exception as error:
+            self.logger.error(error)
+            return
+
+        # the models of the previous detector are not unloaded, as lingua shares them with the new detector
+        self.__model, self.__options = model, options
+        self.logger.info(f'Language models replaced: {options}')
+
+
+class ProcessPoolDetectionModel(LanguageDetectionModel):
+    """
+    Detects languages with lingua in a pool of worker processes, each holding its own preloaded detector,
+    so detection scales across cores and the event loop is not held up by long messages
+    """
+    def __init__(
+        self,
+        options: LinguaDetectorOptions,
+        max_workers: int,
+        lazy: bool = False,
+        batch_size: int = 32,
+        reload_delay: float = 5.0,
+        reload_interval: float = 60.0
+    ):
+        super().__init__()
+        self.__options = options
+        self.__max_workers = max(1, max_workers)
+        self.__lazy = lazy
+        self.__batch_size = max(1, batch_size)
+        self.__lock = threading.Lock()
+        self.__executor: ProcessPoolExecutor | None = None
+        self.__pending: set[str] = set()
+        self.__closed = False
+        self.__reloader = ReloadScheduler(self.__reload, delay=reload_delay, interval=reload_interval)
+        self.__logger = get_logger('models')
+        if options.preload:
+            # starts every worker, so the language models are loaded before the first message arrives
+            for _ in range(self.max_workers):
+                self.executor.submit(_detect_in_worker, [])
+
+    @property
+    def logger(self):
+        return self.__logger
+
+    @property
+    def options(self) -> LinguaDetectorOptions:
+        return self.__options
+
+    @property
+    def languages(self) -> tuple[str, ...] | None:
+        """
+        The languages loaded by the workers, or none when all languages are loaded
+        """
+        return self.options.languages
+
+    @property
+    def max_workers(self) -> int:
+        return self.__max_workers
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = self.__create_executor(self.options)
+            return self.__executor
+
+    def __create_executor(self, options: LinguaDetectorOptions) -> ProcessPoolExecutor:
+        self.logger.info(f'Starting {self.max_workers} language detection workers: {options}')
+        # spawned workers of a frozen build re-run the executable, main.py calls freeze_support() before anything else
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_detection_worker,
+            initargs=(options,)
+        )
+
+    def __restart(self, executor: ProcessPoolExecutor):
+        # only the broken pool is replaced, a pool started by another call in the meantime is kept
+        with self.__lock:
+            if self.__executor is executor:
+                self.__executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def __submit(self, executor: ProcessPoolExecutor, texts: list[str]) -> Future:
+        try:
+            return executor.submit(_detect_in_worker, texts)
+        except RuntimeError:
+            # the pool was shut down by another call since it was taken, the batch is cancelled and submitted again
+            if executor is self.__executor or self.__closed:
+                raise
+            future = Future()
+            future.cancel()
+            return future
+
+    def detect(self, text: str) -> list[(str, float)]:
+        return self.detect_many([text])[0]
+
+    def detect_many(self, texts: Sequence[str]) -> list[list[(str, float)]]:
+        texts = list(texts)
+        if not texts:
+            return []
+
+        # the texts are spread evenly over the workers, in batches of at most batch_size texts
+        size = min(self.__batch_size, -(-len(texts) // self.max_workers))
+        batches = [texts[offset:offset + size] for offset in range(0, len(texts), size)]
+        results: list[list[list[(str, float)]] | None] = [None] * len(batches)
+        for attempt in range(2):
+            executor = self.executor
+            futures = {
+                index: self.__submit(executor, batch)
+                for index, batch in enumerate(batches) if results[index] is None
+            }
+            failure = None
+            for index, future in futures.items():
+                try:
+                    results[index] = future.result()
+                except (BrokenProcessPool, CancelledError) as error:
+                    failure = failure or error
+            if failure is None:
+                return [result for batch in results for result in batch]
+
+            # the batches lost with a broken pool, or cancelled when another call restarted it, are submitted
+            # once more to a new pool, a second failure is raised
+            if attempt or self.__closed:
+                raise failure
+            self.logger.error(f'Language detection workers failed, retrying: {failure!r}')
+            self.__restart(executor)
+
+    def train(self, text: str, expected_language: str):
+        expected_language = _normalize_language(expected_language)
+        if not self.__lazy or self.languages is None or expected_language in self.languages or \
+            expected_language not in _supported_languages():
+            return
+        with self.__lock:
+            if expected_language in self.__pending:
+                return
+            self.__pending.add(expected_language)
+        self.logger.info(f'Language "{expected_language}" will be loaded in the background')
+        self.__reloader.request()
+
+    def __reload(self):
+        # the workers load the languages once when started, so new workers are started and replace the
+        # workers in service once ready; batches already submitted are completed by the previous workers
+        with self.__lock:
+            pending, self.__pending = self.__pending, set()
+        options = self.options.with_languages([*self.languages, *pending])
+        executor = self.__create_executor(options)
+        try:
+            for future in [executor.submit(_detect_in_worker, []) for _ in range(self.max_workers)]:
+                future.result()
+        except Exception as error:
+            self.logger.error(error)
+            executor.shutdown(wait=False, cancel_futures=True)
             return
-        self.__languages.add(expected_language)
-        self.logger.info(f'Unloading language models')
-        self.model.unload_language_models()
-        self.__load_model()
+
+        with self.__lock:
+            previous_executor, self.__executor, self.__options = self.__executor, executor, options
+        if previous_executor is not None:
+            previous_executor.shutdown(wait=False)
+        self.logger.info(f'Language detection workers replaced: {options}')
+
+    def close(self):
+        self.__closed = True
+        self.__reloader.cancel()
+        with self.__lock:
+            executor, self.__executor = self.__executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
 
 class MorseCodeDetectionModel(LanguageDetectionModel):
+    __PATTERN = re.compile(r'^[\.・\-\s]+$')
+
     def __init__(self, model: LanguageDetectionModel):
         super().__init__()
         self.__model = model
@@ -298,10 +872,196 @@ class MorseCodeDetectionModel(LanguageDetectionModel):
     def model(self):
         return self.__model
 
+    def __is_morse_code(self, text: str) -> bool:
+        return MorseCodeDetectionModel.__PATTERN.match(text) is not None
+
     def detect(self, text: str) -> list[(str, float)]:
-        if re.match(r'^[\.・\-\s]+$', text):
+        if self.__is_morse_code(text):
             return [(MORSE_CODE_LANGUAGE_ID, 1.0)]
         return self.model.detect(text)
 
+    def detect_many(self, texts: Sequence[str]) -> list[list[(str, float)]]:
+        results = [[(MORSE_CODE_LANGUAGE_ID, 1.0)] if self.__is_morse_code(text) else None for text in texts]
+        remaining = [text for text, result in zip(texts, results) if result is None]
+        detected = iter(self.model.detect_many(remaining) if remaining else [])
+        return [next(detected) if result is None else result for result in results]
+
+    async def detect_async(self, text: str) -> list[(str, float)]:
+        if self.__is_morse_code(text):
+            return [(MORSE_CODE_LANGUAGE_ID, 1.0)]
+        return await self.model.detect_async(text)
+
     def train(self, text: str, expected_language: str):
         self.model.train(text, expected_language)
+
+    def train_many(self, samples: Iterable[tuple[str, str]]):
+        self.model.train_many(samples)
+
+
+class WriteBehindDetectionModel(LanguageDetectionModel):
+    """
+    Queues the training of the wrapped model, which is applied in batches by a background writer;
+    pending training is flushed when the application exits
+    """
+    def __init__(self, model: LanguageDetectionModel, interval: float, batch_size: int):
+        super().__init__()
+        self.__model = model
+        self.__interval = max(0.0, interval)
+        self.__batch_size = max(1, batch_size)
+        self.__queue = queue.Queue()
+        self.__closed = False
+        self.__logger = get_logger('models')
+        self.__thread = threading.Thread(target=self.__run, name='models-writer', daemon=True)
+        self.__thread.start()
+        on_shutdown(self.close)
+
+    @property
+    def logger(self):
+        return self.__logger
+
+    @property
+    def model(self) -> LanguageDetectionModel:
+        return self.__model
+
+    @property
+    def interval(self) -> float:
+        return self.__interval
+
+    @property
+    def batch_size(self) -> int:
+        return self.__batch_size
+
+    @property
+    def pending(self) -> int:
+        """
+        The approximate number of training samples waiting to be written
+        """
+        return self.__queue.qsize()
+
+    def detect(self, text: str) -> list[(str, float)]:
+        return self.model.detect(text)
+
+    def detect_many(self, texts: Sequence[str]) -> list[list[(str, float)]]:
+        return self.model.detect_many(texts)
+
+    async def detect_async(self, text: str) -> list[(str, float)]:
+        return await self.model.detect_async(text)
+
+    def train(self, text: str, expected_language: str):
+        if self.__closed:
+            self.model.train(text, expected_language)
+            return
+        self.__queue.put((text, expected_language))
+
+    def train_many(self, samples: Iterable[tuple[str, str]]):
+        for text, expected_language in samples:
+            self.train(text, expected_language)
+
+    def close(self):
+        """
+        Stops the background writer after all pending training is written
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__queue.put(None)
+        self.__thread.join()
+
+    def __run(self):
+        running = True
+        while running:
+            samples = []
+            deadline = None
+            while len(samples) < self.batch_size:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    sample = self.__queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if sample is None:
+                    running = False
+                    break
+                samples.append(sample)
+                if deadline is None:
+                    deadline = time.monotonic() + self.interval
+
+            if samples:
+                self.__write(samples)
+
+    def __write(self, samples: list[tuple[str, str]]):
+        self.logger.debug(f'Writing {len(samples)} training samples')
+        try:
+            self.model.train_many(samples)
+            TRAINING_WRITES.inc()
+            TRAINING_SAMPLES.inc(amount=len(samples))
+        except Exception as error:
+            self.logger.error(error)
+
+
+class MicroBatchDetectionModel(LanguageDetectionModel):
+    """
+    Collects the texts detected asynchronously within the same iteration of the event loop, from any channel,
+    and detects them with a single call to detect_many() of the wrapped model away from the event loop
+    """
+    def __init__(self, model: LanguageDetectionModel, batch_size: int):
+        super().__init__()
+        self.__model = model
+        self.__batch_size = max(1, batch_size)
+        self.__batch: list[tuple[str, asyncio.Future]] = []
+        self.__logger = get_logger('models')
+
+    @property
+    def logger(self):
+        return self.__logger
+
+    @property
+    def model(self) -> LanguageDetectionModel:
+        return self.__model
+
+    @property
+    def batch_size(self) -> int:
+        return self.__batch_size
+
+    def detect(self, text: str) -> list[(str, float)]:
+        return self.model.detect(text)
+
+    def detect_many(self, texts: Sequence[str]) -> list[list[(str, float)]]:
+        return self.model.detect_many(texts)
+
+    async def detect_async(self, text: str) -> list[(str, float)]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self.__batch:
+            loop.call_soon(self.__submit, loop)
+        self.__batch.append((text, future))
+        return await future
+
+    def __submit(self, loop: asyncio.AbstractEventLoop):
+        while self.__batch:
+            batch, self.__batch = self.__batch[:self.batch_size], self.__batch[self.batch_size:]
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug('Detecting languages of %d texts', len(batch))
+            task = loop.run_in_executor(None, self.model.detect_many, [text for text, _ in batch])
+            task.add_done_callback(partial(self.__complete, [future for _, future in batch]))
+
+    def __complete(self, futures: list[asyncio.Future], completed: asyncio.Future):
+        # a failed batch is reported as undetected, rather than failing the translation of its messages
+        results = [[] for _ in futures]
+        if not completed.cancelled():
+            error = completed.exception()
+            if error is None:
+                results = completed.result()
+            else:
+                self.logger.error(error)
+
+        for future, result in zip(futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def train(self, text: str, expected_language: str):
+        self.model.train(text, expected_language)
+
+    def train_many(self, samples: Iterable[tuple[str, str]]):
+        self.model.train_many(samples)
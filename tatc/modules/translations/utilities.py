@@ -1,9 +1,15 @@
 from __future__ import annotations
+from functools import lru_cache
 
 import re
 import emoji
 
 
+_URI_PATTERN_ = re.compile(r'[a-z]+://[\S]+', re.IGNORECASE)
+# important: twitch username can contain non-latin characters
+_USERNAME_PATTERN_ = re.compile(r'@[\S]{4,25}', re.IGNORECASE)
+
+
 class TwitchEmote:
     def __init__(self, emote_id: str, data: str):
         start_index, end_index = data.strip().split('-')
@@ -53,14 +59,17 @@ class Twitch:
         if not emotes:
             return message.strip()
 
-        emotes_terms = []
-        for emote in set(emotes):
-            emotes_terms.append(message[emote.start_index:emote.end_index])
-
-        for term in emotes_terms:
-            message = message.replace(term, '')
+        # emotes are removed by their index ranges in a single pass, overlapping ranges are skipped
+        parts = []
+        index = 0
+        for emote in sorted(set(emotes), key=lambda emote: emote.start_index):
+            if emote.start_index < index:
+                continue
+            parts.append(message[index:emote.start_index])
+            index = emote.end_index
+        parts.append(message[index:])
 
-        return message.strip()
+        return ''.join(parts).strip()
 
     @staticmethod
     def sanitize_emojis(message: str):
@@ -68,9 +77,57 @@ class Twitch:
 
     @staticmethod
     def sanitize_username(message: str):
-        # important: twitch username can contain non-latin characters
-        return re.sub(r'@[\S]{4,25}', '', message, re.IGNORECASE).strip()
+        return _USERNAME_PATTERN_.sub('', message).strip()
 
     @staticmethod
     def sanitize_uris(message: str):
-        return re.sub(r'[a-z]+://[\S]+', '', message, re.IGNORECASE)
+        return _URI_PATTERN_.sub('', message)
+
+    @staticmethod
+    @lru_cache(maxsize=16)
+    def echo_pattern(nick: str) -> re.Pattern:
+        """
+        Returns the compiled pattern matching the translations sent by the specified user
+        """
+        return re.compile(rf'^\[.+?\] {re.escape(nick)}: .+$')
+
+
+class MessageSanitizer:
+    """
+    Sanitizes chat messages before detection and translation; the enabled stages are resolved once per
+    combination of settings, and the same instance is shared by every channel using that combination
+    """
+    def __init__(self, sanitize_emojis: bool = True, sanitize_usernames: bool = False):
+        self.__sanitize_emojis = sanitize_emojis
+        self.__sanitize_usernames = sanitize_usernames
+
+        # the stages run in order, a single alternation would remove a username overlapping an uri as a whole,
+        # such as "@user://x", of which removing the uri first leaves "@"
+        self.__stages = [self.__sub(_URI_PATTERN_)]
+        if sanitize_emojis:
+            self.__stages.append(Twitch.sanitize_emojis)
+        if sanitize_usernames:
+            self.__stages.append(self.__sub(_USERNAME_PATTERN_))
+
+    @property
+    def sanitize_emojis(self) -> bool:
+        return self.__sanitize_emojis
+
+    @property
+    def sanitize_usernames(self) -> bool:
+        return self.__sanitize_usernames
+
+    @staticmethod
+    @lru_cache(maxsize=4)
+    def of(sanitize_emojis: bool, sanitize_usernames: bool) -> MessageSanitizer:
+        return MessageSanitizer(sanitize_emojis=sanitize_emojis, sanitize_usernames=sanitize_usernames)
+
+    @staticmethod
+    def __sub(pattern: re.Pattern):
+        return lambda message: pattern.sub('', message)
+
+    def sanitize(self, message: str, emotes: list[TwitchEmote] = None) -> str:
+        text = Twitch.sanitize_twitch_emotes(message, emotes)
+        for stage in self.__stages:
+            text = stage(text)
+        return text.strip()
@@ -0,0 +1,115 @@
+from tatc.core.metrics import MetricsExporter, MetricsRegistry
+
+import asyncio
+import logging
+import threading
+
+import pytest
+
+
+def test_metrics_are_rendered_in_the_text_format():
+    registry = MetricsRegistry()
+    counter = registry.counter('tatc_messages_total', 'Chat messages', labels=['channel'])
+    counter.inc('b"c')
+    counter.inc('a', amount=2)
+    histogram = registry.histogram('tatc_seconds', 'Duration', buckets=[0.1, 1.0])
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    registry.callback('tatc_depth', 'Depth', lambda: 3)
+
+    assert registry.render() == '\n'.join([
+        '# HELP tatc_messages_total Chat messages',
+        '# TYPE tatc_messages_total counter',
+        'tatc_messages_total{channel="a"} 2',
+        'tatc_messages_total{channel="b\\"c"} 1',
+        '# HELP tatc_seconds Duration',
+        '# TYPE tatc_seconds histogram',
+        'tatc_seconds_bucket{le="0.1"} 1',
+        'tatc_seconds_bucket{le="1.0"} 2',
+        'tatc_seconds_bucket{le="+Inf"} 3',
+        'tatc_seconds_count 3',
+        'tatc_seconds_sum 5.55',
+        '# HELP tatc_depth Depth',
+        '# TYPE tatc_depth gauge',
+        'tatc_depth 3',
+    ]) + '\n'
+
+
+def test_counter_without_labels_is_rendered_before_any_increment():
+    registry = MetricsRegistry()
+    registry.counter('tatc_errors_total', 'Errors')
+    assert 'tatc_errors_total 0\n' in registry.render()
+
+
+def test_registering_an_existing_name_returns_the_existing_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter('tatc_messages_total', 'Chat messages')
+    assert registry.counter('tatc_messages_total', 'Chat messages') is counter
+
+    # the callback replaces the one of the previous owner
+    registry.callback('tatc_depth', 'Depth', lambda: 1)
+    registry.callback('tatc_depth', 'Depth', lambda: 2)
+    assert 'tatc_depth 2\n' in registry.render()
+    assert len(registry.metrics) == 2
+
+
+def test_labels_must_match_the_metric():
+    registry = MetricsRegistry()
+    counter = registry.counter('tatc_messages_total', 'Chat messages', labels=['channel'])
+    with pytest.raises(ValueError):
+        counter.inc()
+
+
+def test_callbacks_are_read_on_the_event_loop(tmp_path):
+    registry = MetricsRegistry()
+    threads = []
+    depths = {'one': 1}
+
+    def depth() -> dict[tuple[str, ...], float]:
+        threads.append(threading.current_thread())
+        return {(channel,): value for channel, value in depths.items()}
+
+    registry.callback('tatc_depth', 'Depth', depth, labels=['channel'])
+    file = tmp_path / 'metrics.prom'
+
+    async def run():
+        exporter = MetricsExporter(registry, file=str(file), loop=asyncio.get_running_loop())
+        # the file is written from another thread, while the loop keeps running
+        await asyncio.get_running_loop().run_in_executor(None, exporter.write)
+        # on the loop itself, the metrics are read right away
+        exporter.write()
+
+    asyncio.run(run())
+    assert threads == [threading.main_thread()] * 2
+    assert 'tatc_depth{channel="one"} 1\n' in file.read_text()
+
+
+def test_metrics_are_not_written_when_the_loop_does_not_read_them(tmp_path, caplog):
+    registry = MetricsRegistry()
+    registry.callback('tatc_depth', 'Depth', lambda: 1)
+    file = tmp_path / 'metrics.prom'
+
+    async def run():
+        exporter = MetricsExporter(
+            registry, file=str(file), loop=asyncio.get_running_loop(), timeout=0.1, logger=logging.getLogger('metrics')
+        )
+        thread = threading.Thread(target=exporter.write)
+        thread.start()
+        # the loop is blocked until the write timed out
+        thread.join()
+
+    with caplog.at_level(logging.ERROR, logger='metrics'):
+        asyncio.run(run())
+    assert not file.exists()
+    assert 'Metrics were not read within 0.1 seconds.' in caplog.text
+
+
+def test_metrics_are_read_directly_without_a_running_loop(tmp_path):
+    registry = MetricsRegistry()
+    registry.callback('tatc_depth', 'Depth', lambda: 1)
+    loop = asyncio.new_event_loop()
+    loop.close()
+
+    exporter = MetricsExporter(registry, file=str(tmp_path / 'metrics.prom'), loop=loop)
+    assert 'tatc_depth 1\n' in exporter.render()
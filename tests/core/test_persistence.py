@@ -0,0 +1,115 @@
+from tatc.core.configurations import TatcApplicationConfiguration
+from tatc.core.persistence import ConfigurationWriter
+
+import asyncio
+import json
+import logging
+import os
+import threading
+
+
+def writer_of(file: str, data: dict[str, any], debounce: float = 0.05) -> ConfigurationWriter:
+    configuration = TatcApplicationConfiguration(data)
+    return ConfigurationWriter(file, snapshot=configuration.to_dict, debounce=debounce)
+
+
+def read(file: str) -> dict[str, any]:
+    with open(file, 'r') as fp:
+        return json.load(fp)
+
+
+def test_changes_are_coalesced_over_the_debounce_window(tmp_path):
+    file = str(tmp_path / 'channels.json')
+    data = {'one': {'enabled': True}}
+    writer = writer_of(file, data)
+
+    async def run():
+        writer.mark_dirty()
+        data['two'] = {'enabled': True}
+        writer.mark_dirty('two')
+        data['one']['enabled'] = False
+        writer.mark_dirty('one')
+        assert writer.pending and writer.writes == 0
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert writer.writes == 1
+    assert not writer.pending
+    assert read(file) == {'one': {'enabled': False}, 'two': {'enabled': True}}
+
+
+def test_only_changed_channels_are_copied(tmp_path):
+    file = str(tmp_path / 'channels.json')
+    data = {'one': {'enabled': True}, 'two': {'enabled': True}}
+    writer = writer_of(file, data)
+    writer.mark_dirty()
+
+    # changes of a channel that is not marked dirty are not saved
+    data['one']['enabled'] = False
+    data['two']['enabled'] = False
+    writer.mark_dirty('two')
+    assert read(file) == {'one': {'enabled': True}, 'two': {'enabled': False}}
+    assert writer.writes == 2
+
+
+def test_without_event_loop_changes_are_written_immediately(tmp_path):
+    file = str(tmp_path / 'channels.json')
+    writer = writer_of(file, {'one': {'enabled': True}})
+    writer.mark_dirty('one')
+    assert writer.writes == 1
+    assert read(file) == {'one': {'enabled': True}}
+
+
+def test_file_is_replaced_atomically(tmp_path):
+    file = tmp_path / 'channels.json'
+    file.write_text('{"old": {}}')
+    os.chmod(file, 0o644)
+    writer = writer_of(str(file), {'new': {'enabled': True}})
+    writer.mark_dirty()
+
+    assert read(str(file)) == {'new': {'enabled': True}}
+    assert sorted(os.listdir(tmp_path)) == ['channels.json']
+    assert os.stat(file).st_mode & 0o777 == 0o644
+
+
+def test_write_error_keeps_the_file_and_is_logged(tmp_path, caplog):
+    file = str(tmp_path / 'missing' / 'channels.json')
+    writer = writer_of(file, {'one': {'enabled': True}})
+
+    with caplog.at_level(logging.ERROR, logger=writer.logger.name):
+        writer.mark_dirty()
+    assert writer.writes == 0
+    assert not os.path.exists(file)
+    assert f'Unable to save "{file}"' in caplog.text
+
+
+def test_changes_do_not_wait_for_a_write_in_progress(tmp_path, monkeypatch):
+    file = str(tmp_path / 'channels.json')
+    data = {'one': {'version': 0}}
+    writer = writer_of(file, data, debounce=0.01)
+    release = threading.Event()
+    released = []
+    dump = json.dump
+
+    def slow_dump(*args, **kwargs):
+        # a write blocking the event loop would hold up the release, and the wait would time out
+        released.append(release.wait(5))
+        dump(*args, **kwargs)
+
+    monkeypatch.setattr(json, 'dump', slow_dump)
+
+    async def run():
+        writer.mark_dirty('one')
+        await asyncio.sleep(0.05)
+        # the first write is blocked on the disk, the next changes are collected meanwhile
+        for version in range(1, 4):
+            data['one']['version'] = version
+            writer.mark_dirty('one')
+            await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert released and all(released)
+    assert read(file) == {'one': {'version': 3}}
+    assert sorted(os.listdir(tmp_path)) == ['channels.json']
@@ -0,0 +1,165 @@
+from tatc import core
+from tatc.core.bots import TatcTwitchChatBot
+from tatc.core.profilers import CProfileProfiler, SamplingProfiler
+from tatc.errors import InvalidArgumentsError
+
+import asyncio
+import os
+import pstats
+import threading
+import types
+
+import pytest
+
+
+def spin(stopped: threading.Event):
+    while not stopped.is_set():
+        sum(range(100))
+
+
+def work() -> int:
+    return sum(range(100))
+
+
+def profile_busy_thread(profiler: SamplingProfiler, samples: int = 20):
+    stopped = threading.Event()
+    thread = threading.Thread(target=spin, args=(stopped,), name='busy')
+    thread.start()
+    try:
+        profiler.start()
+        # the samples are counted as they are taken, not on a wall clock
+        while profiler.samples < samples:
+            stopped.wait(0.01)
+        profiler.stop()
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path / 'profiles' / 'sampling.folded'), interval=0.001)
+    profile_busy_thread(profiler)
+    file = profiler.save()
+
+    with open(file, encoding='utf-8') as fp:
+        lines = fp.read().splitlines()
+    stacks = {}
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        stacks[stack] = int(count)
+    assert sum(stacks.values()) == profiler.samples
+    # each stack starts with the name of its thread, followed by its frames from the outermost
+    busy = [stack.split(';') for stack in stacks if stack.startswith('busy;')]
+    assert busy
+    assert all(frames[1].startswith('_bootstrap (threading.py:') for frames in busy)
+    assert any(f'spin (test_profilers.py:{spin.__code__.co_firstlineno})' in frames for frames in busy)
+    assert os.listdir(tmp_path / 'profiles') == ['sampling.folded']
+
+
+def test_sampling_profiler_does_not_sample_itself(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path / 'sampling.folded'), interval=0.001)
+    profile_busy_thread(profiler)
+    profiler.save()
+
+    with open(profiler.file, encoding='utf-8') as fp:
+        threads = {line.split(';', 1)[0] for line in fp}
+    assert 'busy' in threads
+    assert 'profiler-sampling' not in threads
+
+
+def test_cprofile_profiler_writes_pstats(tmp_path):
+    profiler = CProfileProfiler(str(tmp_path / 'cprofile.pstats'))
+    profiler.start()
+    work()
+    profiler.stop()
+    assert not profiler.running
+
+    statistics = pstats.Stats(profiler.save())
+    assert (__file__, work.__code__.co_firstlineno, 'work') in statistics.stats
+
+
+class StubChannel:
+    name = 'channel'
+
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send(self, content: str):
+        self.sent.append(content)
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('twitch_access_token', 'oauth:token')
+    monkeypatch.setenv('bot_administrators', 'admin')
+    monkeypatch.setenv('profiler_interval', '0.001')
+    for cached in (core.environment, core.init):
+        cached.cache_clear()
+    yield lambda: TatcTwitchChatBot(core.init())
+    for cached in (core.environment, core.init):
+        cached.cache_clear()
+
+
+async def profile(bot: TatcTwitchChatBot, channel: StubChannel, *arguments: str) -> list[str]:
+    context = types.SimpleNamespace(
+        author=types.SimpleNamespace(name='admin', is_mod=True, is_broadcaster=False),
+        channel=channel
+    )
+    # the command is called directly, without a connection to Twitch
+    await TatcTwitchChatBot.profile._callback(bot, context, *arguments)
+    await bot.scheduler.join()
+    sent = channel.sent.copy()
+    channel.sent.clear()
+    return sent
+
+
+@pytest.mark.parametrize('arguments, started', [
+    (('start',), 'Profiler "sampling" started for 30s'),
+    (('start', '60'), 'Profiler "sampling" started for 60s'),
+    (('start', '45', 'cprofile'), 'Profiler "cprofile" started for 45s'),
+    (('start', 'CProfile', '10'), 'Profiler "cprofile" started for 10s'),
+    (('start', 'sampling', '0'), 'Profiler "sampling" started for 1s'),
+    (('start', '100000'), 'Profiler "sampling" started for 300s'),
+])
+def test_profile_command_arguments(bot, arguments: tuple[str, ...], started: str):
+    async def run():
+        chat_bot = bot()
+        channel = StubChannel()
+        replies = await profile(chat_bot, channel, *arguments)
+        replies += await profile(chat_bot, channel, 'stop')
+        # the profile is saved by a task, its reply follows
+        while len(replies) < 2:
+            await asyncio.sleep(0.01)
+            await chat_bot.scheduler.join()
+            replies += channel.sent
+        return replies
+
+    replies = asyncio.run(run())
+    assert replies[0] == started
+    assert replies[1].startswith('Profile saved: "profiles')
+
+
+@pytest.mark.parametrize('arguments, error', [
+    (('start', 'unknown'), 'Error: Profiler "unknown" is not a known profiler'),
+    (('start', 'sampling', 'soon'), 'Error: Duration "soon" is not a number of seconds'),
+    (('restart',), 'Error: Method "restart" is not a known method'),
+])
+def test_profile_command_rejects_invalid_arguments(bot, arguments: tuple[str, ...], error: str):
+    async def run():
+        await profile(bot(), StubChannel(), *arguments)
+
+    with pytest.raises(InvalidArgumentsError) as raised:
+        asyncio.run(run())
+    assert str(raised.value) == error
+
+
+def test_profile_command_reports_the_status(bot):
+    async def run():
+        chat_bot = bot()
+        channel = StubChannel()
+        replies = await profile(chat_bot, channel, 'status')
+        replies += await profile(chat_bot, channel, 'stop')
+        return replies
+
+    assert asyncio.run(run()) == ['Profiler is not running', 'Profiler is not running']
@@ -0,0 +1,122 @@
+from tatc.core.queues import IngestQueue
+
+import asyncio
+import logging
+
+import pytest
+
+
+def shed(policy: str, count: int, max_size: int = 5) -> tuple[list[int], list[tuple[int, str]], list[bool]]:
+    """
+    Puts the work faster than it is processed, returns the processed work, the dropped work and the results of put()
+    """
+    processed = []
+    dropped = []
+
+    async def handler(item: int):
+        processed.append(item)
+
+    async def run() -> list[bool]:
+        queue = IngestQueue('test', handler, max_size=max_size, policy=policy, on_drop=lambda *args: dropped.append(args))
+        accepted = [queue.put(item) for item in range(count)]
+        await queue.join()
+        queue.cancel()
+        return accepted
+
+    return processed, dropped, asyncio.run(run())
+
+
+@pytest.mark.parametrize('policy', IngestQueue.POLICIES)
+def test_every_work_is_either_processed_or_dropped(policy: str):
+    processed, dropped, _ = shed(policy, 100)
+    assert sorted(processed + [item for item, _ in dropped]) == list(range(100))
+    assert all(reason == IngestQueue.DROP_FULL for _, reason in dropped)
+
+
+def test_drop_oldest_reports_evicted_work():
+    processed, dropped, accepted = shed(IngestQueue.POLICY_DROP_OLDEST, 8)
+    assert all(accepted)
+    assert dropped == [(0, 'full'), (1, 'full'), (2, 'full')]
+    assert processed == [3, 4, 5, 6, 7]
+
+
+def test_drop_newest_reports_rejected_work():
+    processed, dropped, accepted = shed(IngestQueue.POLICY_DROP_NEWEST, 8)
+    assert accepted == [True] * 5 + [False] * 3
+    assert dropped == [(5, 'full'), (6, 'full'), (7, 'full')]
+    assert processed == [0, 1, 2, 3, 4]
+
+
+def test_expired_work_is_reported():
+    dropped = []
+
+    async def handler(item: int):
+        await asyncio.sleep(0.05)
+
+    async def run():
+        queue = IngestQueue('test', handler, max_age=0.02, on_drop=lambda *args: dropped.append(args))
+        for item in range(3):
+            queue.put(item)
+        await queue.join()
+        queue.cancel()
+        assert queue.dropped == 2
+
+    asyncio.run(run())
+    assert dropped == [(1, 'expired'), (2, 'expired')]
+
+
+def test_errors_are_reported_to_on_error():
+    errors = []
+
+    async def handler(item: int):
+        if item % 2:
+            raise ValueError(item)
+
+    async def run():
+        queue = IngestQueue('test', handler, on_error=lambda item, error: errors.append((item, error)))
+        for item in range(4):
+            queue.put(item)
+        await queue.join()
+        queue.cancel()
+        assert queue.processed == 4
+
+    asyncio.run(run())
+    assert [(item, str(error)) for item, error in errors] == [(1, '1'), (3, '3')]
+
+
+def test_errors_are_logged_with_traceback(caplog):
+    async def handler(item: int):
+        raise ValueError(item)
+
+    async def run():
+        queue = IngestQueue('test', handler, logger=logging.getLogger('test_queues'))
+        queue.put(1)
+        await queue.join()
+        queue.cancel()
+
+    with caplog.at_level(logging.ERROR, logger='test_queues'):
+        asyncio.run(run())
+    assert 'Unable to process the work of "test"' in caplog.text
+    assert 'Traceback' in caplog.text and 'ValueError: 1' in caplog.text
+
+
+def test_cancel_reports_pending_work():
+    dropped = []
+    started = []
+
+    async def handler(item: int):
+        started.append(item)
+        await asyncio.sleep(10)
+
+    async def run():
+        queue = IngestQueue('test', handler, on_drop=lambda *args: dropped.append(args))
+        for item in range(3):
+            queue.put(item)
+        await asyncio.sleep(0.01)
+        queue.cancel()
+        await queue.join()
+        assert queue.depth == 0
+
+    asyncio.run(run())
+    assert started == [0]
+    assert dropped == [(1, 'cancelled'), (2, 'cancelled')]
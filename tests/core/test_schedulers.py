@@ -0,0 +1,44 @@
+from tatc.core.schedulers import SlidingWindowLimit
+
+import math
+import random
+
+
+def send_times(limit: SlidingWindowLimit, attempts: list[float]) -> list[float]:
+    """
+    Sends a message at each attempt, or as soon as the limit allows afterwards
+    """
+    sent = []
+    now = 0.0
+    for attempt in attempts:
+        now = max(now, attempt)
+        while (delay := limit.delay(now)) > 0:
+            # the clock always moves forward, even when the delay is below its resolution
+            now = max(now + delay, math.nextafter(now, math.inf))
+        limit.consume(now)
+        sent.append(now)
+    return sent
+
+
+def max_within(times: list[float], period: float) -> int:
+    return max(sum(1 for other in times if 0 <= other - time < period) for time in times)
+
+
+def test_limit_is_never_exceeded_within_any_window():
+    # Twitch allows 20 messages per 30 seconds, a starting burst must not be followed by a refill
+    sent = send_times(SlidingWindowLimit(20, 30), [0.0] * 100)
+    assert max_within(sent, 30) == 20
+    assert sent[20] == 30
+
+
+def test_limit_is_never_exceeded_with_random_traffic():
+    randomizer = random.Random(0)
+    attempts = sorted(randomizer.uniform(0, 300) for _ in range(500))
+    sent = send_times(SlidingWindowLimit(20, 30), attempts)
+    assert max_within(sent, 30) <= 20
+
+
+def test_unlimited():
+    limit = SlidingWindowLimit(0, 30)
+    assert limit.unlimited
+    assert send_times(limit, [0.0] * 100) == [0.0] * 100
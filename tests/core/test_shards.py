@@ -0,0 +1,56 @@
+from tatc.core.shards import ConsistentHashRing, ShardContext
+
+import queue
+import statistics
+import threading
+
+
+CHANNELS = [f'channel_{index}' for index in range(10000)]
+
+
+def owners(ring: ConsistentHashRing) -> dict[str, int]:
+    return {channel: ring.shard_of(channel) for channel in CHANNELS}
+
+
+def test_channels_are_distributed_evenly():
+    ring = ConsistentHashRing(4)
+    counts = [0] * ring.shard_count
+    for shard_id in owners(ring).values():
+        counts[shard_id] += 1
+
+    mean = statistics.mean(counts)
+    assert all(abs(count - mean) / mean < 0.2 for count in counts), counts
+
+
+def test_adding_a_shard_only_moves_channels_to_the_new_shard():
+    before = owners(ConsistentHashRing(4))
+    after = owners(ConsistentHashRing(5))
+    moved = [channel for channel in CHANNELS if before[channel] != after[channel]]
+
+    assert all(after[channel] == 4 for channel in moved)
+    # the new shard takes about its share of the channels, and no more
+    assert 0.1 < len(moved) / len(CHANNELS) < 0.3
+
+
+def test_owner_ignores_case_and_whitespace():
+    ring = ConsistentHashRing(8)
+    assert all(ring.shard_of(f' {channel.upper()} ') == ring.shard_of(channel) for channel in CHANNELS[:100])
+
+
+def test_single_shard_owns_every_channel():
+    assert set(owners(ConsistentHashRing(1)).values()) == {0}
+
+
+def test_receive_returns_once_stopped():
+    inbox = queue.Queue()
+    shard = ShardContext(0, 2, inbox, queue.Queue())
+    inbox.put(('join', 'channel', None))
+    assert shard.receive(timeout=0.01) == ('join', 'channel')
+
+    received = []
+    thread = threading.Thread(target=lambda: received.append(shard.receive(timeout=0.01)))
+    thread.start()
+    shard.stop()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert received == [None]
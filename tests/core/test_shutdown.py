@@ -0,0 +1,71 @@
+from tatc import core
+from tatc.core.bots import TatcTwitchChatBot
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+import twitchio
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def working_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('twitch_access_token', 'oauth:token')
+    monkeypatch.setenv('configuration_sync_delay', '60')
+    for cached in (core.environment, core.init, core.configuration_writer):
+        cached.cache_clear()
+    yield tmp_path
+    core.shutdown()
+    for cached in (core.environment, core.init, core.configuration_writer):
+        cached.cache_clear()
+
+
+def test_pending_configuration_is_written_when_the_bot_closes(working_directory, monkeypatch):
+    async def close(_):
+        pass
+
+    # the bot is never connected, only its own shutdown is run
+    monkeypatch.setattr(twitchio.Client, 'close', close)
+
+    async def run():
+        bot = TatcTwitchChatBot(core.init())
+        bot.configurations.get_channel_configuration('channel').enabled = False
+        core.sync_configuration('channel')
+        assert core.configuration_writer().pending
+        await bot.close()
+
+    asyncio.run(run())
+    with open(working_directory / 'channels.json', 'r') as fp:
+        assert json.load(fp) == {'channel': {'enabled': False}}
+
+
+@pytest.mark.parametrize('signal_name', ['SIGINT', 'SIGTERM'])
+def test_pending_configuration_is_written_when_stopped_by_signal(tmp_path, signal_name: str):
+    script = textwrap.dedent(f'''
+        import asyncio, os, signal
+        import main
+        from tatc import core
+
+        async def run():
+            core.init().update({{'channel': {{'enabled': True}}}})
+            core.sync_configuration('channel')
+            os.kill(os.getpid(), signal.{signal_name})
+            await asyncio.sleep(30)
+
+        main.handle_signals()
+        asyncio.run(run())
+    ''')
+    environment = dict(os.environ, PYTHONPATH=ROOT, configuration_sync_delay='60')
+    result = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, env=environment, timeout=60)
+
+    assert result.returncode == 0
+    with open(tmp_path / 'channels.json', 'r') as fp:
+        assert json.load(fp) == {'channel': {'enabled': True}}
@@ -0,0 +1,112 @@
+from tatc.modules.translations.internal import breakers
+from tatc.modules.translations.internal.breakers import CircuitBreaker, CircuitBreakerCall
+
+import types
+
+import pytest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(breakers, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def opened(probes: int = 1) -> CircuitBreaker:
+    breaker = CircuitBreaker('engine', failure_threshold=2, reset_timeout=30, half_open_probes=probes)
+    breaker.record(error=RuntimeError('throttled'))
+    breaker.record(error=RuntimeError('throttled'))
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_breaker_opens_after_consecutive_failures(clock: Clock):
+    breaker = CircuitBreaker('engine', failure_threshold=2, slow_call_duration=1.0, reset_timeout=30)
+    breaker.record(error=RuntimeError('throttled'))
+    breaker.record(duration=0.1)
+    assert breaker.failures == 0
+
+    breaker.record(error=RuntimeError('throttled'))
+    assert breaker.allow() and breaker.state == CircuitBreaker.CLOSED
+    breaker.record(duration=2.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_half_open_breaker_closes_when_the_probes_succeed(clock: Clock):
+    breaker = opened(probes=2)
+    clock.now = 29
+    assert not breaker.allow()
+
+    clock.now = 30
+    assert breaker.allow() and breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(duration=0.1)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record(duration=0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
+
+
+def test_half_open_breaker_opens_when_a_probe_fails(clock: Clock):
+    breaker = opened(probes=2)
+    clock.now = 30
+    assert breaker.allow() and breaker.allow()
+    breaker.record(duration=0.1)
+    breaker.record(error=RuntimeError('throttled'))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # the reset timeout starts over
+    clock.now = 59
+    assert not breaker.allow()
+    clock.now = 60
+    assert breaker.allow()
+
+
+def test_half_open_breaker_lets_through_a_limited_number_of_probes(clock: Clock):
+    breaker = opened(probes=2)
+    clock.now = 30
+    assert [breaker.allow() for _ in range(4)] == [True, True, False, False]
+
+    # probes whose outcome is never recorded expire after the reset timeout
+    clock.now = 60
+    assert breaker.allow()
+
+
+def test_released_probe_is_let_through_again(clock: Clock):
+    breaker = opened()
+    clock.now = 30
+    assert breaker.allow()
+    call = CircuitBreakerCall(breaker)
+    assert not breaker.allow()
+
+    call.release()
+    assert not call.start()
+    # the call is released once, and its outcome is no longer recorded
+    call.release()
+    call.record(error=RuntimeError('throttled'))
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_started_call_is_recorded_instead_of_released(clock: Clock):
+    breaker = opened()
+    clock.now = 30
+    assert breaker.allow()
+    call = CircuitBreakerCall(breaker)
+    assert call.start()
+
+    call.release()
+    assert not breaker.allow()
+    call.record(duration=0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,123 @@
+from tatc.modules.translations.internal import caches
+from tatc.modules.translations.internal.caches import TranslationCache
+from tatc.modules.translations.internal.interfaces import TranslationResult
+
+import sqlite3
+import types
+
+import pytest
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(tmp_path, monkeypatch) -> Clock:
+    # the logs of the cache are written to the working directory
+    monkeypatch.chdir(tmp_path)
+    clock = Clock()
+    monkeypatch.setattr(caches, 'time', types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+def key(text: str, morse_code_support: bool = False) -> tuple[str, bool, str, str]:
+    return 'google', morse_code_support, text, 'en'
+
+
+def results(text: str) -> list[TranslationResult]:
+    return [TranslationResult('en', 'ja', text)]
+
+
+def translated(cached: list[TranslationResult] | None) -> list[tuple[str, str, str]] | None:
+    if cached is None:
+        return None
+    return [(result.expected_language, result.detected_language, result.translated_text) for result in cached]
+
+
+def test_least_recently_used_entry_is_evicted(clock: Clock):
+    cache = TranslationCache(max_size=2, ttl=0)
+    cache.put(key('one'), results('1'))
+    cache.put(key('two'), results('2'))
+    assert translated(cache.get(key('one'))) == [('en', 'ja', '1')]
+
+    cache.put(key('three'), results('3'))
+    assert cache.size == 2
+    assert cache.get(key('two')) is None
+    assert translated(cache.get(key('one'))) == [('en', 'ja', '1')]
+    assert translated(cache.get(key('three'))) == [('en', 'ja', '3')]
+
+
+def test_entries_expire_after_the_ttl(clock: Clock):
+    cache = TranslationCache(max_size=10, ttl=60)
+    cache.put(key('one'), results('1'))
+
+    clock.now += 59
+    assert translated(cache.get(key('one'))) == [('en', 'ja', '1')]
+    clock.now += 2
+    assert cache.get(key('one')) is None
+    assert cache.size == 0
+
+
+def test_disabled_cache_keeps_nothing(clock: Clock):
+    cache = TranslationCache(max_size=0, ttl=0)
+    cache.put(key('one'), results('1'))
+    assert cache.get(key('one')) is None
+    assert cache.size == 0
+
+
+def test_morse_code_translations_are_cached_apart(clock: Clock):
+    cache = TranslationCache(max_size=10, ttl=0, file='translations.db')
+    cache.put(key('.... ..', morse_code_support=True), results('hi'))
+
+    assert cache.get(key('.... ..')) is None
+    assert cache.load(key('.... ..')) is None
+    assert translated(cache.get(key('.... ..', morse_code_support=True))) == [('en', 'ja', 'hi')]
+
+
+def test_entries_are_loaded_from_the_database(clock: Clock, tmp_path):
+    file = str(tmp_path / 'translations.db')
+    TranslationCache(max_size=10, ttl=60, file=file).put(key('one'), results('1'))
+
+    cache = TranslationCache(max_size=10, ttl=60, file=file)
+    assert cache.get(key('one')) is None
+    assert translated(cache.load(key('one'))) == [('en', 'ja', '1')]
+    assert (cache.hits, cache.misses) == (1, 0)
+    # the loaded entry is kept in memory
+    assert translated(cache.get(key('one'))) == [('en', 'ja', '1')]
+
+    clock.now += 61
+    assert cache.load(key('one')) is None
+    assert cache.misses == 1
+
+
+def test_expired_entries_are_deleted_from_the_database(clock: Clock, tmp_path):
+    file = str(tmp_path / 'translations.db')
+    TranslationCache(max_size=10, ttl=60, file=file).put(key('one'), results('1'))
+    clock.now += 61
+    TranslationCache(max_size=10, ttl=60, file=file)
+
+    with sqlite3.connect(file) as connection:
+        assert connection.execute('SELECT COUNT(*) FROM `translations`').fetchone() == (0,)
+
+
+def test_database_without_morse_code_support_is_recreated(clock: Clock, tmp_path):
+    file = str(tmp_path / 'translations.db')
+    with sqlite3.connect(file) as connection:
+        connection.execute(
+            'CREATE TABLE `translations` (`translation_engine` VARCHAR(255), `text` TEXT, '
+            '`target_language` VARCHAR(255), `results` TEXT, `expires_at` REAL)'
+        )
+        connection.execute(
+            'INSERT INTO `translations` VALUES (?, ?, ?, ?, ?)', ('google', 'one', 'en', '[["en", "ja", "1"]]', 2000.0)
+        )
+    connection.close()
+
+    cache = TranslationCache(max_size=10, ttl=60, file=file)
+    assert cache.load(key('one')) is None
+    cache.put(key('one'), results('1'))
+    assert translated(TranslationCache(max_size=10, ttl=60, file=file).load(key('one'))) == [('en', 'ja', '1')]
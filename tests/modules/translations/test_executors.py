@@ -0,0 +1,210 @@
+from tatc.errors import TranslationTimeoutError, TranslationUnavailableError
+from tatc.modules.translations.internal import breakers
+from tatc.modules.translations.internal.breakers import CircuitBreaker
+from tatc.modules.translations.internal.executors import AsyncLanguageTranslator, TranslationExecutor
+from tatc.modules.translations.internal.interfaces import TranslationResult
+
+import asyncio
+import threading
+import time
+import types
+
+
+class HangingTranslator:
+    """
+    Does not return until released, as an engine that stopped responding
+    """
+    supported_engines = []
+    supported_languages = []
+
+    def __init__(self):
+        self.calls = 0
+        self.released = threading.Event()
+
+    def translate(self, text: str, *target_languages: str):
+        self.calls += 1
+        self.released.wait()
+        for target_language in target_languages:
+            yield TranslationResult(target_language, 'xx', text)
+
+
+class EchoTranslator:
+    supported_engines = []
+    supported_languages = []
+
+    def __init__(self):
+        self.calls = 0
+
+    def translate(self, text: str, *target_languages: str):
+        self.calls += 1
+        for target_language in target_languages:
+            yield TranslationResult(target_language, 'xx', f'echo:{text}')
+
+
+class DiskCache:
+    """
+    Answers every lookup from the on-disk tier, as an entry evicted from memory
+    """
+    def get(self, key: tuple[str, bool, str, str]):
+        return None
+
+    def load(self, key: tuple[str, bool, str, str]) -> list[TranslationResult]:
+        return [TranslationResult(key[3], 'xx', f'cached:{key[2]}')]
+
+    def put(self, key: tuple[str, bool, str, str], results: list[TranslationResult]):
+        pass
+
+
+def half_open(monkeypatch) -> CircuitBreaker:
+    """
+    Returns a breaker letting through a single probe, as its reset timeout has passed
+    """
+    clock = types.SimpleNamespace(monotonic=lambda: 0.0)
+    monkeypatch.setattr(breakers, 'time', clock)
+    breaker = CircuitBreaker('echo', failure_threshold=1, reset_timeout=30)
+    breaker.record(error=RuntimeError('throttled'))
+    clock.monotonic = lambda: 30.0
+    return breaker
+
+
+def translator(engine: str, translator_object, breaker: CircuitBreaker = None, fallbacks: list = None):
+    return AsyncLanguageTranslator(
+        translation_engine=engine,
+        translator=translator_object,
+        executor=TranslationExecutor(max_workers=2, timeout=0.2, name=engine),
+        breaker=breaker,
+        fallbacks=fallbacks
+    )
+
+
+async def translate(async_translator: AsyncLanguageTranslator, text: str) -> list[str] | type:
+    try:
+        return [result.translated_text async for result in async_translator.translate(text, 'en')]
+    except Exception as error:
+        return type(error)
+
+
+def test_open_breaker_fails_fast_to_the_fallback():
+    hanging = HangingTranslator()
+    breaker = CircuitBreaker('hanging', failure_threshold=2, reset_timeout=60)
+    primary = translator('hanging', hanging, breaker, [translator('echo', EchoTranslator())])
+
+    async def run():
+        first = await asyncio.gather(*[translate(primary, f'first-{index}') for index in range(2)])
+        second = await asyncio.gather(*[translate(primary, f'second-{index}') for index in range(4)])
+        return first, second
+
+    try:
+        first, second = asyncio.run(run())
+    finally:
+        hanging.released.set()
+    # the fallback has its own workers, which the hanging engine cannot hold up
+    assert first == [['echo:first-0'], ['echo:first-1']]
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.failures == 2
+    # the open breaker answers without calling the engine, nor waiting for its timeout
+    assert second == [[f'echo:second-{index}'] for index in range(4)]
+    assert hanging.calls == 2
+
+
+def test_coalesced_call_is_recorded_once():
+    hanging = HangingTranslator()
+    breaker = CircuitBreaker('hanging', failure_threshold=5, reset_timeout=60)
+    primary = translator('hanging', hanging, breaker)
+
+    async def run():
+        return await asyncio.gather(*[translate(primary, 'same') for _ in range(4)])
+
+    try:
+        assert asyncio.run(run()) == [TranslationTimeoutError] * 4
+    finally:
+        hanging.released.set()
+    # the worker returning after the timeout does not record the call again
+    time.sleep(0.05)
+    assert hanging.calls == 1
+    assert breaker.failures == 1
+
+
+def test_open_breaker_without_fallbacks():
+    breaker = CircuitBreaker('echo', failure_threshold=1, reset_timeout=60)
+    breaker.record(error=RuntimeError('throttled'))
+    assert asyncio.run(translate(translator('echo', EchoTranslator(), breaker), 'text')) == TranslationUnavailableError
+
+
+def test_probe_answered_from_the_disk_cache_is_released(monkeypatch):
+    breaker = half_open(monkeypatch)
+    echo = EchoTranslator()
+    primary = AsyncLanguageTranslator(
+        translation_engine='echo',
+        translator=echo,
+        executor=TranslationExecutor(max_workers=1, timeout=5, name='echo'),
+        cache=DiskCache(),
+        breaker=breaker
+    )
+
+    assert asyncio.run(translate(primary, 'text')) == ['cached:text']
+    assert echo.calls == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+
+def test_probe_cancelled_before_it_started_is_released(monkeypatch):
+    breaker = half_open(monkeypatch)
+    echo = EchoTranslator()
+    executor = TranslationExecutor(max_workers=1, timeout=5, name='echo')
+    primary = AsyncLanguageTranslator(translation_engine='echo', translator=echo, executor=executor, breaker=breaker)
+    blocked = threading.Event()
+
+    async def run():
+        # the only worker is busy, the probe waits in the queue of the executor
+        busy = asyncio.ensure_future(executor.run(blocked.wait, 5))
+        probe = asyncio.ensure_future(translate(primary, 'text'))
+        await asyncio.sleep(0.01)
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+        await asyncio.sleep(0)
+        allowed = breaker.allow()
+        blocked.set()
+        await busy
+        return allowed
+
+    try:
+        assert asyncio.run(run())
+    finally:
+        blocked.set()
+        executor.shutdown()
+    assert echo.calls == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+
+class FailingTranslator:
+    supported_engines = []
+    supported_languages = []
+
+    def translate(self, text: str, *target_languages: str):
+        if target_languages[0] != 'en':
+            # the other languages are still being translated when the first one fails
+            time.sleep(0.1)
+        raise RuntimeError(f'{target_languages[0]} failed')
+
+
+def test_fan_out_waits_for_the_tasks_of_every_language():
+    failing = AsyncLanguageTranslator(
+        translation_engine='failing',
+        translator=FailingTranslator(),
+        executor=TranslationExecutor(max_workers=3, timeout=5, name='failing'),
+        fan_out=True
+    )
+
+    async def run():
+        try:
+            async for _ in failing.translate('text', 'en', 'ja', 'ko'):
+                pass
+        except RuntimeError as error:
+            return str(error), asyncio.all_tasks() - {asyncio.current_task()}
+
+    error, pending = asyncio.run(run())
+    assert error == 'en failed'
+    # the cancelled tasks are done, and their outcome retrieved, before the error is raised
+    assert pending == set()
@@ -0,0 +1,152 @@
+from tatc.modules.translations.internal import models
+from tatc.modules.translations.internal.models import (
+    LegacyDetectionModel,
+    LinguaDetectorOptions,
+    MicroBatchDetectionModel,
+    MorseCodeDetectionModel,
+    ProcessPoolDetectionModel
+)
+
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import asyncio
+
+import pytest
+
+
+TEXTS = [
+    'hello world', 'bonjour tout le monde', 'こんにちは', '你好', '.... . .-.. .-.. ---', '...', '', '123', 'hello world'
+]
+
+
+def fake_detect(texts: list[str]) -> list[list[(str, float)]]:
+    return [[(text, 1.0)] for text in texts]
+
+
+class FakePool:
+    """
+    Runs the batches in the calling thread; a broken pool fails its first batch and cancels the batches
+    queued after it, as a pool whose worker died
+    """
+    pools: list['FakePool'] = []
+    broken = 0
+
+    def __init__(self, **kwargs):
+        self.broken = FakePool.broken > 0
+        FakePool.broken -= 1
+        self.submitted: list[list[str]] = []
+        self.shut_down = False
+        FakePool.pools.append(self)
+
+    def submit(self, function, texts: list[str]) -> Future:
+        if self.shut_down:
+            raise RuntimeError('cannot schedule new futures after shutdown')
+        self.submitted.append(texts)
+        future = Future()
+        if not self.broken:
+            future.set_result(function(texts))
+        elif len(self.submitted) == 1:
+            future.set_exception(BrokenProcessPool('A child process terminated abruptly'))
+        else:
+            future.cancel()
+        return future
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def executors(tmp_path, monkeypatch) -> list[FakePool]:
+    # the logs of the model are written to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(models, 'ProcessPoolExecutor', FakePool)
+    monkeypatch.setattr(FakePool, 'pools', [])
+    monkeypatch.setattr(FakePool, 'broken', 0)
+    return FakePool.pools
+
+
+@pytest.fixture
+def pools(executors: list[FakePool], monkeypatch) -> list[FakePool]:
+    monkeypatch.setattr(models, '_detect_in_worker', fake_detect)
+    return executors
+
+
+@pytest.fixture(scope='module')
+def legacy(tmp_path_factory) -> LegacyDetectionModel:
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(tmp_path_factory.mktemp('legacy'))
+        model = LegacyDetectionModel(LinguaDetectorOptions(languages=['en', 'fr', 'ja', 'zh']))
+        # the language models are loaded once for every test of the module
+        model.model
+    return model
+
+
+def pool_model(batch_size: int = 2) -> ProcessPoolDetectionModel:
+    options = LinguaDetectorOptions(languages=['en', 'ja'], preload=False)
+    return ProcessPoolDetectionModel(options, max_workers=2, batch_size=batch_size)
+
+
+def test_batches_of_a_broken_pool_are_submitted_to_a_new_pool(pools: list[FakePool]):
+    FakePool.broken = 1
+    model = pool_model(batch_size=1)
+    texts = ['one', 'two', 'three']
+
+    assert model.detect_many(texts) == fake_detect(texts)
+    broken, restarted = pools
+    assert broken.shut_down and not restarted.shut_down
+    # the cancelled batches are not lost with the pool
+    assert restarted.submitted == [['one'], ['two'], ['three']]
+    assert model.executor is restarted
+
+
+def test_batches_are_not_submitted_a_third_time(pools: list[FakePool]):
+    FakePool.broken = 2
+    model = pool_model()
+
+    with pytest.raises(BrokenProcessPool):
+        model.detect_many(['one', 'two'])
+    assert len(pools) == 2
+
+
+def test_detections_of_a_closed_model_are_not_submitted_again(pools: list[FakePool]):
+    FakePool.broken = 1
+    model = pool_model()
+    model.close()
+
+    with pytest.raises(BrokenProcessPool):
+        model.detect_many(['one', 'two'])
+    assert len(pools) == 1
+
+
+def test_batched_detection_matches_the_detection_of_each_text(legacy: LegacyDetectionModel):
+    assert legacy.detect_many(TEXTS) == [legacy.detect(text) for text in TEXTS]
+    assert legacy.detect_many([]) == []
+
+
+def test_morse_code_is_detected_apart_from_the_batch(legacy: LegacyDetectionModel):
+    model = MorseCodeDetectionModel(legacy)
+    assert model.detect_many(TEXTS) == [model.detect(text) for text in TEXTS]
+    assert model.detect_many(['...', '.-']) == [model.detect('...'), model.detect('.-')]
+
+
+def test_pool_detection_matches_the_detection_of_each_text(
+    executors: list[FakePool], legacy: LegacyDetectionModel, monkeypatch
+):
+    # the workers detect with the detector loaded by their initializer
+    monkeypatch.setattr(models, '_DETECTOR', legacy.model)
+    model = ProcessPoolDetectionModel(legacy.options, max_workers=2, batch_size=2)
+    assert model.detect_many(TEXTS) == [legacy.detect(text) for text in TEXTS]
+    assert [model.detect(text) for text in TEXTS] == [legacy.detect(text) for text in TEXTS]
+    assert executors[0].submitted[:5] == [TEXTS[0:2], TEXTS[2:4], TEXTS[4:6], TEXTS[6:8], TEXTS[8:9]]
+
+
+def test_micro_batches_match_the_detection_of_each_text(legacy: LegacyDetectionModel, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    model = MicroBatchDetectionModel(legacy, batch_size=4)
+
+    async def run() -> list[list[(str, float)]]:
+        return await asyncio.gather(*(model.detect_async(text) for text in TEXTS))
+
+    assert asyncio.run(run()) == [legacy.detect(text) for text in TEXTS]
+    assert model.detect_many(TEXTS) == [legacy.detect(text) for text in TEXTS]
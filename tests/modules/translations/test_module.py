@@ -0,0 +1,248 @@
+from tatc.core import TatcApplicationConfiguration, tracing
+from tatc.core.tracing import Span, Tracer
+from tatc.modules import translations
+from tatc.modules.translations import TatcTranslationModule
+from tatc.modules.translations.configurations import environment
+from tatc.modules.translations.internal.executors import AsyncLanguageTranslator, TranslationExecutor
+from tatc.modules.translations.internal.interfaces import LanguageDetectionModel, TranslationResult
+
+import asyncio
+import random
+import types
+
+import pytest
+
+
+CHANNEL = 'channel'
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    def enqueue(self, channel, text: str, priority: int = 0) -> asyncio.Future:
+        self.sent.append(text)
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(True)
+        return future
+
+
+class FakeBot:
+    nick = 'bot'
+
+    def __init__(self):
+        self.scheduler = FakeScheduler()
+        self.events: list[tuple[str, tuple]] = []
+
+    def run_event(self, name: str, *args):
+        self.events.append((name, args))
+
+
+class FakeDetectionModel(LanguageDetectionModel):
+    def detect(self, text: str) -> list[(str, float)]:
+        return [('ja', 1.0)]
+
+    def train(self, text: str, expected_language: str):
+        pass
+
+
+class FakeTranslator:
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+
+    async def translate(self, text: str, *target_languages: str):
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        for target_language in target_languages:
+            yield TranslationResult(target_language, 'ja', f'{target_language}:{text}')
+
+
+class EchoTranslator:
+    supported_engines = []
+    supported_languages = []
+
+    def translate(self, text: str, *target_languages: str):
+        for target_language in target_languages:
+            yield TranslationResult(target_language, 'ja', f'{target_language}:{text}')
+
+
+class SpanCollector:
+    """
+    Exporter keeping the ended spans, without a background thread
+    """
+    def __init__(self):
+        self.spans: list[Span] = []
+
+    def submit(self, span: Span):
+        self.spans.append(span)
+
+    def named(self, name: str) -> list[Span]:
+        return [span for span in self.spans if span.name == name]
+
+
+def message(content: str, author: str = 'someone') -> types.SimpleNamespace:
+    return types.SimpleNamespace(
+        content=content,
+        echo=False,
+        author=types.SimpleNamespace(name=author),
+        channel=types.SimpleNamespace(name=CHANNEL),
+        tags={},
+        raw_data=f'PRIVMSG #{CHANNEL} :{content}'
+    )
+
+
+@pytest.fixture
+def module(tmp_path, monkeypatch) -> TatcTranslationModule:
+    # the logs of the module are written to the working directory
+    monkeypatch.chdir(tmp_path)
+    translator = FakeTranslator()
+    monkeypatch.setattr(translations, 'get_language_detection_model', lambda morse_code_support=False: FakeDetectionModel())
+    monkeypatch.setattr(translations, 'get_async_translator', lambda *args: translator)
+    module = TatcTranslationModule(TatcApplicationConfiguration({
+        CHANNEL: {'translations': {'target_languages': ['en'], 'translation_engine': 'google', 'ignore_words': []}}
+    }))
+    module.bot = FakeBot()
+    module.translator = translator
+    return module
+
+
+async def receive(module: TatcTranslationModule, *contents: str):
+    for content in contents:
+        await TatcTranslationModule.event_message.func(module, message(content))
+    for queue in module.ingest_queues.values():
+        await queue.join()
+
+
+def test_messages_are_translated(module: TatcTranslationModule):
+    asyncio.run(receive(module, 'こんにちは', 'ありがとう'))
+    assert module.bot.scheduler.sent == ['[ja] someone: en:こんにちは', '[ja] someone: en:ありがとう']
+
+
+def test_errors_reach_the_error_handling_of_the_bot(module: TatcTranslationModule):
+    module.translator.error = RuntimeError('engine failed')
+    asyncio.run(receive(module, 'こんにちは'))
+
+    assert module.bot.scheduler.sent == []
+    [(name, (error, data))] = module.bot.events
+    assert name == 'error'
+    assert isinstance(error, RuntimeError) and str(error) == 'engine failed'
+    assert data == f'PRIVMSG #{CHANNEL} :こんにちは'
+
+
+def test_leaving_a_channel_stops_its_queue(module: TatcTranslationModule):
+    module.translator.delay = 10
+
+    async def run():
+        for content in ('one', 'two', 'three'):
+            await TatcTranslationModule.event_message.func(module, message(content))
+        await asyncio.sleep(0.01)
+        queue = module.ingest_queues[CHANNEL]
+        module.channel_left(CHANNEL)
+        await asyncio.wait_for(queue.join(), timeout=5)
+        return queue
+
+    queue = asyncio.run(run())
+    assert CHANNEL not in module.ingest_queues
+    assert queue.depth == 0
+    assert queue.dropped == 2
+    assert module.bot.scheduler.sent == []
+
+
+@pytest.fixture
+def spans(module: TatcTranslationModule, monkeypatch) -> SpanCollector:
+    collector = SpanCollector()
+    tracer = Tracer(1.0, collector)
+    monkeypatch.setattr(translations, 'get_tracer', lambda: tracer)
+    return collector
+
+
+def test_sampled_message_is_traced(module: TatcTranslationModule, spans: SpanCollector, monkeypatch):
+    echo = AsyncLanguageTranslator('echo', EchoTranslator(), TranslationExecutor(max_workers=1, timeout=5, name='echo'))
+    monkeypatch.setattr(translations, 'get_async_translator', lambda *args: echo)
+    asyncio.run(receive(module, 'こんにちは'))
+
+    [root] = spans.named('message')
+    assert root.parent_id is None and root.end_time is not None
+    assert root.attributes == {'channel': CHANNEL, 'author': 'someone'}
+    children = {span.name: span for span in spans.spans if span.parent_id == root.span_id}
+    assert sorted(children) == ['detect', 'queue', 'sanitize', 'send', 'translation']
+    assert all(span.trace_id == root.trace_id for span in spans.spans)
+    assert children['send'].attributes == {'sent': True}
+    assert children['translation'].attributes == {'engine': 'echo', 'target_language': 'en'}
+    # the stages of the worker belong to the translation
+    assert {span.name for span in spans.spans if span.parent_id == children['translation'].span_id} >= {'engine'}
+
+
+def test_unsampled_message_exports_nothing(module: TatcTranslationModule, monkeypatch):
+    collector = SpanCollector()
+    tracer = Tracer(0.5, collector)
+    monkeypatch.setattr(translations, 'get_tracer', lambda: tracer)
+    monkeypatch.setattr(tracing, 'random', types.SimpleNamespace(random=lambda: 0.5, getrandbits=random.getrandbits))
+    asyncio.run(receive(module, 'こんにちは'))
+
+    assert module.bot.scheduler.sent == ['[ja] someone: en:こんにちは']
+    assert collector.spans == []
+
+
+def test_shed_messages_end_their_trace(module: TatcTranslationModule, spans: SpanCollector, monkeypatch):
+    monkeypatch.setattr(environment(), 'ingest_queue_size', 1)
+    asyncio.run(receive(module, 'one', 'two', 'three'))
+
+    assert module.bot.scheduler.sent == ['[ja] someone: en:three']
+    roots = spans.named('message')
+    assert [root.attributes.get('skipped') for root in roots] == ['shed', 'shed', None]
+    assert [root.attributes.get('reason') for root in roots[:2]] == ['full', 'full']
+    # shed messages have no stages
+    shed = {root.span_id for root in roots[:2]}
+    assert not [span for span in spans.spans if span.parent_id in shed]
+
+
+def test_batched_sends_end_once_the_batch_is_sent(module: TatcTranslationModule, spans: SpanCollector, monkeypatch):
+    monkeypatch.setattr(environment(), 'translation_batch_window', 0.01)
+
+    async def run():
+        await receive(module, 'one', 'two')
+        # the batch is flushed once the window has passed
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert len(module.bot.scheduler.sent) == 1
+    sends = spans.named('send')
+    assert len(sends) == 2
+    assert all(span.attributes == {'sent': True} for span in sends)
+    assert {span.trace_id for span in sends} == {root.trace_id for root in spans.named('message')}
+
+
+def test_settings_match_the_configuration(module: TatcTranslationModule):
+    configuration = module.get_module_configuration(CHANNEL)
+    configuration.ignore_languages = ['ko', 'zh']
+    configuration.fallback_translation_engines = ['google', 'bing']
+    settings = module.get_module_settings(CHANNEL)
+
+    for name in ['enabled', 'translation_engine', 'debug_mode', 'sanitize_emojis', 'sanitize_usernames', 'morse_code_support']:
+        assert getattr(settings, name) == getattr(configuration, name)
+    assert list(settings.target_languages) == configuration.target_languages
+    assert settings.ignore_languages == set(configuration.ignore_languages)
+    assert settings.ignore_words == set(configuration.ignore_words)
+    # the engine of the channel is not tried again as its own fallback
+    assert settings.fallback_translation_engines == ('bing',)
+
+
+def test_settings_are_refreshed_when_the_configuration_changed(module: TatcTranslationModule):
+    async def run():
+        await receive(module, 'こんにちは')
+        settings = module.get_module_settings(CHANNEL)
+        module.get_module_configuration(CHANNEL).target_languages = ['fr']
+        # the snapshot is kept until the module is notified of the change
+        await receive(module, 'ありがとう')
+        assert module.get_module_settings(CHANNEL) is settings
+        module.configuration_changed(CHANNEL)
+        await receive(module, 'さようなら')
+        assert module.get_module_settings(CHANNEL).target_languages == ('fr',)
+
+    asyncio.run(run())
+    assert module.bot.scheduler.sent == [
+        '[ja] someone: en:こんにちは', '[ja] someone: en:ありがとう', '[ja] someone: fr:さようなら'
+    ]
@@ -0,0 +1,316 @@
+"""
+Compares NaiveBayesDetectionModel against the model it replaced.
+
+Intended differences from the previous model:
+    - a single connection is kept open and shared across threads, in WAL mode, instead of a connection per query
+    - the resources are applied once, and again only when their checksum changed, instead of on every start
+    - train_many() validates a batch of samples against the words known before the batch and writes it at once,
+      the rows written are the same as training the samples one after another
+    - with the in-memory index, the words are looked up in a dictionary loaded once, instead of querying the database
+    - the parameters of a query are padded to a power of two with NULL, which never matches any word
+    - languages of the same score may be listed in another order, the query never defined the order of ties
+"""
+from tatc.modules.translations.internal import models
+from tatc.modules.translations.internal.models import NaiveBayesDetectionModel, WriteBehindDetectionModel
+from tatc.utilities import Directory
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import itertools
+import re
+import shutil
+import sqlite3
+
+import pytest
+
+
+RESOURCES = str(Path(__file__).parents[3] / 'resources')
+PATTERN = re.compile(r'[\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF]|[\w]+')
+SAMPLES = [
+    ('hello world, how are you?', 'en'),
+    ('good morning everyone', 'en'),
+    ('Hello World', 'en'),
+    ('bonjour tout le monde', 'fr'),
+    ('hello le monde', 'fr'),
+    ('こんにちは世界', 'ja'),
+    ('ありがとう ございます 123', 'ja'),
+    ('你好世界', 'zh'),
+    ('gg wp 草', 'EN'),
+    ('', 'en'),
+    ('hello', ''),
+]
+TEXTS = [
+    'hello world', 'HELLO, World!!', 'bonjour le monde', 'le monde', 'こんにちは', '世界 hello', 'gg', 'gg 草',
+    'good morning le monde', 'unknown words only', '123', '', '   ', '!!!', 'ありがとう', '你好',
+    # more words than the parameters of a single query
+    ' '.join(['hello', *map(''.join, itertools.product('abcdefghij', repeat=3))])
+]
+
+
+def baseline_seed(file: str):
+    """
+    The previous seeding, applying every resource on each start
+    """
+    connection = sqlite3.connect(file)
+    try:
+        for resource in sorted(Directory.listdir(RESOURCES, r'.*\.sql$')):
+            with open(resource, encoding='utf-8') as fd:
+                connection.executescript(fd.read())
+            connection.commit()
+        for resource in Directory.listdir(RESOURCES, r'.*\.csv$'):
+            language_id = Path(resource).stem.lower()
+            with open(resource, encoding='utf-8') as fd:
+                rows = [(language_id, word, int(weight)) for word, weight in (line.strip().split(',') for line in fd)]
+            connection.executemany('INSERT OR IGNORE INTO `languages` VALUES (?, ?, ?)', rows)
+            connection.commit()
+    finally:
+        connection.close()
+
+
+def baseline_words(text: str) -> list[str]:
+    return list(set(PATTERN.findall(re.sub(r'[^\w\s]+|[\d]+', '', text.strip().lower()))))
+
+
+def baseline_query(file: str, words: list[str]) -> list[tuple[str, int, float]]:
+    """
+    The previous query, with a connection opened for each query
+    """
+    connection = sqlite3.connect(file)
+    try:
+        parameters = ', '.join(['?'] * len(words))
+        return connection.execute(
+            f'SELECT `language_id`, COUNT(*), SUM(`weight`) AS "weight" FROM `languages` '
+            f'WHERE `word` IN ({parameters}) GROUP BY `language_id` ORDER BY "weight" DESC; ',
+            tuple(words)
+        ).fetchall()
+    finally:
+        connection.close()
+
+
+def baseline_detect(file: str, text: str) -> list[(str, float)]:
+    words = baseline_words(text)
+    highest_score = -1
+    detected_languages = []
+    for language_id, _, weight in baseline_query(file, words) if words else []:
+        score = weight / len(words)
+        if highest_score <= score and score:
+            detected_languages.append((language_id, score))
+            highest_score = score
+    return detected_languages
+
+
+def baseline_train(file: str, text: str, expected_language: str):
+    expected_language = expected_language.lower()
+    if expected_language in ['ja', 'zh', 'zh-cn', 'zh-tw']:
+        text = re.sub(r'[^\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF]', '', text)
+    else:
+        text = re.sub(r'[\u3040-\u30FF\u3400-\u4DBF\u4E00-\u9FFF]', '', text)
+    words = baseline_words(text)
+    if not expected_language.strip() or not words:
+        return
+    for language_id, count, _ in baseline_query(file, words):
+        if language_id == expected_language:
+            if count >= len(words):
+                return
+            break
+
+    connection = sqlite3.connect(file)
+    try:
+        connection.executemany(
+            'INSERT OR IGNORE INTO `languages` VALUES (?, ?, ?)', [(expected_language, word, 1) for word in words]
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def rows(file: str) -> list[tuple[str, str, float]]:
+    connection = sqlite3.connect(file)
+    try:
+        return sorted(connection.execute('SELECT `language_id`, `word`, `weight` FROM `languages`').fetchall())
+    finally:
+        connection.close()
+
+
+def ties(detected_languages: list[(str, float)]) -> list[(str, float)]:
+    return sorted(detected_languages, key=lambda detected_language: (-detected_language[1], detected_language[0]))
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch) -> str:
+    # the logs of the model are written to the working directory
+    monkeypatch.chdir(tmp_path)
+    file = str(tmp_path / 'models.db')
+    monkeypatch.setattr(models, 'DATABASE_FILE', file)
+    monkeypatch.setattr(models, 'RESOURCES', RESOURCES)
+    return file
+
+
+@pytest.fixture
+def baseline(tmp_path) -> str:
+    file = str(tmp_path / 'baseline.db')
+    baseline_seed(file)
+    return file
+
+
+def trained(model: NaiveBayesDetectionModel, baseline: str) -> NaiveBayesDetectionModel:
+    for text, expected_language in SAMPLES:
+        model.train(text, expected_language)
+        baseline_train(baseline, text, expected_language)
+    return model
+
+
+@pytest.mark.parametrize('in_memory', [False, True])
+def test_training_writes_the_same_rows(database: str, baseline: str, in_memory: bool):
+    trained(NaiveBayesDetectionModel(in_memory), baseline)
+    assert rows(database) == rows(baseline)
+
+
+@pytest.mark.parametrize('in_memory', [False, True])
+@pytest.mark.parametrize('text', TEXTS)
+def test_detection_matches_the_previous_model(database: str, baseline: str, text: str, in_memory: bool):
+    model = trained(NaiveBayesDetectionModel(in_memory), baseline)
+    assert ties(model.detect(text)) == ties(baseline_detect(baseline, text))
+
+
+def test_connection_is_kept_open_in_wal_mode(database: str):
+    model = NaiveBayesDetectionModel()
+    connection = model.connection
+    model.detect('hello world')
+    model.train('hello world', 'en')
+    assert model.connection is connection
+    assert connection.execute('PRAGMA journal_mode').fetchone() == ('wal',)
+
+    # the connection is shared by the threads of the executor
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        assert list(executor.map(model.detect, ['hello world'] * 8)) == [[('en', 1.0)]] * 8
+
+
+def test_closed_connection_is_opened_again(database: str):
+    model = NaiveBayesDetectionModel()
+    model.train('hello world', 'en')
+    connection = model.connection
+    model.close()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute('SELECT 1')
+    assert model.detect('hello world') == [('en', 1.0)]
+    assert model.connection is not connection
+
+
+def test_index_follows_the_training(database: str, baseline: str):
+    model = trained(NaiveBayesDetectionModel(in_memory=True), baseline)
+    # the index updated by the training matches the index loaded from the database
+    loaded = NaiveBayesDetectionModel(in_memory=True)
+    for text in TEXTS:
+        assert ties(model.detect(text)) == ties(loaded.detect(text))
+
+
+def test_index_does_not_query_the_database(database: str):
+    model = NaiveBayesDetectionModel(in_memory=True)
+    model.train('hello world', 'en')
+    statements = []
+    model.connection.set_trace_callback(statements.append)
+
+    assert model.detect('hello world') == [('en', 1.0)]
+    assert statements == []
+
+
+@pytest.mark.parametrize('in_memory', [False, True])
+def test_batched_training_writes_the_same_rows(database: str, baseline: str, in_memory: bool):
+    model = NaiveBayesDetectionModel(in_memory)
+    model.train_many(SAMPLES)
+    for text, expected_language in SAMPLES:
+        baseline_train(baseline, text, expected_language)
+
+    assert rows(database) == rows(baseline)
+    for text in TEXTS:
+        assert ties(model.detect(text)) == ties(baseline_detect(baseline, text))
+
+
+class CountingModel(NaiveBayesDetectionModel):
+    def __init__(self):
+        super().__init__()
+        self.batches: list[int] = []
+
+    def train_many(self, samples):
+        samples = list(samples)
+        self.batches.append(len(samples))
+        super().train_many(samples)
+
+
+def test_written_behind_training_writes_the_same_rows(database: str, baseline: str):
+    model = CountingModel()
+    writer = WriteBehindDetectionModel(model, interval=60, batch_size=4)
+    for text, expected_language in SAMPLES:
+        writer.train(text, expected_language)
+        baseline_train(baseline, text, expected_language)
+    # the pending training is written when the writer is closed
+    writer.close()
+
+    assert rows(database) == rows(baseline)
+    assert model.batches == [4, 4, 3]
+
+
+def seeds(file: str) -> list[tuple[str, str, float]]:
+    connection = sqlite3.connect(file)
+    try:
+        return connection.execute('SELECT `file_name`, `checksum`, `applied_at` FROM `seeds` ORDER BY `file_name`').fetchall()
+    finally:
+        connection.close()
+
+
+def test_seeding_writes_the_same_rows(database: str, baseline: str):
+    NaiveBayesDetectionModel()
+    assert rows(database) == rows(baseline)
+    assert [file_name for file_name, _, _ in seeds(database)] == ['00-sqlite.sql', '01-sqlite-indexes.sql', 'ja.csv']
+
+
+def test_seeding_twice_writes_nothing(database: str, monkeypatch):
+    NaiveBayesDetectionModel()
+    applied = seeds(database)
+    statements = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs) -> sqlite3.Connection:
+        connection = connect(*args, **kwargs)
+        connection.set_trace_callback(statements.append)
+        return connection
+
+    # the previous seeding ran every resource again, its ignored rows are not counted as changes
+    monkeypatch.setattr(models.sqlite3, 'connect', traced_connect)
+    NaiveBayesDetectionModel()
+    assert [statement for statement in statements if statement.startswith(('BEGIN', 'INSERT', 'CREATE INDEX'))] == []
+    assert seeds(database) == applied
+
+
+def test_changed_resources_are_applied_again(database: str, tmp_path, monkeypatch):
+    resources = tmp_path / 'resources'
+    shutil.copytree(RESOURCES, resources)
+    monkeypatch.setattr(models, 'RESOURCES', str(resources))
+    model = NaiveBayesDetectionModel()
+    model.train('hello world', 'en')
+    applied = dict((file_name, checksum) for file_name, checksum, _ in seeds(database))
+
+    with open(resources / 'ja.csv', 'a', encoding='utf-8') as fd:
+        fd.write('ゔ,1\n')
+    model = NaiveBayesDetectionModel()
+    # the new row and the checksum of the changed resource, the trained words are kept
+    assert model.connection.total_changes == 2
+    assert ('ja', 'ゔ', 1) in rows(database) and ('en', 'hello', 1) in rows(database)
+    changed = dict((file_name, checksum) for file_name, checksum, _ in seeds(database))
+    assert {file_name for file_name in applied if applied[file_name] != changed[file_name]} == {'ja.csv'}
+
+
+@pytest.mark.parametrize('in_memory', [False, True])
+def test_batched_detection_matches_the_detection_of_each_text(
+    database: str, baseline: str, in_memory: bool, monkeypatch
+):
+    model = trained(NaiveBayesDetectionModel(in_memory), baseline)
+    # the words of the batch are loaded in several queries
+    monkeypatch.setattr(NaiveBayesDetectionModel, 'MAX_PARAMETERS', 8)
+    texts = TEXTS + TEXTS[:4]
+
+    assert [ties(detected) for detected in model.detect_many(texts)] == [ties(model.detect(text)) for text in texts]
+    assert model.detect_many([]) == []
@@ -0,0 +1,112 @@
+"""
+Compares MessageSanitizer against the sanitization pipeline it replaced.
+
+Intended differences from the previous pipeline:
+    - emotes are removed by their index ranges, instead of removing every occurrence of their text
+    - the uri and username expressions are case-insensitive and remove every match
+      (previously re.IGNORECASE was passed as the count of substitutions)
+    - the result is always stripped, previously trailing whitespace was kept when only uris were removed
+"""
+from tatc.modules.translations.utilities import MessageSanitizer, TwitchEmote
+
+import emoji
+import itertools
+import random
+import re
+
+import pytest
+
+
+SETTINGS = list(itertools.product([True, False], repeat=2))
+WORDS = [
+    'hello', 'gg', 'nice', 'what', 'is', 'this', 'こんにちは', 'すごい', '草', '日本語',
+    '😀', '👍', '@someone', '@another_user', '@AbCd', 'https://example.com/clip', 'HTTP://EXAMPLE.COM', 'a://b',
+    '@user://x', '@ab://cd'
+]
+EMOTES = {'Kappa': '25', 'LUL': '425618', 'PogChamp': '305954156'}
+
+
+def baseline_sanitize(message: str, emotes: list[TwitchEmote], sanitize_emojis: bool, sanitize_usernames: bool) -> str:
+    """
+    The previous pipeline, with the expressions compiled as intended
+    """
+    text = message.strip()
+    if emotes:
+        for term in [message[emote.start_index:emote.end_index] for emote in set(emotes)]:
+            text = text.replace(term, '')
+        text = text.strip()
+
+    text = re.sub(r'[a-z]+://[\S]+', '', text, flags=re.IGNORECASE)
+    if sanitize_emojis:
+        text = emoji.replace_emoji(text, '').strip()
+    if sanitize_usernames:
+        text = re.sub(r'@[\S]{4,25}', '', text, flags=re.IGNORECASE).strip()
+    return text
+
+
+def emotes_tag(words: list[str]) -> str:
+    """
+    Returns the emotes tag of the message made of the specified words, as sent by Twitch
+    """
+    ranges: dict[str, list[str]] = {}
+    index = 0
+    for word in words:
+        if word in EMOTES:
+            ranges.setdefault(EMOTES[word], []).append(f'{index}-{index + len(word) - 1}')
+        index += len(word) + 1
+    return '/'.join(f'{emote_id}:{",".join(indexes)}' for emote_id, indexes in ranges.items())
+
+
+def sanitize(words: list[str], sanitize_emojis: bool, sanitize_usernames: bool) -> tuple[str, str]:
+    message = ' '.join(words)
+    emotes = TwitchEmote.parse(emotes_tag(words))
+    return (
+        MessageSanitizer.of(sanitize_emojis, sanitize_usernames).sanitize(message, emotes),
+        baseline_sanitize(message, emotes, sanitize_emojis, sanitize_usernames).strip()
+    )
+
+
+@pytest.mark.parametrize('sanitize_emojis, sanitize_usernames', SETTINGS)
+@pytest.mark.parametrize('words', [
+    ['Kappa', 'hello', 'world'],
+    ['hello', 'world', 'Kappa'],
+    ['Kappa', 'hello', 'Kappa'],
+    ['Kappa', 'Kappa', 'Kappa'],
+    ['LUL', 'gg', 'LUL', 'PogChamp', 'LUL'],
+    ['PogChamp', '😀', '@someone', 'https://example.com/clip', 'PogChamp'],
+    ['Kappa'],
+    ['hello', 'https://example.com/clip'],
+    ['@someone', 'HTTP://EXAMPLE.COM', '@AbCd', 'a://b', '@another_user'],
+    ['hello', '@user://x'],
+    ['@ab://cd', 'gg']
+])
+def test_sanitize_matches_baseline(words: list[str], sanitize_emojis: bool, sanitize_usernames: bool):
+    actual, expected = sanitize(words, sanitize_emojis, sanitize_usernames)
+    assert actual == expected
+
+
+@pytest.mark.parametrize('sanitize_emojis, sanitize_usernames', SETTINGS)
+def test_sanitize_matches_baseline_on_random_messages(sanitize_emojis: bool, sanitize_usernames: bool):
+    randomizer = random.Random(0)
+    for _ in range(500):
+        words = randomizer.choices(WORDS + list(EMOTES), k=randomizer.randint(1, 12))
+        actual, expected = sanitize(words, sanitize_emojis, sanitize_usernames)
+        assert actual == expected, words
+
+
+def test_sanitize_removes_emotes_by_index():
+    # the previous pipeline also removed "Kappa" from "Kappa123", which is not an emote
+    message = 'Kappa123 Kappa'
+    emotes = TwitchEmote.parse(emotes_tag(['Kappa123', 'Kappa']))
+    assert MessageSanitizer.of(True, False).sanitize(message, emotes) == 'Kappa123'
+
+
+def test_sanitize_strips_result():
+    assert MessageSanitizer.of(False, False).sanitize('hello https://example.com/clip') == 'hello'
+
+
+def test_uris_are_removed_before_usernames():
+    # the username is only matched within what is left once the uri is removed
+    assert MessageSanitizer.of(False, True).sanitize('hello @user://x') == 'hello @'
+    assert MessageSanitizer.of(True, True).sanitize('hello @user://x') == 'hello @'
+    assert MessageSanitizer.of(False, True).sanitize('hello @someone://x @someone') == 'hello @'